@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Point-in-time lifecycle query benchmark
+
+Builds a project whose versions have a long transition history (written
+straight into version_transitions, spread over a year), then times
+PLMDatabase.as_of() at several dates before and after a lifecycle
+checkpoint, and checks every answer against a brute-force replay of the
+whole history.
+
+Usage: python bench_as_of.py [--versions 2000] [--transitions 1000000]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.db import PLMDatabase
+
+logging.disable(logging.INFO)
+
+START = datetime(2025, 1, 1)
+STATES = ("In-Work", "Released", "Obsolete")
+
+
+def build_history(db: PLMDatabase, version_count: int, transition_count: int, seed: int = 7):
+    """Create versions and a random transition history; returns project_id"""
+    project = db.create_project("AsOfBench", "bench", "Point-in-time benchmark")
+    rng = random.Random(seed)
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.executemany("""
+            INSERT INTO files (project_id, plm_id, file_name, file_type, vault_path)
+            VALUES (?, ?, ?, 'PART', ?)
+        """, [(project["project_id"], f"BENCH-{i:06d}", f"part{i:06d}.SLDPRT", project["vault_path"])
+              for i in range(version_count)])
+        cursor.execute("SELECT file_id FROM files WHERE project_id = ?", (project["project_id"],))
+        file_ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany("""
+            INSERT INTO versions (file_id, version_number, author, file_path, created_timestamp)
+            VALUES (?, 1, 'bench', '', ?)
+        """, [(fid, START.strftime("%Y-%m-%d %H:%M:%S")) for fid in file_ids])
+        cursor.execute("""
+            SELECT v.version_id, v.file_id FROM versions v
+            JOIN files f ON f.file_id = v.file_id WHERE f.project_id = ?
+        """, (project["project_id"],))
+        versions = cursor.fetchall()
+
+        # Transitions in time order; states cycle without respecting the
+        # lifecycle rules so every version changes state many times
+        state = {vid: "In-Work" for vid, _ in versions}
+        step = timedelta(days=365) / transition_count
+        rows = []
+        for i in range(transition_count):
+            vid, fid = versions[rng.randrange(len(versions))]
+            to_state = rng.choice([s for s in STATES if s != state[vid]])
+            rows.append((fid, vid, state[vid], to_state,
+                         (START + step * (i + 1)).strftime("%Y-%m-%d %H:%M:%S")))
+            state[vid] = to_state
+            if len(rows) == 50000:
+                cursor.executemany("""
+                    INSERT INTO version_transitions
+                    (file_id, version_id, from_state, to_state, promoted_by, promotion_timestamp)
+                    VALUES (?, ?, ?, ?, 'bench', ?)
+                """, rows)
+                rows = []
+        cursor.executemany("""
+            INSERT INTO version_transitions
+            (file_id, version_id, from_state, to_state, promoted_by, promotion_timestamp)
+            VALUES (?, ?, ?, ?, 'bench', ?)
+        """, rows)
+        cursor.executemany("UPDATE versions SET lifecycle_state = ? WHERE version_id = ?",
+                           [(s, vid) for vid, s in state.items()])
+        conn.commit()
+    return project["project_id"]
+
+
+def replay(db: PLMDatabase, project_id: int, as_of: str):
+    """Reference answer: walk the full transition history up to as_of"""
+    with db.get_connection() as conn:
+        state = {row[0]: "In-Work" for row in conn.execute("""
+            SELECT v.version_id FROM versions v JOIN files f ON f.file_id = v.file_id
+            WHERE f.project_id = ? AND v.created_timestamp <= ?
+        """, (project_id, as_of))}
+        for vid, to_state in conn.execute("""
+            SELECT version_id, to_state FROM version_transitions
+            WHERE promotion_timestamp <= ? ORDER BY promotion_timestamp, transition_id
+        """, (as_of,)):
+            if vid in state:
+                state[vid] = to_state
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-in-time lifecycle benchmark")
+    parser.add_argument("--versions", type=int, default=2000)
+    parser.add_argument("--transitions", type=int, default=1000000)
+    args = parser.parse_args()
+
+    vault = tempfile.mkdtemp(prefix="plm_bench_asof_")
+    try:
+        db = PLMDatabase(vault, use_lockd=False)
+        t0 = time.perf_counter()
+        project_id = build_history(db, args.versions, args.transitions)
+        print(f"{args.versions} versions, {args.transitions} transitions "
+              f"(built in {time.perf_counter() - t0:.1f} s)")
+
+        dates = ["2025-02-01", "2025-06-30", "2025-12-31"]
+        mismatches = 0
+
+        def run(label):
+            nonlocal mismatches
+            print(f"\n{label}")
+            print(f"{'As of':<12} {'Released':>9} {'as_of() ms':>11} {'replay ms':>10}")
+            print("-" * 46)
+            for d in dates:
+                t0 = time.perf_counter()
+                rows = db.as_of(project_id, d)
+                query_ms = (time.perf_counter() - t0) * 1000
+                t0 = time.perf_counter()
+                expected = replay(db, project_id, db._as_of_timestamp(d))
+                replay_ms = (time.perf_counter() - t0) * 1000
+                got = {r["version_id"]: r["lifecycle_state"] for r in rows}
+                mismatches += got != expected
+                released = sum(1 for s in got.values() if s == "Released")
+                print(f"{d:<12} {released:>9} {query_ms:>11.1f} {replay_ms:>10.1f}")
+
+        run("Without checkpoints")
+
+        t0 = time.perf_counter()
+        db.create_lifecycle_checkpoint(project_id)
+        with db.get_connection() as conn:
+            # Date the checkpoint to just after the generated history
+            conn.execute("UPDATE lifecycle_checkpoints SET taken_at = '2026-01-01 00:00:00'")
+            conn.commit()
+        print(f"\nCheckpoint of {args.versions} versions took {(time.perf_counter() - t0) * 1000:.0f} ms")
+        dates.append("2026-01-02")
+        run("With a checkpoint")
+
+        db.close()
+        print("\n✓ as_of() matches full replay" if not mismatches
+              else f"\n✗ {mismatches} as_of() result(s) differ from full replay")
+        return 0 if not mismatches else 1
+    finally:
+        shutil.rmtree(vault, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
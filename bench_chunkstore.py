@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Chunked vs full-copy version storage benchmark
+
+Builds a synthetic version history for one part (each version edits a few
+percent of the previous one), stores it both as full copies and through the
+chunk store, and compares disk use, store throughput and retrieval latency.
+
+Usage: python bench_chunkstore.py [--versions 20] [--size-mb 4] [--edit-pct 3]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import chunkstore
+from database.chunkstore import ChunkStore, manifest_path
+
+
+def make_history(count: int, size: int, edit_pct: float, seed: int = 7):
+    """Yield successive file contents with small overwrites, inserts and deletes"""
+    rng = random.Random(seed)
+    data = bytearray(rng.randbytes(size))
+    yield bytes(data)
+    for _ in range(count - 1):
+        budget = int(len(data) * edit_pct / 100)
+        while budget > 0:
+            span = min(budget, rng.randint(64, 8192))
+            pos = rng.randrange(len(data))
+            kind = rng.random()
+            if kind < 0.6:
+                data[pos:pos + span] = rng.randbytes(span)
+            elif kind < 0.8:
+                data[pos:pos] = rng.randbytes(span)
+            else:
+                del data[pos:pos + span]
+            budget -= span
+        yield bytes(data)
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk store benchmark")
+    parser.add_argument("--versions", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--edit-pct", type=float, default=3)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="plm_bench_chunks_")
+    try:
+        source = os.path.join(work, "Working", "bracket.SLDPRT")
+        full_dir = os.path.join(work, "full", "Parts", "bracket")
+        chunk_dir = os.path.join(work, "chunked", "Parts", "bracket")
+        os.makedirs(os.path.dirname(source))
+        store = ChunkStore(chunk_dir)
+
+        full_paths, manifests = [], []
+        copy_time = chunk_time = 0.0
+        logical = 0
+
+        history = make_history(args.versions, int(args.size_mb * 1024 * 1024), args.edit_pct)
+        for number, content in enumerate(history, start=1):
+            with open(source, "wb") as f:
+                f.write(content)
+            logical += len(content)
+
+            full = os.path.join(full_dir, f"v{number:03d}", "bracket.SLDPRT")
+            os.makedirs(os.path.dirname(full))
+            start = time.perf_counter()
+            shutil.copyfile(source, full)
+            copy_time += time.perf_counter() - start
+            full_paths.append(full)
+
+            manifest = manifest_path(os.path.join(chunk_dir, f"v{number:03d}", "bracket.SLDPRT"))
+            start = time.perf_counter()
+            result = store.store(source, manifest)
+            chunk_time += time.perf_counter() - start
+            manifests.append(manifest)
+            print(f"  v{number:03d}: {result['chunks']} chunks, {result['new_chunks']} new "
+                  f"({result['bytes_written'] / 1024:.0f} KB written)")
+
+        start = time.perf_counter()
+        for path in full_paths:
+            with open(path, "rb") as f:
+                while f.read(1024 * 1024):
+                    pass
+        full_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for manifest in manifests:
+            for _ in store.iter_content(manifest):
+                pass
+        chunk_read = time.perf_counter() - start
+
+        full_bytes = dir_size(full_dir)
+        chunk_bytes = dir_size(chunk_dir)
+        mb = 1024 * 1024
+        n = len(manifests)
+
+        backend = "numpy" if chunkstore._numpy() else "pure Python"
+        print(f"\n{n} versions, {logical / mb:.1f} MB logical, {args.edit_pct}% edited per version")
+        print(f"Chunk boundaries: {backend}")
+        print(f"\n{'Mode':<12} {'Disk MB':>10} {'Store s':>10} {'Store MB/s':>11} {'Read ms/ver':>12}")
+        print("-" * 60)
+        for mode, disk, seconds, read in (("full copy", full_bytes, copy_time, full_read),
+                                          ("chunked", chunk_bytes, chunk_time, chunk_read)):
+            rate = logical / mb / seconds if seconds else float("inf")
+            print(f"{mode:<12} {disk / mb:>10.1f} {seconds:>10.2f} {rate:>11.1f} {read / n * 1000:>12.1f}")
+        print(f"\nDisk saved: {(1 - chunk_bytes / full_bytes) * 100:.1f}%")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
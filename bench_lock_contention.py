@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Lock contention benchmark
+
+Starts N worker processes that all compete for the same few files through
+PLMDatabase.acquire_lock / release_lock. Each worker records the time window
+in which it believed it held a lock; afterwards the windows of every file are
+checked for overlap, so a lost race shows up as two holders at once. Reports
+acquisitions, conflicts and throughput.
+
+Usage: python bench_lock_contention.py [--workers 32] [--files 4] [--seconds 5]
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.db import PLMDatabase, LockConflictError
+
+logging.disable(logging.INFO)
+
+
+def setup_vault(vault: str, file_count: int):
+    """Create a project with file_count parts"""
+    db = PLMDatabase(vault, concurrent=True)
+    project = db.create_project("LockBench", "bench", "Lock contention benchmark")
+    file_ids = []
+    for i in range(file_count):
+        path = os.path.join(project["vault_path"], "Parts", f"part{i:02d}")
+        os.makedirs(path, exist_ok=True)
+        file_ids.append(db.create_file(project["project_id"], f"part{i:02d}.SLDPRT",
+                                       "PART", path)["file_id"])
+    db.close()
+    return file_ids
+
+
+def worker(vault: str, user: str, file_ids, seconds: float, hold_s: float, start_at: float, out):
+    db = PLMDatabase(vault, pool_size=1, concurrent=True, busy_timeout_ms=10000, max_retries=20)
+    windows, conflicts, errors, attempts = [], 0, 0, 0
+    latencies = []
+    index = hash(user) % len(file_ids)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        file_id = file_ids[index % len(file_ids)]
+        index += 1
+        attempts += 1
+        t0 = time.perf_counter()
+        try:
+            db.acquire_lock(file_id, user, "Bench")
+        except LockConflictError:
+            conflicts += 1
+            latencies.append(time.perf_counter() - t0)
+            continue
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - t0)
+        held_from = time.time()
+        if hold_s:
+            time.sleep(hold_s)
+        held_to = time.time()
+        try:
+            db.release_lock(file_id, user)
+        except Exception:
+            errors += 1
+        windows.append((file_id, held_from, held_to))
+    db.close()
+    out.put({"user": user, "windows": windows, "conflicts": conflicts,
+             "errors": errors, "attempts": attempts, "latencies": latencies})
+
+
+def count_overlaps(windows):
+    """Pairs of lock windows on the same file that overlap in time"""
+    overlaps = 0
+    by_file = {}
+    for file_id, start, end, user in windows:
+        by_file.setdefault(file_id, []).append((start, end, user))
+    for spans in by_file.values():
+        spans.sort()
+        latest_end, latest_user = 0.0, None
+        for start, end, user in spans:
+            if start < latest_end and user != latest_user:
+                overlaps += 1
+            if end > latest_end:
+                latest_end, latest_user = end, user
+    return overlaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lock contention benchmark")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--hold-ms", type=float, default=2, help="Time each lock is held")
+    args = parser.parse_args()
+
+    vault = tempfile.mkdtemp(prefix="plm_bench_locks_")
+    try:
+        file_ids = setup_vault(vault, args.files)
+        out = mp.Queue()
+        start_at = time.time() + 1.0
+        procs = [mp.Process(target=worker, args=(vault, f"user{i:02d}", file_ids, args.seconds,
+                                                 args.hold_ms / 1000, start_at, out))
+                 for i in range(args.workers)]
+        for p in procs:
+            p.start()
+        results = [out.get(timeout=args.seconds + 120) for _ in procs]
+        for p in procs:
+            p.join()
+
+        windows = [(f, s, e, r["user"]) for r in results for f, s, e in r["windows"]]
+        acquired = len(windows)
+        conflicts = sum(r["conflicts"] for r in results)
+        errors = sum(r["errors"] for r in results)
+        attempts = sum(r["attempts"] for r in results)
+        latencies = sorted(l for r in results for l in r["latencies"])
+        overlaps = count_overlaps(windows)
+
+        db = PLMDatabase(vault)
+        with db.get_connection() as conn:
+            still_locked = conn.execute(
+                "SELECT COUNT(*) FROM files WHERE locked_by IS NOT NULL").fetchone()[0]
+            open_rows = conn.execute(
+                "SELECT COUNT(*) FROM file_locks WHERE lock_release_timestamp IS NULL").fetchone()[0]
+        db.close()
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+        print(f"{args.workers} processes, {args.files} files, {args.seconds:.0f} s, "
+              f"locks held {args.hold_ms:g} ms")
+        print(f"\n{'Attempts':>10} {'Acquired':>10} {'Conflicts':>10} {'Errors':>8} {'Ops/s':>10}")
+        print("-" * 52)
+        print(f"{attempts:>10} {acquired:>10} {conflicts:>10} {errors:>8} "
+              f"{attempts / args.seconds:>10.0f}")
+        print(f"\nAcquire latency: p50 {pct(0.50):.1f} ms, p99 {pct(0.99):.1f} ms")
+        print(f"Overlapping holders: {overlaps}")
+        print(f"Locks left behind:   {still_locked} files, {open_rows} open file_locks rows")
+        ok = overlaps == 0 and still_locked == 0 and open_rows == 0
+        print("\n✓ Mutual exclusion held" if ok else "\n✗ Mutual exclusion violated")
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(vault, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
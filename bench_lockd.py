@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Lock daemon vs direct SQLite benchmark
+
+Simulates a morning check-out storm: N worker processes repeatedly try to
+lock files from a shared pool (many requests hit files someone else holds),
+keep each granted lock briefly and release it. The same workload runs once
+with every request going straight to SQLite and once through `plm lockd`.
+Reports throughput, latency and how many database transactions the daemon
+needed for the requests it served.
+
+Usage: python bench_lockd.py [--workers 32] [--files 64] [--seconds 5] [--tcp]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.db import PLMDatabase, LockConflictError
+from database.lockd import LockDaemon
+
+logging.disable(logging.INFO)
+
+
+def setup_vault(vault: str, file_count: int):
+    """Create a project with file_count parts"""
+    db = PLMDatabase(vault, concurrent=True, use_lockd=False)
+    project = db.create_project("LockdBench", "bench", "Lock daemon benchmark")
+    file_ids = []
+    for i in range(file_count):
+        path = os.path.join(project["vault_path"], "Parts", f"part{i:03d}")
+        os.makedirs(path, exist_ok=True)
+        file_ids.append(db.create_file(project["project_id"], f"part{i:03d}.SLDPRT",
+                                       "PART", path)["file_id"])
+    db.close()
+    return file_ids
+
+
+def worker(vault: str, use_lockd: bool, user: str, file_ids, seconds: float,
+           hold_s: float, start_at: float, out):
+    db = PLMDatabase(vault, pool_size=1, concurrent=True, busy_timeout_ms=10000,
+                     max_retries=20, use_lockd=use_lockd)
+    rng = random.Random(user)
+    ops, granted, conflicts, errors = 0, 0, 0, 0
+    latencies = []
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        file_id = rng.choice(file_ids)
+        t0 = time.perf_counter()
+        try:
+            db.acquire_lock(file_id, user, "Bench")
+        except LockConflictError:
+            conflicts += 1
+            ops += 1
+            latencies.append(time.perf_counter() - t0)
+            continue
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - t0)
+        granted += 1
+        if hold_s:
+            time.sleep(hold_s)
+        try:
+            t0 = time.perf_counter()
+            db.release_lock(file_id, user)
+            latencies.append(time.perf_counter() - t0)
+            ops += 2
+        except Exception:
+            errors += 1
+    db.close()
+    out.put({"ops": ops, "granted": granted, "conflicts": conflicts,
+             "errors": errors, "latencies": latencies})
+
+
+def run(vault: str, file_ids, args, use_lockd: bool):
+    out = mp.Queue()
+    start_at = time.time() + 1.0
+    procs = [mp.Process(target=worker, args=(vault, use_lockd, f"user{i:02d}", file_ids,
+                                             args.seconds, args.hold_ms / 1000, start_at, out))
+             for i in range(args.workers)]
+    for p in procs:
+        p.start()
+    results = [out.get(timeout=args.seconds + 120) for _ in procs]
+    for p in procs:
+        p.join()
+    latencies = sorted(l for r in results for l in r["latencies"])
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        "ops": sum(r["ops"] for r in results),
+        "granted": sum(r["granted"] for r in results),
+        "conflicts": sum(r["conflicts"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+        "p50": pct(0.50),
+        "p99": pct(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lock daemon benchmark")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--hold-ms", type=float, default=5, help="Time each lock is held")
+    parser.add_argument("--tcp", action="store_true", help="Use the TCP transport for the daemon")
+    args = parser.parse_args()
+
+    vault = tempfile.mkdtemp(prefix="plm_bench_lockd_")
+    try:
+        file_ids = setup_vault(vault, args.files)
+
+        direct = run(vault, file_ids, args, use_lockd=False)
+
+        daemon_db = PLMDatabase(vault, concurrent=True, use_lockd=False)
+        daemon = LockDaemon(daemon_db, transport="tcp" if args.tcp else None)
+        daemon.start()
+        try:
+            via_daemon = run(vault, file_ids, args, use_lockd=True)
+            stats = daemon.get_stats()
+        finally:
+            daemon.shutdown()
+            daemon_db.close()
+
+        print(f"{args.workers} processes, {args.files} files, {args.seconds:.0f} s, "
+              f"locks held {args.hold_ms:g} ms, daemon over {daemon.transport}")
+        print(f"\n{'Path':<10} {'Ops/s':>10} {'Granted':>9} {'Conflicts':>10} {'Errors':>7} "
+              f"{'p50 ms':>8} {'p99 ms':>8}")
+        print("-" * 68)
+        for name, r in (("direct", direct), ("lockd", via_daemon)):
+            print(f"{name:<10} {r['ops'] / args.seconds:>10.0f} {r['granted']:>9} {r['conflicts']:>10} "
+                  f"{r['errors']:>7} {r['p50']:>8.2f} {r['p99']:>8.2f}")
+        print(f"\nDaemon: {stats['requests']} requests, {stats['conflicts_from_memory']} conflicts "
+              f"refused without a write ({stats['stale_memory_holders']} stale holders in memory), "
+              f"{stats['batches']} write transactions "
+              f"(mean {stats['mean_batch_size']:.1f} ops each)")
+    finally:
+        shutil.rmtree(vault, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 """Clean up database entries for deleted projects."""
 
+import os
 import sqlite3
 from pathlib import Path
 
+from database.reconcile import norm_path
+
 # Database path
 vault_root = Path("D:\\Anurag\\PLM_VAULT")
 db_path = vault_root / "db.sqlite"
@@ -19,18 +22,32 @@ cursor = conn.cursor()
 cursor.execute("SELECT project_id, name, vault_path FROM projects")
 projects = cursor.fetchall()
 
+# List Projects/ once instead of checking every project folder separately
+projects_root = vault_root / "Projects"
+existing = set()
+if projects_root.is_dir():
+    with os.scandir(projects_root) as entries:
+        existing = {norm_path(entry.path) for entry in entries if entry.is_dir()}
+
+
+def folder_exists(vault_path):
+    """Project folder check against the listing (stat only paths outside Projects/)"""
+    key = norm_path(vault_path)
+    if os.path.dirname(key) == norm_path(str(projects_root)):
+        return key in existing
+    return Path(vault_path).exists()
+
+
 print(f"Found {len(projects)} projects in database:")
 for proj_id, name, vault_path in projects:
-    folder_path = Path(vault_path)
-    exists = folder_path.exists()
+    exists = folder_exists(vault_path)
     status = "✓ EXISTS" if exists else "✗ DELETED"
     print(f"  {name:20s} ({status}) - {vault_path}")
 
 # Find and delete orphaned projects
 deleted_count = 0
 for proj_id, name, vault_path in projects:
-    folder_path = Path(vault_path)
-    if not folder_path.exists():
+    if not folder_exists(vault_path):
         print(f"\nRemoving orphaned entry: {name}")
         
         # Delete from all related tables
@@ -11,18 +11,24 @@ Command-line interface for PLM operations (works without SolidWorks)
 
 import sys
 import os
+import re
 import json
+import time
+import signal
 import argparse
+import itertools
 from typing import Optional
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import sqlite3
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
-from database.db import PLMDatabase
+from database.db import PLMDatabase, LockConflictError
+from database.lockd import LockDaemon, LockdClient
+from database.checksums import ChecksumBackfill
 
 
 class PLMCLI:
@@ -32,7 +38,9 @@ class PLMCLI:
         if not vault_path:
             vault_path = os.getenv("PLM_VAULT_PATH", r"e:\PLM_VAULT")
         self.vault_path = vault_path
-        self.db = PLMDatabase(vault_path)
+        self.concurrent = os.getenv("PLM_DB_CONCURRENT", "0").lower() in ("1", "true", "yes")
+        audit_mode = os.getenv("PLM_AUDIT_MODE", "sync")
+        self.db = PLMDatabase(vault_path, concurrent=self.concurrent, audit_mode=audit_mode)
     
     # ========================
     # PROJECT COMMANDS
@@ -98,17 +106,62 @@ class PLMCLI:
             print(f"  Created: {project['created_date']}")
             print(f"  Vault path: {project['vault_path']}")
             
-            # List files in project
-            files = self.db.list_project_files(project_id)
+            # List files in project with their latest versions
+            files = self.db.list_latest_versions(project_id)
             print(f"\n  Files ({len(files)}):")
             for f in files:
-                print(f"    - {f['file_name']} ({f['plm_id']}) - v{f['current_version']} - {f['lifecycle_state']}")
+                version = f"v{f['version_number']}" if f['version_number'] else "no versions"
+                print(f"    - {f['file_name']} ({f['plm_id']}) - {version} - {f['lifecycle_state']}")
             
             return 0
         except Exception as e:
             print(f"✗ Error getting project info: {e}")
             return 1
     
+    def cmd_project_as_of(self, project_id: int, at: str, state: Optional[str] = None):
+        """Show lifecycle state of a project's versions at a point in time
+        
+        Usage: plm project as-of --id 1 --at "2026-03-31" [--state Released]
+        """
+        try:
+            versions = self.db.as_of(project_id, at, state)
+            
+            if not versions:
+                print(f"No versions {'in ' + state + ' ' if state else ''}at {at}")
+                return 0
+            
+            print(f"\nProject {project_id} as of {at}:")
+            print(f"\n{'File':<30} {'PLM ID':<15} {'Version':<8} {'Created':<19} {'State':<10}")
+            print("-" * 86)
+            for v in versions:
+                version = f"v{v['version_number']}{v['revision_letter'] or ''}"
+                print(f"{v['file_name']:<30} {v['plm_id']:<15} {version:<8} "
+                      f"{v['created_timestamp'][:19]:<19} {v['lifecycle_state']:<10}")
+            
+            print(f"\n{len(versions)} version(s)")
+            return 0
+        except Exception as e:
+            print(f"✗ Error reading lifecycle history: {e}")
+            return 1
+    
+    def cmd_project_checkpoint(self, project_id: Optional[int] = None, min_transitions: int = 0):
+        """Snapshot lifecycle state for fast as-of queries (run periodically)
+        
+        Usage: plm project checkpoint [--id 1] [--min-transitions 1000]
+        """
+        try:
+            created = self.db.create_lifecycle_checkpoint(project_id, min_transitions)
+            if not created:
+                print(f"✓ No checkpoint needed (fewer than {min_transitions} new transitions)")
+                return 0
+            for cp in created:
+                print(f"✓ Checkpoint {cp['checkpoint_id']} for project {cp['project_id']}: "
+                      f"{cp['version_count']} version(s), {cp['new_transitions']} new transition(s)")
+            return 0
+        except Exception as e:
+            print(f"✗ Error creating checkpoint: {e}")
+            return 1
+    
     # ========================
     # FILE COMMANDS
     # ========================
@@ -116,21 +169,24 @@ class PLMCLI:
     def cmd_file_list(self, project_id: int):
         """List files in project"""
         try:
-            files = self.db.list_project_files(project_id)
+            files = self.db.iter_project_files(project_id)
+            first = next(files, None)
             
-            if not files:
+            if first is None:
                 print(f"No files in project {project_id}")
                 return 0
             
             print(f"\n{'PLM ID':<15} {'File Name':<25} {'Type':<10} {'Ver':<3} {'State':<12} {'Lock':<15}")
             print("-" * 85)
             
-            for f in files:
+            count = 0
+            for f in itertools.chain([first], files):
                 lock_info = f["locked_by"] or "-"
                 print(f"{f['plm_id']:<15} {f['file_name']:<25} {f['file_type']:<10} " 
                       f"{f['current_version']:<3} {f['lifecycle_state']:<12} {lock_info:<15}")
+                count += 1
             
-            print(f"\nTotal: {len(files)} files")
+            print(f"\nTotal: {count} files")
             return 0
         except Exception as e:
             print(f"✗ Error listing files: {e}")
@@ -154,12 +210,11 @@ class PLMCLI:
             print(f"  Vault path: {file['vault_path']}")
             
             # List versions
-            versions = self.db.list_file_versions(file_id)
-            print(f"\n  Version History ({len(versions)}):")
+            print(f"\n  Version History (latest: v{file['current_version']}):")
             print(f"  {'Ver':<4} {'Rev':<3} {'Author':<15} {'Created':<19} {'State':<12} {'Note':<50}")
             print("  " + "-" * 100)
             
-            for v in versions:
+            for v in self.db.iter_file_versions(file_id):
                 created = v["created_timestamp"][:10] if v["created_timestamp"] else "N/A"
                 note = (v["change_note"] or "")[:50]
                 rev = v["revision_letter"] or "-"
@@ -171,6 +226,38 @@ class PLMCLI:
             print(f"✗ Error getting file info: {e}")
             return 1
     
+    def cmd_search(self, query: str, project_id: Optional[int] = None, limit: int = 20,
+                   rebuild: bool = False):
+        """Full-text search over files, change notes and properties
+        
+        Usage: plm search "bracket m4" [--project-id 1] [--limit 20] [--rebuild]
+        """
+        try:
+            if rebuild:
+                count = self.db.rebuild_search_index()
+                print(f"✓ Rebuilt search index ({count} entries)")
+                if not query:
+                    return 0
+            
+            results = self.db.search(query or "", project_id, limit)
+            if not results:
+                print(f"No files match '{query}'")
+                return 0
+            
+            print(f"\n{'PLM ID':<15} {'File Name':<25} {'Type':<10} {'Ver':<4} {'Hits':<5} {'Description':<30}")
+            print("-" * 92)
+            for r in results:
+                best = f"v{r['best_version']}" if r["best_version"] else "-"
+                description = (r["description"] or "")[:30]
+                print(f"{r['plm_id']:<15} {r['file_name']:<25} {r['file_type']:<10} {best:<4} "
+                      f"{r['hits']:<5} {description:<30}")
+            
+            print(f"\n{len(results)} file(s)")
+            return 0
+        except Exception as e:
+            print(f"✗ Error searching: {e}")
+            return 1
+    
     # ========================
     # VERSION COMMANDS
     # ========================
@@ -183,13 +270,11 @@ class PLMCLI:
                 print(f"✗ File {file_id} not found")
                 return 1
             
-            versions = self.db.list_file_versions(file_id)
-            
             print(f"\nVersions of {file['file_name']} ({file['plm_id']}):")
             print(f"\n{'Ver':<4} {'Rev':<4} {'Author':<15} {'Created':<19} {'State':<12} {'Size':<10} {'Note':<50}")
             print("-" * 110)
             
-            for v in versions:
+            for v in self.db.iter_file_versions(file_id):
                 created = v["created_timestamp"][:16] if v["created_timestamp"] else "N/A"
                 rev = v["revision_letter"] or "-"
                 size_kb = (v["file_size_bytes"] or 0) // 1024
@@ -215,16 +300,11 @@ class PLMCLI:
                 return 1
             
             # Get version ID
-            versions = self.db.list_file_versions(file_id)
-            version_id = None
-            for v in versions:
-                if v["version_number"] == version_num:
-                    version_id = v["version_id"]
-                    break
-            
-            if not version_id:
+            version = self.db.get_version_by_number(file_id, version_num)
+            if not version:
                 print(f"✗ Version {version_num} not found")
                 return 1
+            version_id = version["version_id"]
             
             # Check valid state
             if new_state not in ["In-Work", "Released", "Obsolete"]:
@@ -232,7 +312,9 @@ class PLMCLI:
                 return 1
             
             # Promote
-            self.db.promote_version(version_id, new_state, user, note)
+            if not self.db.promote_version(version_id, new_state, user, note):
+                print(f"✓ {file['file_name']} v{version_num} is already {new_state}")
+                return 0
             
             print(f"✓ Promoted {file['file_name']} v{version_num} → {new_state}")
             print(f"  Promoted by: {user}")
@@ -244,6 +326,33 @@ class PLMCLI:
             print(f"✗ Error promoting version: {e}")
             return 1
     
+    def cmd_version_promote_assembly(self, assembly_id: int, new_state: str, user: str,
+                                     note: str = "", version_num: Optional[int] = None,
+                                     recursive: bool = False):
+        """Promote an assembly version together with the component versions it pins
+        
+        Usage: plm version promote --assembly 12 --recursive --state Released --user john.smith
+        """
+        try:
+            assembly = self.db.get_file(assembly_id)
+            if not assembly:
+                print(f"✗ File {assembly_id} not found")
+                return 1
+            
+            report = self.db.promote_assembly(assembly_id, new_state, user, note,
+                                              version_number=version_num, recursive=recursive)
+            
+            print(f"✓ Promoted {len(report['promoted'])} version(s) of {assembly['file_name']} → {new_state}")
+            for v in report["promoted"]:
+                print(f"  {v['file_name']:<30} v{v['version_number']:03d}  {v['lifecycle_state']} → {new_state}")
+            if report["unchanged"]:
+                print(f"  {report['unchanged']} version(s) already {new_state}")
+            print(f"  Promoted by: {user}")
+            return 0
+        except Exception as e:
+            print(f"✗ Error promoting assembly: {e}")
+            return 1
+    
     def cmd_version_freeze(self, file_id: int, version_num: int, user: str):
         """Freeze version (make read-only) and release lock
         
@@ -271,18 +380,72 @@ class PLMCLI:
             print(f"✗ Error freezing version: {e}")
             return 1
     
+    def cmd_version_find(self, props: List[str], state: Optional[str] = None,
+                         file_type: Optional[str] = None, project_id: Optional[int] = None,
+                         latest: bool = False, limit: int = 100):
+        """Find versions by property values
+        
+        Usage: plm version find --prop Material=6061 --prop "Mass>=0.5" --prop "Mass<=2"
+                                [--state Released] [--type PART] [--latest]
+        """
+        try:
+            filters: Dict[str, Any] = {}
+            for prop in props:
+                match = re.match(r"^\s*([^<>=!]+?)\s*(>=|<=|!=|>|<|=)\s*(.*)$", prop)
+                if not match:
+                    print(f"✗ Invalid property filter: {prop} (use KEY=VALUE or KEY>=NUMBER)")
+                    return 1
+                key, op, value = match.groups()
+                if op == "=":
+                    filters[key] = value
+                else:
+                    condition = filters.setdefault(key, {})
+                    if not isinstance(condition, dict):
+                        print(f"✗ Cannot combine '{key}={condition}' with a comparison")
+                        return 1
+                    condition[op] = float(value)
+            
+            versions = self.db.find_versions_by_properties(
+                filters, lifecycle_state=state, file_type=file_type, project_id=project_id,
+                latest_only=latest, limit=limit
+            )
+            if not versions:
+                print("No versions match")
+                return 0
+            
+            print(f"\n{'PLM ID':<15} {'File Name':<25} {'Type':<10} {'Ver':<4} {'State':<12} {'Author':<15}")
+            print("-" * 85)
+            for v in versions:
+                print(f"{v['plm_id']:<15} {v['file_name']:<25} {v['file_type']:<10} "
+                      f"{v['version_number']:<4} {v['lifecycle_state']:<12} {v['author']:<15}")
+            
+            print(f"\n{len(versions)} version(s)")
+            return 0
+        except Exception as e:
+            print(f"✗ Error finding versions: {e}")
+            return 1
+    
     # ========================
     # ASSEMBLY COMMANDS
     # ========================
     
-    def cmd_assembly_bom(self, assembly_file_id: int):
-        """Show assembly bill of materials (BOM)"""
+    def cmd_assembly_bom(self, assembly_file_id: int, multi_level: bool = False,
+                         flat: bool = False, max_depth: Optional[int] = None):
+        """Show assembly bill of materials (BOM)
+        
+        Usage: plm assembly bom --id 7 [--multi-level [--max-depth 3] | --flat]
+        """
         try:
             assembly = self.db.get_file(assembly_file_id)
             if not assembly:
                 print(f"✗ Assembly {assembly_file_id} not found")
                 return 1
             
+            if flat:
+                return self._print_flat_bom(assembly, max_depth)
+            if multi_level:
+                return self._print_indented_bom(assembly, max_depth)
+            
             bom = self.db.get_assembly_bom(assembly_file_id)
             
             print(f"\nBOM for {assembly['file_name']} ({assembly['plm_id']})")
@@ -302,6 +465,80 @@ class PLMCLI:
             print(f"✗ Error getting BOM: {e}")
             return 1
     
+    def _print_indented_bom(self, assembly: dict, max_depth: Optional[int]):
+        """Print multi-level BOM as an indented tree"""
+        bom = self.db.explode_bom(assembly["file_id"], max_depth=max_depth)
+        
+        print(f"\nMulti-level BOM for {assembly['file_name']} ({assembly['plm_id']})")
+        print(f"\n{'Lvl':<4} {'Component':<35} {'PLM ID':<15} {'Ver':<4} {'Qty':<5} {'Ext Qty':<7}")
+        print("-" * 75)
+        
+        for item in bom:
+            name = ("  " * (item["depth"] - 1) + item["component_name"])[:35]
+            print(f"{item['depth']:<4} {name:<35} {item['component_plm_id']:<15} "
+                  f"{item['component_version']:<4} {item['instance_count']:<5} {item['extended_qty']:<7}")
+        
+        print("-" * 75)
+        levels = max((item["depth"] for item in bom), default=0)
+        print(f"Total lines: {len(bom)}, Levels: {levels}")
+        return 0
+    
+    def _print_flat_bom(self, assembly: dict, max_depth: Optional[int]):
+        """Print summarised (flattened) BOM with extended quantities"""
+        bom = self.db.explode_bom(assembly["file_id"], max_depth=max_depth, flat=True)
+        
+        print(f"\nFlat BOM for {assembly['file_name']} ({assembly['plm_id']})")
+        print(f"\n{'Component':<25} {'PLM ID':<15} {'Type':<9} {'Ver':<4} {'Total Qty':<9}")
+        print("-" * 66)
+        
+        for item in bom:
+            print(f"{item['component_name']:<25} {item['component_plm_id']:<15} "
+                  f"{item['component_type']:<9} {item['component_version']:<4} {item['total_qty']:<9}")
+        
+        print("-" * 66)
+        print(f"Distinct components: {len(bom)}, Total qty: {sum(i['total_qty'] for i in bom)}")
+        return 0
+    
+    def cmd_assembly_where_used(self, component_file_id: int, direct_only: bool = False,
+                                component_version: Optional[int] = None):
+        """Show every assembly that uses a component (reverse BOM)
+        
+        Usage: plm assembly where-used --id 12 [--version 3] [--direct]
+        """
+        try:
+            component = self.db.get_file(component_file_id)
+            if not component:
+                print(f"✗ File {component_file_id} not found")
+                return 1
+            
+            usages = self.db.where_used(component_file_id, transitive=not direct_only,
+                                        component_version=component_version)
+            
+            pinned = f" v{component_version}" if component_version else ""
+            print(f"\nWhere used: {component['file_name']}{pinned} ({component['plm_id']})")
+            
+            if not usages:
+                print("Not used in any assembly")
+                return 0
+            
+            names = {component_file_id: component["file_name"]}
+            names.update({u["assembly_file_id"]: u["assembly_name"] for u in usages})
+            
+            print(f"\n{'Lvl':<4} {'Assembly':<30} {'PLM ID':<15} {'State':<10} {'Uses':<25} {'Ver':<4} {'Qty':<4}")
+            print("-" * 96)
+            for u in usages:
+                print(f"{u['depth']:<4} {u['assembly_name'][:30]:<30} {u['assembly_plm_id']:<15} "
+                      f"{u['assembly_lifecycle_state']:<10} {names.get(u['via_file_id'], '?')[:25]:<25} "
+                      f"{u['component_version']:<4} {u['instance_count']:<4}")
+            
+            distinct = len({u["assembly_file_id"] for u in usages})
+            print("-" * 96)
+            print(f"Assemblies affected: {distinct}")
+            return 0
+        except Exception as e:
+            print(f"✗ Error getting where-used: {e}")
+            return 1
+    
     # ========================
     # LOCK COMMANDS
     # ========================
@@ -316,12 +553,13 @@ class PLMCLI:
                 return 0
             
             print(f"\nActive Locks:")
-            print(f"\n{'File':<25} {'Locked By':<15} {'Since':<19} {'Age (hrs)':<10}")
-            print("-" * 70)
+            print(f"\n{'File':<25} {'Locked By':<15} {'Since':<19} {'Expires':<19} {'Age (hrs)':<10}")
+            print("-" * 90)
             
             for lock in locks:
                 timestamp = lock["lock_timestamp"][:16] if lock["lock_timestamp"] else "N/A"
-                print(f"{lock['file_name']:<25} {lock['locked_by']:<15} {timestamp:<19} "
+                expires = lock["expires_at"][:16] if lock["expires_at"] else "N/A"
+                print(f"{lock['file_name']:<25} {lock['locked_by']:<15} {timestamp:<19} {expires:<19} "
                       f"{lock['hours_locked']:<10}")
             
             return 0
@@ -329,16 +567,111 @@ class PLMCLI:
             print(f"✗ Error listing locks: {e}")
             return 1
     
-    def cmd_lock_clean(self, max_age_hours: int = 24):
-        """Clean stale locks (older than N hours)"""
+    def _lock_targets(self, file_ids: Optional[List[int]], assembly_id: Optional[int],
+                      recursive: bool) -> List[int]:
+        """File IDs named on the command line plus an assembly (sub)tree"""
+        targets = list(file_ids or [])
+        if assembly_id is not None:
+            targets.extend(self.db.get_assembly_file_ids(assembly_id, recursive=recursive))
+        return sorted(set(targets))
+    
+    def cmd_lock_acquire(self, user: str, file_ids: Optional[List[int]] = None,
+                         assembly_id: Optional[int] = None, recursive: bool = False,
+                         reason: str = "Edit"):
+        """Lock files (or a whole assembly) atomically
+        
+        Usage: plm lock acquire --assembly 12 --recursive --user john.smith
+        """
+        try:
+            targets = self._lock_targets(file_ids, assembly_id, recursive)
+            if not targets:
+                print("✗ Nothing to lock (use --file-id or --assembly)")
+                return 1
+            sessions = self.db.acquire_locks(targets, user, reason)
+            print(f"✓ Locked {len(sessions)} file(s) for {user}")
+            return 0
+        except LockConflictError as e:
+            print(f"✗ No files locked; {len(e.conflicts)} held by other users:")
+            for file_id, holder in sorted(e.conflicts.items()):
+                file = self.db.get_file(file_id)
+                name = file["file_name"] if file else f"file {file_id}"
+                print(f"  {name:<30} locked by {holder}")
+            return 1
+        except Exception as e:
+            print(f"✗ Error acquiring locks: {e}")
+            return 1
+    
+    def cmd_lock_release(self, user: str, file_ids: Optional[List[int]] = None,
+                         assembly_id: Optional[int] = None, recursive: bool = False):
+        """Release user's locks on files (or a whole assembly)"""
+        try:
+            targets = self._lock_targets(file_ids, assembly_id, recursive)
+            if not targets:
+                print("✗ Nothing to release (use --file-id or --assembly)")
+                return 1
+            self.db.release_locks(targets, user)
+            print(f"✓ Released locks on {len(targets)} file(s) for {user}")
+            return 0
+        except Exception as e:
+            print(f"✗ Error releasing locks: {e}")
+            return 1
+    
+    def cmd_lock_clean(self, max_age_hours: Optional[int] = None):
+        """Clean stale locks (lapsed leases, optionally also older than N hours)"""
         try:
             count = self.db.clean_stale_locks(max_age_hours)
-            print(f"✓ Cleaned {count} stale lock(s) (older than {max_age_hours} hours)")
+            if max_age_hours is None:
+                print(f"✓ Cleaned {count} stale lock(s) (lease expired)")
+            else:
+                print(f"✓ Cleaned {count} stale lock(s) (lease expired or older than {max_age_hours} hours)")
             return 0
         except Exception as e:
             print(f"✗ Error cleaning locks: {e}")
             return 1
     
+    def cmd_lockd(self, tcp: bool = False, port: int = 0, refresh: float = 5.0,
+                  status: bool = False):
+        """Run the lock daemon for this vault in the foreground (Ctrl+C stops it)
+        
+        Usage: plm lockd [--tcp] [--port 0] [--refresh 5]
+               plm lockd --status
+        """
+        try:
+            if status:
+                client = LockdClient(self.vault_path)
+                if not client.available():
+                    print("Lock daemon not running")
+                    return 1
+                stats = client.call("stats")["stats"]
+                client.close()
+                print("✓ Lock daemon running")
+                print(f"  Active locks:      {stats['active_locks']}")
+                print(f"  Requests:          {stats['requests']}")
+                print(f"  Memory conflicts:  {stats['conflicts_from_memory']}")
+                print(f"  Stale in memory:   {stats['stale_memory_holders']}")
+                print(f"  Write batches:     {stats['batches']} (mean {stats['mean_batch_size']:.1f} ops)")
+                return 0
+            
+            db = PLMDatabase(self.vault_path, concurrent=self.concurrent, use_lockd=False)
+            daemon = LockDaemon(db, transport="tcp" if tcp else None, port=port,
+                                refresh_interval=refresh)
+            daemon.start()
+            print(f"✓ Lock daemon listening on {daemon.describe_address()} (Ctrl+C to stop)")
+            # A service manager stops the daemon with SIGTERM; shut down cleanly as on Ctrl+C
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+            daemon.shutdown()
+            db.close()
+            print("✓ Lock daemon stopped")
+            return 0
+        except Exception as e:
+            print(f"✗ Lock daemon error: {e}")
+            return 1
+    
     # ========================
     # VAULT COMMANDS
     # ========================
@@ -356,6 +689,12 @@ class PLMCLI:
             print(f"Missing checksums:  {integrity['missing_checksums']}")
             print(f"Stale locks:        {integrity['stale_locks']}")
             
+            concurrency = self.db.get_concurrency_stats()
+            print(f"Journal mode:       {concurrency['journal_mode']}")
+            if concurrency['concurrent']:
+                print(f"Busy retries:       {concurrency['retries']} "
+                      f"({concurrency['retried_operations']} operations, {concurrency['failures']} failed)")
+            
             # Warning for issues
             if integrity['orphaned_versions'] > 0:
                 print(f"\n⚠ Warning: {integrity['orphaned_versions']} orphaned versions found")
@@ -372,29 +711,239 @@ class PLMCLI:
             print(f"✗ Error checking vault: {e}")
             return 1
     
-    def cmd_audit_log(self, file_id: Optional[int] = None, user: Optional[str] = None, limit: int = 50):
+    def cmd_vault_checksum(self, backfill: bool = False, workers: Optional[int] = None,
+                           batch_size: int = 200, limit: Optional[int] = None):
+        """Report or backfill missing version checksums
+        
+        Usage: plm vault checksum --backfill [--workers 8] [--batch-size 200]
+        """
+        try:
+            missing = self.db.validate_vault_integrity()["missing_checksums"]
+            if not backfill:
+                print(f"Versions missing checksums: {missing}")
+                if missing:
+                    print("Run 'plm vault checksum --backfill' to compute them")
+                return 0
+            
+            if not missing:
+                print("✓ All versions already have checksums")
+                return 0
+            
+            print(f"Backfilling checksums for {missing} version(s)...")
+            
+            def report(stats):
+                print(f"  {stats['hashed']} hashed, {stats['missing']} missing files, "
+                      f"{stats['mb_per_sec']:.1f} MB/s, {stats['files_per_sec']:.1f} files/s")
+            
+            engine = ChecksumBackfill(self.db, workers=workers, batch_size=batch_size)
+            stats = engine.run(limit=limit, progress=report)
+            
+            print(f"✓ Hashed {stats['hashed']} version(s), "
+                  f"{stats['bytes'] / (1024 * 1024):.1f} MB in {stats['elapsed_s']:.1f}s")
+            if stats["missing"]:
+                print(f"⚠ Warning: {stats['missing']} version file(s) not found or unreadable")
+            return 0
+        except Exception as e:
+            print(f"✗ Error computing checksums: {e}")
+            return 1
+    
+    def cmd_vault_dedupe(self, dry_run: bool = False, allow_pointers: bool = False):
+        """Deduplicate version copies into the content-addressable blob store
+        
+        Usage: plm vault dedupe [--dry-run] [--allow-pointers]
+        """
+        try:
+            print("Scanning version files" + (" (dry run)..." if dry_run else "..."))
+            result = self.db.deduplicate_vault(dry_run=dry_run, allow_pointers=allow_pointers)
+            
+            verb = "Would reclaim" if dry_run else "Reclaimed"
+            print(f"✓ {result['versions']} version(s) scanned, {result['new_blobs']} unique blob(s), "
+                  f"{result['deduplicated']} duplicate(s), {result['already_linked']} already linked")
+            print(f"  {verb} {result['bytes_reclaimed'] / (1024 * 1024):.1f} MB")
+            if result["missing"]:
+                print(f"⚠ Warning: {result['missing']} version file(s) not found")
+            if result["failed"]:
+                print(f"⚠ Warning: {result['failed']} file(s) could not be hardlinked "
+                      f"(use --allow-pointers on filesystems without hardlinks)")
+            return 0
+        except Exception as e:
+            print(f"✗ Error deduplicating vault: {e}")
+            return 1
+    
+    def cmd_vault_reconcile(self, repair: bool = False, full: bool = False):
+        """Compare the vault folders with the database
+        
+        Usage: plm vault reconcile [--repair] [--full]
+        """
+        try:
+            report = self.db.reconcile_vault(repair=repair, full=full)
+            scan = report["scan"]
+            print(f"Scanned {scan['dirs']} folder(s) in {scan['elapsed_s']:.2f}s "
+                  f"({scan['listed']} listed, {scan['reused']} unchanged)")
+            
+            print(f"\nIn database, missing on disk:")
+            for p in report["missing_projects"]:
+                print(f"  project  {p['plm_id']:<15} {p['vault_path']}")
+            for f in report["missing_files"]:
+                print(f"  file     {f['plm_id']:<15} {f['vault_path']}")
+            for v in report["missing_versions"]:
+                print(f"  version  file {v['file_id']} v{v['version_number']:03d}  {v['file_path'] or '-'}")
+            if not (report["missing_projects"] or report["missing_files"] or report["missing_versions"]):
+                print("  (none)")
+            
+            print(f"\nOn disk, not in database:")
+            for path in report["untracked_projects"]:
+                print(f"  project  {path}")
+            for path in report["untracked_parts"]:
+                print(f"  part     {path}")
+            for u in report["untracked_versions"]:
+                print(f"  version  file {u['file_id']} v{u['version_number']:03d}  {u['path']}")
+            if not (report["untracked_projects"] or report["untracked_parts"] or report["untracked_versions"]):
+                print("  (none)")
+            
+            if report["writable_blobs"]:
+                print(f"\nWritable blobs (shared version files editable in place):")
+                for digest in report["writable_blobs"]:
+                    print(f"  blob     {digest}")
+            
+            if repair:
+                repaired = report["repaired"]
+                print(f"\n✓ Deactivated {repaired['projects_deactivated']} project(s) and "
+                      f"{repaired['files_deactivated']} file(s), registered "
+                      f"{repaired['versions_registered']} version(s), made "
+                      f"{repaired['blobs_protected']} blob(s) read-only")
+            elif (report["missing_projects"] or report["missing_files"] or report["untracked_versions"]
+                  or report["writable_blobs"]):
+                print("\nRun 'plm vault reconcile --repair' to fix database orphans")
+            return 0
+        except Exception as e:
+            print(f"✗ Error reconciling vault: {e}")
+            return 1
+    
+    def cmd_vault_backup(self, compress: bool = False, pages: int = 256, if_due: bool = False,
+                         list_only: bool = False, keep_all: bool = False):
+        """Online backup of the vault database
+        
+        Usage: plm vault backup [--compress] [--if-due] [--list]
+        """
+        try:
+            if not list_only:
+                result = self.db.backup_database(compress=compress, pages=pages, if_due=if_due,
+                                                 apply_retention=not keep_all)
+                if result is None:
+                    print("Backup not due yet")
+                else:
+                    print(f"✓ Backup written: {result['path']}")
+                    print(f"  {result['size_bytes'] / (1024 * 1024):.1f} MB, {result['pages']} pages, "
+                          f"{result['steps']} step(s), {result['elapsed_s']:.1f}s "
+                          f"({result['journal_mode']} journal)")
+                    if result["restarts"]:
+                        print(f"  Restarted {result['restarts']} time(s) by concurrent writes")
+                    if result["deleted"]:
+                        print(f"  Removed {len(result['deleted'])} expired backup(s)")
+            
+            backups = self.db.list_backups()
+            if list_only or backups:
+                print(f"\n{'Created':<20} {'Size (MB)':>10}  {'File'}")
+                print("-" * 70)
+                for b in backups:
+                    print(f"{b['created']:%Y-%m-%d %H:%M:%S}  {b['size_bytes'] / (1024 * 1024):>10.1f}  "
+                          f"{os.path.basename(b['path'])}")
+            return 0
+        except Exception as e:
+            print(f"✗ Error backing up database: {e}")
+            return 1
+    
+    def cmd_audit_log(self, file_id: Optional[int] = None, user: Optional[str] = None, limit: int = 50,
+                      since: Optional[str] = None, until: Optional[str] = None):
         """Show audit log"""
         try:
-            logs = self.db.get_audit_trail(file_id, user, limit)
+            logs = itertools.islice(
+                self.db.iter_audit_trail(file_id, user, since=since, until=until), limit
+            )
+            first = next(logs, None)
             
-            if not logs:
+            if first is None:
                 print("No audit log entries")
                 return 0
             
-            print(f"\nAudit Trail ({len(logs)} entries):")
+            print(f"\nAudit Trail:")
             print(f"\n{'Timestamp':<19} {'User':<15} {'Action':<12} {'File':<25}")
             print("-" * 72)
             
-            for log in logs:
+            count = 0
+            for log in itertools.chain([first], logs):
                 timestamp = log["action_timestamp"][:19] if log["action_timestamp"] else "N/A"
                 print(f"{timestamp:<19} {log['user']:<15} {log['action']:<12} "
-                      f"{log.get('file_id', '-'):<25}")
+                      f"{log['file_id'] or '-':<25}")
+                count += 1
             
+            print(f"\n{count} entries")
             return 0
         except Exception as e:
             print(f"✗ Error reading audit log: {e}")
             return 1
     
+    def cmd_audit_archive(self, hot_months: int = 3, purge_months: Optional[int] = None):
+        """Move cold audit months out of the hot database
+        
+        Usage: plm vault audit-archive --hot-months 3 [--purge-months 24]
+        """
+        try:
+            result = self.db.archive_audit_log(hot_months, purge_months)
+            print(f"✓ Archived {result['rows_archived']} audit record(s) "
+                  f"into {result['partitions_archived']} monthly partition(s)")
+            if purge_months is not None:
+                print(f"  Purged {result['partitions_purged']} partition(s) older than "
+                      f"{purge_months} months ({result['bytes_purged'] // 1024} KB)")
+            
+            partitions = self.db.list_audit_partitions()
+            if partitions:
+                print(f"\n{'Month':<8} {'Rows':<10} {'Archive file'}")
+                print("-" * 70)
+                for p in partitions:
+                    print(f"{p['partition_key']:<8} {p['row_count']:<10} {p['file_path']}")
+            return 0
+        except Exception as e:
+            print(f"✗ Error archiving audit log: {e}")
+            return 1
+    
+    def cmd_vault_changes(self, since: int = 0, limit: int = 100, tables: Optional[List[str]] = None,
+                          prune_before: Optional[int] = None, older_than_days: Optional[int] = None):
+        """Show change log entries after a sequence number, or prune old ones
+        
+        Usage: plm vault changes [--since SEQ] [--limit N] [--table files]
+               plm vault changes --prune SEQ | --older-than-days N
+        """
+        try:
+            if prune_before is not None or older_than_days is not None:
+                count = self.db.prune_change_log(prune_before, older_than_days)
+                print(f"✓ Pruned {count} change log entries")
+                print(f"  Oldest kept seq: {self.db.get_first_change_seq() or '-'}, "
+                      f"latest: {self.db.get_change_seq()}")
+                return 0
+            
+            first = self.db.get_first_change_seq()
+            if since and first > since + 1:
+                print(f"⚠ Changes before seq {first} were pruned; take a full snapshot "
+                      f"before resuming from seq {first - 1}")
+            changes = self.db.changes_since(since, limit, tables)
+            if not changes:
+                print(f"No changes after seq {since} (latest: {self.db.get_change_seq()})")
+                return 0
+            
+            print(f"\n{'Seq':<10} {'Changed':<19} {'Table':<24} {'Row':<10} {'Operation'}")
+            print("-" * 75)
+            for c in changes:
+                print(f"{c['seq']:<10} {c['changed_at'][:19]:<19} {c['table_name']:<24} "
+                      f"{c['row_id']:<10} {c['operation']}")
+            
+            print(f"\n{len(changes)} change(s), resume with --since {changes[-1]['seq']}")
+            return 0
+        except Exception as e:
+            print(f"✗ Error reading change log: {e}")
+            return 1
+    
     # ========================
     # MAIN CLI ENTRY
     # ========================
@@ -422,6 +971,18 @@ class PLMCLI:
         proj_info = proj_sub.add_parser("info", help="Show project details")
         proj_info.add_argument("--id", type=int, required=True, help="Project ID")
         
+        proj_as_of = proj_sub.add_parser("as-of", help="Show lifecycle state at a point in time")
+        proj_as_of.add_argument("--id", type=int, required=True, help="Project ID")
+        proj_as_of.add_argument("--at", required=True,
+                                help="UTC time (YYYY-MM-DD[ HH:MM:SS]; a bare date means end of day)")
+        proj_as_of.add_argument("--state", choices=["In-Work", "Released", "Obsolete"],
+                                help="Only versions in this state")
+        
+        proj_checkpoint = proj_sub.add_parser("checkpoint", help="Snapshot lifecycle state for as-of queries")
+        proj_checkpoint.add_argument("--id", type=int, help="Project ID (default: all projects)")
+        proj_checkpoint.add_argument("--min-transitions", type=int, default=0,
+                                     help="Skip projects with fewer new transitions since their last checkpoint")
+        
         # FILE commands
         file_parser = subparsers.add_parser("file", help="File management")
         file_sub = file_parser.add_subparsers(dest="file_command")
@@ -440,18 +1001,42 @@ class PLMCLI:
         ver_list.add_argument("--file-id", type=int, required=True, help="File ID")
         
         ver_promote = ver_sub.add_parser("promote", help="Promote version to new state")
-        ver_promote.add_argument("--file-id", type=int, required=True, help="File ID")
-        ver_promote.add_argument("--version", type=int, required=True, help="Version number")
+        ver_promote_target = ver_promote.add_mutually_exclusive_group(required=True)
+        ver_promote_target.add_argument("--file-id", type=int, help="File ID")
+        ver_promote_target.add_argument("--assembly", type=int,
+                                        help="Assembly file ID (promotes the pinned component versions too)")
+        ver_promote.add_argument("--version", type=int,
+                                 help="Version number (required with --file-id; assembly default: latest; "
+                                      "components are always the assembly's newest pins)")
+        ver_promote.add_argument("--recursive", action="store_true",
+                                 help="With --assembly: include sub-assembly components at every level")
         ver_promote.add_argument("--state", required=True, help="New state (In-Work|Released|Obsolete)")
         ver_promote.add_argument("--user", required=True, help="Promoted by (username)")
         ver_promote.add_argument("--note", default="", help="Promotion note")
         
+        ver_find = ver_sub.add_parser("find", help="Find versions by property values")
+        ver_find.add_argument("--prop", action="append", required=True,
+                              help="KEY=VALUE or KEY>=NUMBER (>, >=, <, <=, !=); repeatable")
+        ver_find.add_argument("--state", help="Lifecycle state (In-Work|Released|Obsolete)")
+        ver_find.add_argument("--type", help="File type (PART|ASSEMBLY|DRAWING|OTHER)")
+        ver_find.add_argument("--project-id", type=int, help="Restrict to one project")
+        ver_find.add_argument("--latest", action="store_true", help="Only latest version of each file")
+        ver_find.add_argument("--limit", type=int, default=100, help="Maximum results")
+        
         # ASSEMBLY commands
         asm_parser = subparsers.add_parser("assembly", help="Assembly management")
         asm_sub = asm_parser.add_subparsers(dest="assembly_command")
         
         asm_bom = asm_sub.add_parser("bom", help="Show assembly BOM")
         asm_bom.add_argument("--id", type=int, required=True, help="Assembly file ID")
+        asm_bom.add_argument("--multi-level", action="store_true", help="Explode all levels as an indented tree")
+        asm_bom.add_argument("--flat", action="store_true", help="Summarise all levels per component")
+        asm_bom.add_argument("--max-depth", type=int, help="Deepest level to expand")
+        
+        asm_used = asm_sub.add_parser("where-used", help="Show assemblies that use a component")
+        asm_used.add_argument("--id", type=int, required=True, help="Component file ID")
+        asm_used.add_argument("--version", type=int, help="Only usages pinned to this component version")
+        asm_used.add_argument("--direct", action="store_true", help="Direct parents only (no transitive walk)")
         
         # LOCK commands
         lock_parser = subparsers.add_parser("lock", help="Lock management")
@@ -459,8 +1044,34 @@ class PLMCLI:
         
         lock_list = lock_sub.add_parser("list", help="List active locks")
         
+        for name, help_text in (("acquire", "Lock files or an assembly, all or nothing"),
+                                ("release", "Release locks on files or an assembly")):
+            lock_cmd = lock_sub.add_parser(name, help=help_text)
+            lock_cmd.add_argument("--user", required=True, help="Lock owner (username)")
+            lock_cmd.add_argument("--file-id", type=int, action="append", help="File ID (repeatable)")
+            lock_cmd.add_argument("--assembly", type=int, help="Assembly file ID (includes its components)")
+            lock_cmd.add_argument("--recursive", action="store_true",
+                                  help="Include components of sub-assemblies at every level")
+            if name == "acquire":
+                lock_cmd.add_argument("--reason", default="Edit", help="Lock reason")
+        
         lock_clean = lock_sub.add_parser("clean", help="Clean stale locks")
-        lock_clean.add_argument("--max-age", type=int, default=24, help="Max age in hours (default: 24)")
+        lock_clean.add_argument("--max-age", type=int, help="Also clean locks older than N hours, even if renewed")
+        
+        # LOCKD command
+        lockd_parser = subparsers.add_parser("lockd", help="Run the local lock daemon")
+        lockd_parser.add_argument("--tcp", action="store_true", help="Listen on TCP localhost instead of a Unix socket")
+        lockd_parser.add_argument("--port", type=int, default=0, help="TCP port (default: any free port)")
+        lockd_parser.add_argument("--refresh", type=float, default=5.0,
+                                  help="Seconds between lease expiry and reload from the database")
+        lockd_parser.add_argument("--status", action="store_true", help="Show the running daemon's counters")
+        
+        # SEARCH command
+        search_parser = subparsers.add_parser("search", help="Full-text search for files")
+        search_parser.add_argument("query", nargs="?", default="", help="Search words")
+        search_parser.add_argument("--project-id", type=int, help="Restrict to one project")
+        search_parser.add_argument("--limit", type=int, default=20, help="Maximum results")
+        search_parser.add_argument("--rebuild", action="store_true", help="Rebuild the search index first")
         
         # VAULT commands
         vault_parser = subparsers.add_parser("vault", help="Vault management")
@@ -468,10 +1079,52 @@ class PLMCLI:
         
         vault_status = vault_sub.add_parser("status", help="Show vault integrity status")
         
+        vault_checksum = vault_sub.add_parser("checksum", help="Report or backfill version checksums")
+        vault_checksum.add_argument("--backfill", action="store_true", help="Compute missing checksums")
+        vault_checksum.add_argument("--workers", type=int, help="Hashing processes (default: CPU count)")
+        vault_checksum.add_argument("--batch-size", type=int, default=200, help="Versions per write-back batch")
+        vault_checksum.add_argument("--limit", type=int, help="Stop after N versions")
+        
+        vault_dedupe = vault_sub.add_parser("dedupe", help="Store identical version copies once (hardlinked blobs)")
+        vault_dedupe.add_argument("--dry-run", action="store_true", help="Only report reclaimable space")
+        vault_dedupe.add_argument("--allow-pointers", action="store_true",
+                                  help="Point versions at blobs where hardlinks are unsupported")
+        
+        vault_reconcile = vault_sub.add_parser("reconcile", help="Compare vault folders with the database")
+        vault_reconcile.add_argument("--repair", action="store_true",
+                                     help="Deactivate orphaned rows and register untracked versions")
+        vault_reconcile.add_argument("--full", action="store_true", help="Ignore the folder scan cache")
+        
+        vault_backup = vault_sub.add_parser("backup", help="Online backup of the vault database")
+        vault_backup.add_argument("--compress", action="store_true", help="gzip the backup")
+        vault_backup.add_argument("--pages", type=int, default=256, help="Pages copied per step (default: 256)")
+        vault_backup.add_argument("--if-due", action="store_true",
+                                  help="Only back up when the configured frequency has elapsed")
+        vault_backup.add_argument("--list", action="store_true", help="List backups without creating one")
+        vault_backup.add_argument("--keep-all", action="store_true", help="Skip retention cleanup")
+        
         vault_audit = vault_sub.add_parser("audit", help="Show audit log")
         vault_audit.add_argument("--file-id", type=int, help="Filter by file ID")
         vault_audit.add_argument("--user", help="Filter by user")
         vault_audit.add_argument("--limit", type=int, default=50, help="Number of entries")
+        vault_audit.add_argument("--since", help="Only entries at or after this UTC time (YYYY-MM-DD[ HH:MM:SS])")
+        vault_audit.add_argument("--until", help="Only entries before this UTC time (exclusive)")
+        
+        vault_changes = vault_sub.add_parser("changes", help="Show change log for incremental sync")
+        vault_changes.add_argument("--since", type=int, default=0, help="Last sequence number already seen")
+        vault_changes.add_argument("--limit", type=int, default=100, help="Number of entries")
+        vault_changes.add_argument("--table", action="append", dest="tables",
+                                   help="Only changes to this table (repeatable)")
+        vault_changes.add_argument("--prune", type=int, metavar="SEQ", dest="prune_before",
+                                   help="Delete entries below SEQ (processed by every consumer)")
+        vault_changes.add_argument("--older-than-days", type=int, metavar="N",
+                                   help="Delete entries recorded more than N days ago")
+        
+        vault_archive = vault_sub.add_parser("audit-archive", help="Move cold audit months to archive partitions")
+        vault_archive.add_argument("--hot-months", type=int, default=3,
+                                   help="Months kept in the hot database, including the current one (default: 3)")
+        vault_archive.add_argument("--purge-months", type=int,
+                                   help="Delete archive partitions older than N months")
         
         # Parse arguments
         args = parser.parse_args()
@@ -484,6 +1137,10 @@ class PLMCLI:
                 return self.cmd_project_list()
             elif args.project_command == "info":
                 return self.cmd_project_info(args.id)
+            elif args.project_command == "as-of":
+                return self.cmd_project_as_of(args.id, args.at, args.state)
+            elif args.project_command == "checkpoint":
+                return self.cmd_project_checkpoint(args.id, args.min_transitions)
         
         elif args.command == "file":
             if args.file_command == "list":
@@ -495,24 +1152,58 @@ class PLMCLI:
             if args.version_command == "list":
                 return self.cmd_version_list(args.file_id)
             elif args.version_command == "promote":
+                if args.assembly is not None:
+                    return self.cmd_version_promote_assembly(args.assembly, args.state, args.user,
+                                                             args.note, args.version, args.recursive)
+                if args.version is None:
+                    parser.error("--version is required with --file-id")
                 return self.cmd_version_promote(args.file_id, args.version, args.state, 
                                                args.user, args.note)
+            elif args.version_command == "find":
+                return self.cmd_version_find(args.prop, args.state, args.type, args.project_id,
+                                             args.latest, args.limit)
         
         elif args.command == "assembly":
             if args.assembly_command == "bom":
-                return self.cmd_assembly_bom(args.id)
+                return self.cmd_assembly_bom(args.id, args.multi_level, args.flat, args.max_depth)
+            elif args.assembly_command == "where-used":
+                return self.cmd_assembly_where_used(args.id, args.direct, args.version)
         
         elif args.command == "lock":
             if args.lock_command == "list":
                 return self.cmd_lock_list()
+            elif args.lock_command == "acquire":
+                return self.cmd_lock_acquire(args.user, args.file_id, args.assembly,
+                                             args.recursive, args.reason)
+            elif args.lock_command == "release":
+                return self.cmd_lock_release(args.user, args.file_id, args.assembly, args.recursive)
             elif args.lock_command == "clean":
                 return self.cmd_lock_clean(args.max_age)
         
+        elif args.command == "lockd":
+            return self.cmd_lockd(args.tcp, args.port, args.refresh, args.status)
+        
+        elif args.command == "search":
+            return self.cmd_search(args.query, args.project_id, args.limit, args.rebuild)
+        
         elif args.command == "vault":
             if args.vault_command == "status":
                 return self.cmd_vault_status()
+            elif args.vault_command == "checksum":
+                return self.cmd_vault_checksum(args.backfill, args.workers, args.batch_size, args.limit)
+            elif args.vault_command == "dedupe":
+                return self.cmd_vault_dedupe(args.dry_run, args.allow_pointers)
+            elif args.vault_command == "reconcile":
+                return self.cmd_vault_reconcile(args.repair, args.full)
+            elif args.vault_command == "backup":
+                return self.cmd_vault_backup(args.compress, args.pages, args.if_due, args.list, args.keep_all)
             elif args.vault_command == "audit":
-                return self.cmd_audit_log(args.file_id, args.user, args.limit)
+                return self.cmd_audit_log(args.file_id, args.user, args.limit, args.since, args.until)
+            elif args.vault_command == "audit-archive":
+                return self.cmd_audit_archive(args.hot_months, args.purge_months)
+            elif args.vault_command == "changes":
+                return self.cmd_vault_changes(args.since, args.limit, args.tables,
+                                              args.prune_before, args.older_than_days)
         
         else:
             parser.print_help()
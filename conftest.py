@@ -0,0 +1,45 @@
+"""Shared pytest fixtures: every test gets its own temporary vault"""
+
+import shutil
+import logging
+import tempfile
+
+import pytest
+
+from database.db import PLMDatabase
+
+logging.disable(logging.WARNING)
+
+
+@pytest.fixture
+def vault():
+    """Path of an empty vault directory, removed after the test"""
+    path = tempfile.mkdtemp(prefix="plm_test_")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def open_vault(vault):
+    """Open PLMDatabase on the test vault with extra options
+
+    Every database opened through the returned function is closed after
+    the test, so tests only close explicitly when they reopen the vault.
+    """
+    opened = []
+
+    def open_db(**kwargs):
+        kwargs.setdefault("use_lockd", False)
+        db = PLMDatabase(vault, **kwargs)
+        opened.append(db)
+        return db
+
+    yield open_db
+    for db in reversed(opened):
+        db.close()
+
+
+@pytest.fixture
+def db(open_vault):
+    """PLMDatabase on the test vault with default options"""
+    return open_vault()
@@ -1,4 +1,4 @@
 """PLM Database Package"""
-from .db import PLMDatabase
+from .db import PLMDatabase, LockConflictError
 
-__all__ = ['PLMDatabase']
+__all__ = ['PLMDatabase', 'LockConflictError']
@@ -0,0 +1,160 @@
+"""
+PLM Audit Writer
+- Write-behind queue for access_log records
+- Background batch inserts with executemany
+- Backpressure and flush-on-exit
+"""
+
+import atexit
+import queue
+import threading
+import logging
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Queue marker telling the drain thread to stop
+_STOP = object()
+
+
+class AuditWriter:
+    """Asynchronous sink for audit records
+
+    ``log_action`` callers only enqueue; a daemon thread drains the queue and
+    hands batches to ``write_batch``. When the queue is full the caller waits
+    up to ``put_timeout`` seconds and then writes its own record synchronously,
+    so audit records are never dropped. Pending records are flushed when the
+    interpreter exits.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Tuple]], None], max_queue: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 0.5, put_timeout: float = 1.0):
+        """Start audit writer thread
+
+        Args:
+            write_batch: Inserts a list of access_log rows in one transaction
+            max_queue: Maximum queued records before backpressure applies
+            batch_size: Maximum records per insert batch
+            flush_interval: Seconds the drain thread waits for more records
+            put_timeout: Seconds a caller blocks on a full queue before
+                writing synchronously
+        """
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._lock = threading.Lock()
+        # Submitters between the _closed check and their put; close() waits
+        # for them so no record can land behind the stop marker
+        self._in_flight = 0
+        self._idle = threading.Condition(self._lock)
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "sync_fallbacks": 0, "errors": 0}
+
+        self._thread = threading.Thread(target=self._run, name="plm-audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record: Tuple):
+        """Queue one access_log row, applying backpressure when full"""
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._in_flight += 1
+        if closed:
+            self._write_sync([record])
+            return
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+            with self._lock:
+                self.stats["queued"] += 1
+        except queue.Full:
+            logger.warning("Audit queue full, writing record synchronously")
+            with self._lock:
+                self.stats["sync_fallbacks"] += 1
+            self._write_sync([record])
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if not self._closed:
+            self._queue.join()
+
+    def close(self):
+        """Flush pending records and stop the drain thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._idle.wait_for(lambda: not self._in_flight)
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        """Drain loop: collect up to batch_size records and write them together"""
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            taken = 1
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Tuple]):
+        """Write a batch, falling back to per-record inserts on failure"""
+        try:
+            self.write_batch(batch)
+            with self._lock:
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+        except Exception as e:
+            logger.error(f"Audit batch of {len(batch)} failed ({e}), retrying per record")
+            for record in batch:
+                self._write_sync([record])
+
+    def _write_sync(self, batch: List[Tuple]):
+        """Write records on the calling thread, logging (not raising) failures"""
+        try:
+            self.write_batch(batch)
+            with self._lock:
+                self.stats["written"] += len(batch)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += len(batch)
+            logger.error(f"Failed to write audit record {batch}: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Queue and write counters"""
+        with self._lock:
+            return {**self.stats, "pending": self._queue.qsize()}
@@ -0,0 +1,111 @@
+"""
+PLM Audit Archive
+- Monthly access_log partitions stored as separate SQLite files
+- Month arithmetic and time-window helpers for partition pruning
+"""
+
+import os
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Same columns as access_log in the vault database; no foreign keys, since
+# archived rows may outlive the files and projects they refer to
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {schema}.access_log (
+    log_id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    action TEXT NOT NULL,
+    file_id INTEGER,
+    project_id INTEGER,
+    action_timestamp TIMESTAMP,
+    duration_ms INTEGER,
+    details JSON
+);
+
+CREATE INDEX IF NOT EXISTS {schema}.idx_log_user ON access_log(user);
+CREATE INDEX IF NOT EXISTS {schema}.idx_log_file ON access_log(file_id);
+CREATE INDEX IF NOT EXISTS {schema}.idx_log_timestamp ON access_log(action_timestamp);
+"""
+
+
+def month_key(timestamp: str) -> str:
+    """Partition key ('YYYY-MM') for an access_log timestamp"""
+    return timestamp[:7]
+
+
+def month_bounds(key: str) -> Tuple[str, str]:
+    """Half-open [start, end) timestamp range covered by a month partition"""
+    year, month = int(key[:4]), int(key[5:7])
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return (f"{year:04d}-{month:02d}-01 00:00:00", f"{next_year:04d}-{next_month:02d}-01 00:00:00")
+
+
+def months_ago_start(months: int, now: Optional[datetime] = None) -> str:
+    """Start timestamp of the month N months before the current one (UTC)"""
+    now = now or datetime.now(timezone.utc)
+    index = now.year * 12 + (now.month - 1) - months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}-01 00:00:00"
+
+
+class AuditArchive:
+    """Monthly archive databases for cold access_log rows"""
+
+    def __init__(self, archive_dir: str):
+        """
+        Args:
+            archive_dir: Directory holding access_log_YYYY_MM.sqlite files
+        """
+        self.archive_dir = archive_dir
+
+    def partition_path(self, key: str) -> str:
+        """Archive database file for a month partition"""
+        return os.path.join(self.archive_dir, f"access_log_{key.replace('-', '_')}.sqlite")
+
+    def attach(self, conn: sqlite3.Connection, key: str, alias: str = "audit_archive") -> str:
+        """Attach (and create if needed) a partition database to a connection
+
+        Returns:
+            path of the partition file
+        """
+        Path(self.archive_dir).mkdir(parents=True, exist_ok=True)
+        path = self.partition_path(key)
+        conn.execute("ATTACH DATABASE ? AS " + alias, (path,))
+        try:
+            conn.executescript(ARCHIVE_SCHEMA.format(schema=alias))
+        except sqlite3.Error:
+            # Leave the pooled connection as we found it, or the next attach fails
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute("DETACH DATABASE " + alias)
+            raise
+        return path
+
+    @contextmanager
+    def open_partition(self, path: str):
+        """Read-only style connection to one partition file"""
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def remove_partition(self, path: str) -> int:
+        """Delete a partition file
+
+        Returns:
+            bytes freed
+        """
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            logger.warning(f"Audit partition already missing: {path}")
+            return 0
@@ -0,0 +1,239 @@
+"""
+PLM Backup Engine
+- Online backups of db.sqlite with the SQLite backup API
+- Paged, step-wise copy that pauses between steps so writers keep working
+- Optional streaming gzip compression and retention on db_backup/
+"""
+
+import os
+import re
+import gzip
+import json
+import shutil
+import sqlite3
+import time
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# db_20260104_120000_123456.sqlite[.gz]
+BACKUP_NAME_RE = re.compile(r"^db_(\d{8}_\d{6}_\d{6})\.sqlite(\.gz)?$")
+BACKUP_TIME_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Defaults matching the "backup" section SETUP.py writes to config.json
+DEFAULT_BACKUP_CONFIG = {"enabled": True, "frequency": "daily", "retention_days": 30}
+FREQUENCIES = {"hourly": timedelta(hours=1), "daily": timedelta(days=1), "weekly": timedelta(weeks=1)}
+
+
+class _BackupRestarted(Exception):
+    """Raised from the progress callback when the copy had to start over"""
+
+
+def load_backup_config(vault_path: str) -> Dict[str, Any]:
+    """Backup section of <vault>/config.json merged over the defaults"""
+    config = dict(DEFAULT_BACKUP_CONFIG)
+    try:
+        with open(os.path.join(vault_path, "config.json"), "r", encoding="utf-8") as f:
+            config.update(json.load(f).get("backup") or {})
+    except (OSError, ValueError):
+        pass
+    return config
+
+
+class BackupEngine:
+    """Consistent online copies of the vault database
+
+    In WAL mode the whole database is copied in one step inside a read
+    transaction: readers never block writers there, so the copy is a
+    consistent snapshot at no cost to anyone else. With a rollback journal a
+    read lock does block commits, so the copy is made ``pages`` at a time and
+    the engine sleeps between steps to let writers in. Because SQLite
+    restarts a backup whenever another connection writes to the source, after
+    ``max_restarts`` restarts the remaining copy is done in a single step.
+    """
+
+    def __init__(self, db_path: str, backup_dir: str, pages: int = 256,
+                 step_pause: float = 0.05, max_restarts: int = 3,
+                 busy_timeout_ms: int = 5000):
+        """
+        Args:
+            db_path: Vault database file
+            backup_dir: Destination directory (e.g. <vault>/db_backup)
+            pages: Database pages copied per step
+            step_pause: Seconds to sleep between steps (rollback journal only)
+            max_restarts: Paged attempts before falling back to one step
+            busy_timeout_ms: Wait for locks held by writers
+        """
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.pages = pages
+        self.step_pause = step_pause
+        self.max_restarts = max_restarts
+        self.busy_timeout_ms = busy_timeout_ms
+
+    def backup(self, compress: bool = False, verify: bool = True,
+               progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Write a new backup file
+
+        Args:
+            compress: gzip the copy while streaming it to its final name
+            verify: Run PRAGMA quick_check on the copy before keeping it
+            progress: Called with (pages remaining, total pages) after each step
+
+        Returns:
+            dict with path, size_bytes, pages, steps, restarts, journal_mode,
+            compressed, elapsed_s
+        """
+        Path(self.backup_dir).mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        final, tmp = self._reserve_name(compress)
+
+        src = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000)
+        stats = {"steps": 0, "restarts": 0, "pages": 0}
+        try:
+            journal_mode = src.execute("PRAGMA journal_mode").fetchone()[0].lower()
+            dst = sqlite3.connect(tmp)
+            try:
+                if journal_mode == "wal":
+                    self._copy(src, dst, -1, stats, progress)
+                else:
+                    self._copy_paged(src, dst, stats, progress)
+                if verify:
+                    result = dst.execute("PRAGMA quick_check").fetchone()[0]
+                    if result != "ok":
+                        raise Exception(f"Backup verification failed: {result}")
+            finally:
+                dst.close()
+
+            if compress:
+                with open(tmp, "rb") as f_in, gzip.open(final + ".part", "wb") as f_out:
+                    shutil.copyfileobj(f_in, f_out, STREAM_CHUNK_SIZE)
+                os.replace(final + ".part", final)
+                os.remove(tmp)
+            else:
+                os.replace(tmp, final)
+        except BaseException:
+            for path in (tmp, final + ".part"):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        finally:
+            src.close()
+
+        result = {
+            "path": final,
+            "size_bytes": os.path.getsize(final),
+            "pages": stats["pages"],
+            "steps": stats["steps"],
+            "restarts": stats["restarts"],
+            "journal_mode": journal_mode,
+            "compressed": compress,
+            "elapsed_s": time.perf_counter() - start,
+        }
+        logger.info(f"Backup written: {final} ({result['size_bytes']} bytes, "
+                    f"{result['steps']} steps, {result['restarts']} restarts)")
+        return result
+
+    def _reserve_name(self, compress: bool):
+        """Pick an unused backup name and claim it by creating its .tmp file
+
+        Two backups started within the same microsecond (or after the clock
+        stepped back) would otherwise write to, and replace, the same file.
+
+        Returns:
+            (final path, tmp path)
+        """
+        stamp = datetime.now()
+        while True:
+            name = f"db_{stamp.strftime(BACKUP_TIME_FORMAT)}.sqlite"
+            final = os.path.join(self.backup_dir, name + (".gz" if compress else ""))
+            tmp = os.path.join(self.backup_dir, name + ".tmp")
+            if not any(os.path.exists(os.path.join(self.backup_dir, name + ext))
+                       for ext in ("", ".gz")):
+                try:
+                    os.close(os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    return final, tmp
+                except FileExistsError:
+                    pass
+            stamp += timedelta(microseconds=1)
+
+    def _copy_paged(self, src: sqlite3.Connection, dst: sqlite3.Connection,
+                    stats: Dict[str, int], progress: Optional[Callable[[int, int], None]]):
+        """Step-wise copy, giving up on paging after too many restarts"""
+        for _ in range(self.max_restarts):
+            try:
+                self._copy(src, dst, self.pages, stats, progress)
+                return
+            except _BackupRestarted:
+                stats["restarts"] += 1
+                logger.info(f"Backup restarted by a concurrent write ({stats['restarts']})")
+        logger.warning("Database busy with writes; finishing backup in a single step")
+        self._copy(src, dst, -1, stats, progress)
+
+    def _copy(self, src: sqlite3.Connection, dst: sqlite3.Connection, pages: int,
+              stats: Dict[str, int], progress: Optional[Callable[[int, int], None]]):
+        last_remaining = None
+
+        def on_step(status, remaining, total):
+            nonlocal last_remaining
+            stats["steps"] += 1
+            stats["pages"] = total
+            if last_remaining is not None and remaining > last_remaining:
+                raise _BackupRestarted()
+            last_remaining = remaining
+            if progress:
+                progress(remaining, total)
+            if remaining and self.step_pause:
+                time.sleep(self.step_pause)
+
+        src.backup(dst, pages=pages, progress=on_step)
+
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Backups in backup_dir, newest first"""
+        backups = []
+        try:
+            names = os.listdir(self.backup_dir)
+        except FileNotFoundError:
+            return []
+        for name in names:
+            match = BACKUP_NAME_RE.match(name)
+            if not match:
+                continue
+            path = os.path.join(self.backup_dir, name)
+            backups.append({
+                "path": path,
+                "created": datetime.strptime(match.group(1), BACKUP_TIME_FORMAT),
+                "size_bytes": os.path.getsize(path),
+                "compressed": bool(match.group(2)),
+            })
+        backups.sort(key=lambda b: b["created"], reverse=True)
+        return backups
+
+    def enforce_retention(self, retention_days: int, keep_min: int = 1) -> List[str]:
+        """Delete backups older than retention_days, always keeping the newest keep_min
+
+        Returns:
+            deleted paths
+        """
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        deleted = []
+        for backup in self.list_backups()[keep_min:]:
+            if backup["created"] < cutoff:
+                os.remove(backup["path"])
+                deleted.append(backup["path"])
+        if deleted:
+            logger.info(f"Backup retention removed {len(deleted)} file(s) older than {retention_days} days")
+        return deleted
+
+    def is_due(self, frequency: str) -> bool:
+        """True if the newest backup is older than the configured frequency"""
+        backups = self.list_backups()
+        if not backups:
+            return True
+        interval = FREQUENCIES.get(frequency, FREQUENCIES["daily"])
+        return datetime.now() - backups[0]["created"] >= interval
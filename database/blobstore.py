@@ -0,0 +1,252 @@
+"""
+PLM Blob Store
+- Content-addressable storage of version files keyed by SHA-256
+- Version folders reference blobs through hardlinks
+- Blobs (and so every link to them) are read-only
+- In-place deduplication of existing vaults
+
+Trade-off of hardlinks: every version file with the same bytes shares one
+inode, so a tool saving a vNNN file in place would silently change every
+version (and every deduplicated duplicate) at once. Blobs are therefore
+made read-only (0444, FILE_ATTRIBUTE_READONLY on Windows) and frozen
+version files cannot be edited in place any more; work on a copy from
+restore_version_file() instead. A copy made with a mode-preserving tool
+(shutil.copy2, Explorer) is read-only too. Vault reconciliation reports
+blobs that lost the flag and restores it with --repair.
+"""
+
+import os
+import stat
+import shutil
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .checksums import CHUNK_SIZE, sha256_file
+from .chunkstore import manifest_path
+
+logger = logging.getLogger(__name__)
+
+# r--r--r--; on Windows os.chmod maps this to FILE_ATTRIBUTE_READONLY
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+_WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+class BlobStore:
+    """Content-addressable store under <vault>/Blobs
+
+    Blobs live at Blobs/ab/cd/<sha256>. A version file in its vNNN folder is a
+    hardlink to the blob, so identical bytes are stored once no matter how many
+    versions (or parts) contain them.
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Blob store directory (e.g. <vault>/Blobs)
+        """
+        self.root = root
+
+    def blob_path(self, digest: str) -> str:
+        """Storage path for a digest"""
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def has(self, digest: str) -> bool:
+        """True if a blob with this digest is stored"""
+        return os.path.exists(self.blob_path(digest))
+
+    def put_file(self, src: str) -> Tuple[str, int, bool]:
+        """Stream a file into the store, hashing while copying
+
+        Returns:
+            (digest, size, created) - created is False if the blob already existed
+        """
+        Path(self.root).mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            hexdigest = digest.hexdigest()
+            target = self.blob_path(hexdigest)
+            if os.path.exists(target):
+                os.remove(tmp_path)
+                return hexdigest, size, False
+
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            self.protect(tmp_path)
+            os.replace(tmp_path, target)
+            return hexdigest, size, True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.chmod(tmp_path, stat.S_IREAD | stat.S_IWRITE)
+                os.remove(tmp_path)
+            raise
+
+    def adopt(self, path: str, digest: str) -> bool:
+        """Make an existing file the blob for its digest without copying
+
+        The file becomes read-only along with the blob.
+
+        Returns:
+            True if the file was hardlinked into the store, False if it had to
+            be copied (filesystem without hardlink support)
+        """
+        target = self.blob_path(digest)
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, target)
+            linked = True
+        except FileExistsError:
+            linked = True
+        except OSError:
+            shutil.copy2(path, target)
+            linked = False
+        self.protect(target)
+        self.protect(path)
+        return linked
+
+    def link(self, digest: str, dest: str):
+        """Atomically replace dest with a hardlink to the blob
+
+        Raises:
+            OSError if the filesystem does not support hardlinks
+        """
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest + ".plmlink"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        os.link(self.blob_path(digest), tmp)
+        if os.name == "nt" and os.path.exists(dest):
+            # Windows refuses to replace a read-only file. If dest was itself a
+            # link, its other links lose the flag until reconcile --repair.
+            os.chmod(dest, stat.S_IREAD | stat.S_IWRITE)
+        os.replace(tmp, dest)
+
+    @staticmethod
+    def protect(path: str):
+        """Make a blob or version file read-only (shared by all its hardlinks)"""
+        os.chmod(path, READ_ONLY)
+
+    @staticmethod
+    def is_protected(path: str) -> bool:
+        """True if nobody can write to the file"""
+        return not os.stat(path).st_mode & _WRITE_BITS
+
+    def unprotected(self, digests: Iterable[str]) -> List[str]:
+        """Digests of stored blobs that are writable"""
+        return [d for d in digests if self.has(d) and not self.is_protected(self.blob_path(d))]
+
+    def is_linked(self, digest: str, path: str) -> bool:
+        """True if path already is (a hardlink to) the blob"""
+        try:
+            return os.path.samefile(self.blob_path(digest), path)
+        except OSError:
+            return False
+
+
+def deduplicate_vault(db, store: BlobStore, dry_run: bool = False,
+                      allow_pointers: bool = False) -> Dict[str, Any]:
+    """Deduplicate every version file of a vault in place
+
+    Each version file is hashed. The first file with a given digest becomes
+    the blob (hardlinked into the store, no copy), and every later file with
+    the same bytes is replaced by a hardlink to that blob. Missing checksums
+    are filled in along the way.
+
+    Args:
+        db: PLMDatabase instance
+        store: Blob store for the vault
+        dry_run: Only report what would be reclaimed
+        allow_pointers: Where hardlinks are unsupported, delete the duplicate
+            and point versions.file_path at the blob instead
+
+    Returns:
+        dict with versions, missing, new_blobs, deduplicated, already_linked,
+        chunked (stored as chunks, skipped), bytes_reclaimed, failed
+    """
+    report = {"versions": 0, "missing": 0, "new_blobs": 0, "deduplicated": 0,
+              "already_linked": 0, "chunked": 0, "bytes_reclaimed": 0, "failed": 0}
+    seen: Dict[str, int] = {}
+    checksum_updates: List[Tuple[str, int, int]] = []
+    new_blobs: List[Tuple[str, int]] = []
+    pointer_updates: List[Tuple[str, int]] = []
+
+    def flush():
+        if dry_run:
+            return
+        if new_blobs:
+            db.record_blobs(new_blobs)
+            new_blobs.clear()
+        if checksum_updates:
+            db.set_version_checksums(checksum_updates)
+            checksum_updates.clear()
+        if pointer_updates:
+            db.set_version_file_paths(pointer_updates)
+            pointer_updates.clear()
+
+    for version in db.iter_version_files():
+        report["versions"] += 1
+        if len(checksum_updates) >= 500 or len(new_blobs) >= 500:
+            flush()
+
+        path = db.resolve_vault_path(version["file_path"])
+        if not path or not os.path.isfile(path):
+            if path and os.path.isfile(manifest_path(path)):
+                report["chunked"] += 1
+            else:
+                report["missing"] += 1
+            continue
+
+        digest, size = sha256_file(path)
+        if version["checksum"] != digest:
+            checksum_updates.append((digest, size, version["version_id"]))
+
+        if store.is_linked(digest, path):
+            report["already_linked"] += 1
+            seen[digest] = size
+            if not dry_run and not store.is_protected(path):
+                store.protect(path)
+            continue
+
+        if digest not in seen and not store.has(digest):
+            # First copy of these bytes becomes the blob itself
+            seen[digest] = size
+            report["new_blobs"] += 1
+            if not dry_run:
+                store.adopt(path, digest)
+                new_blobs.append((digest, size))
+            continue
+
+        if dry_run:
+            report["deduplicated"] += 1
+            report["bytes_reclaimed"] += size
+            continue
+
+        try:
+            store.link(digest, path)
+        except OSError as e:
+            if not allow_pointers:
+                logger.warning(f"Cannot hardlink {path}: {e}")
+                report["failed"] += 1
+                continue
+            os.remove(path)
+            pointer_updates.append((os.path.relpath(store.blob_path(digest), db.vault_path),
+                                    version["version_id"]))
+        report["deduplicated"] += 1
+        report["bytes_reclaimed"] += size
+
+    flush()
+    logger.info(f"Vault deduplication{' (dry run)' if dry_run else ''}: {report}")
+    return report
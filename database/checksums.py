@@ -0,0 +1,149 @@
+"""
+PLM Checksum Engine
+- Streaming SHA-256 of vault files in fixed-size chunks
+- Parallel, resumable backfill of versions.checksum
+"""
+
+import os
+import hashlib
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Read size for hashing; large SLDASM files are never held in memory whole
+CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str, chunk_size: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """Hash a file in fixed-size chunks
+
+    Returns:
+        (hex digest, size in bytes)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _hash_job(job: Tuple[int, str, int]) -> Tuple[int, Optional[str], int, Optional[str]]:
+    """Worker entry point: (version_id, path, chunk_size) -> (version_id, digest, size, error)"""
+    version_id, path, chunk_size = job
+    try:
+        digest, size = sha256_file(path, chunk_size)
+        return version_id, digest, size, None
+    except OSError as e:
+        return version_id, None, 0, str(e)
+
+
+class ChecksumBackfill:
+    """Compute missing version checksums across a process pool
+
+    Versions are read in version_id order, one page at a time. While one page
+    is hashed in the pool, the previous page's results are written back in a
+    single transaction, so an interrupted run simply resumes with whatever
+    still has no checksum.
+    """
+
+    def __init__(self, db, workers: Optional[int] = None, batch_size: int = 200,
+                 chunk_size: int = CHUNK_SIZE):
+        """
+        Args:
+            db: PLMDatabase instance
+            workers: Hashing processes (default: CPU count; 1 = in-process)
+            batch_size: Versions per page and per write-back transaction
+            chunk_size: Read size while hashing
+        """
+        self.db = db
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+
+    def run(self, limit: Optional[int] = None,
+            progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Backfill checksums for versions that have none
+
+        Args:
+            limit: Stop after this many versions (None = all)
+            progress: Called with the running totals after every batch
+
+        Returns:
+            dict with hashed, missing, bytes, elapsed_s, files_per_sec, mb_per_sec
+        """
+        stats = {"hashed": 0, "missing": 0, "bytes": 0, "elapsed_s": 0.0,
+                 "files_per_sec": 0.0, "mb_per_sec": 0.0}
+        start = time.perf_counter()
+
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            pending: List[Future] = []
+            pending_results: List[Tuple] = []
+            last_id = 0
+            remaining = limit
+
+            while True:
+                page_size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+                page = self.db.get_versions_missing_checksum(after_version_id=last_id, limit=page_size) \
+                    if page_size > 0 else []
+
+                # Start hashing this page before writing the previous one
+                jobs = [(v["version_id"], self.db.resolve_vault_path(v["file_path"]), self.chunk_size)
+                        for v in page]
+                if executor:
+                    next_pending = [executor.submit(_hash_job, job) for job in jobs]
+                    next_results = None
+                else:
+                    next_pending = []
+                    next_results = [_hash_job(job) for job in jobs]
+
+                if pending or pending_results:
+                    results = pending_results or [f.result() for f in pending]
+                    self._write_results(results, stats, start, progress)
+
+                if not page:
+                    break
+                last_id = page[-1]["version_id"]
+                if remaining is not None:
+                    remaining -= len(page)
+                pending = next_pending
+                pending_results = next_results or []
+        finally:
+            if executor:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - start
+        stats["elapsed_s"] = elapsed
+        logger.info(f"Checksum backfill: {stats}")
+        return stats
+
+    def _write_results(self, results: List[Tuple], stats: Dict[str, Any], start: float,
+                       progress: Optional[Callable[[Dict[str, Any]], None]]):
+        """Persist one batch of digests and update throughput counters"""
+        found = [(digest, size, version_id) for version_id, digest, size, error in results if digest]
+        for version_id, digest, size, error in results:
+            if error:
+                logger.warning(f"Cannot hash version {version_id}: {error}")
+
+        if found:
+            self.db.set_version_checksums(found)
+
+        stats["hashed"] += len(found)
+        stats["missing"] += len(results) - len(found)
+        stats["bytes"] += sum(size for _, size, _ in found)
+
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            stats["files_per_sec"] = stats["hashed"] / elapsed
+            stats["mb_per_sec"] = stats["bytes"] / (1024 * 1024) / elapsed
+        stats["elapsed_s"] = elapsed
+        if progress:
+            progress(dict(stats))
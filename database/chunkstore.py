@@ -0,0 +1,304 @@
+"""
+PLM Chunk Store
+- Content-defined chunking of version files with a rolling gear hash
+  (vectorised with numpy when it is installed, pure Python otherwise)
+- Unique chunks stored once per part under Parts/<name>/.chunks
+- Per-version manifests and streaming reassembly
+"""
+
+import os
+import json
+import random
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".chunks.json"
+MANIFEST_FORMAT = 1
+
+# Chunk size bounds; small edits to a part only rewrite the chunks around them
+MIN_CHUNK_SIZE = 4 * 1024
+AVG_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 64 * 1024
+
+READ_SIZE = 1024 * 1024
+
+# Boundary candidates hashed per numpy pass; most chunks end within one or two
+SCAN_BLOCK = 8 * 1024
+
+_MASK_64 = (1 << 64) - 1
+
+np = None  # numpy module once _numpy() has run, False if it is not installed
+
+# Fixed gear table so chunk boundaries are stable across runs and machines
+_GEAR = [random.Random(0x504C4D + i).getrandbits(64) for i in range(256)]
+_GEAR_ARRAY = None
+
+
+def _numpy():
+    """numpy, imported on first use (it is slow to import), or None if missing
+
+    numpy is optional: without it chunk boundaries are the same, only found
+    roughly ten times more slowly.
+    """
+    global np, _GEAR_ARRAY
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            np = False
+        else:
+            _GEAR_ARRAY = numpy.array(_GEAR, dtype=numpy.uint64)
+            np = numpy
+    return np or None
+
+
+def _cut_masks(avg_size: int) -> Tuple[int, int]:
+    """Normalized-chunking masks: stricter before avg_size, looser after
+
+    Masks use the high bits of the gear hash, which depend on the last 64
+    bytes seen, so boundaries only move where the content changed.
+    """
+    bits = avg_size.bit_length() - 1
+    strict = ((1 << (bits + 1)) - 1) << (64 - bits - 1)
+    loose = ((1 << (bits - 1)) - 1) << (64 - bits + 1)
+    return strict, loose
+
+
+def find_cut(buf: bytearray, min_size: int, avg_size: int, max_size: int) -> int:
+    """Length of the next chunk at the start of buf"""
+    n = len(buf)
+    if n <= min_size:
+        return n
+    strict, loose = _cut_masks(avg_size)
+    normal = min(avg_size, n)
+    limit = min(max_size, n)
+    if _numpy():
+        return _find_cut_numpy(buf, min_size, normal, limit, strict, loose)
+    return _find_cut_python(buf, min_size, normal, limit, strict, loose)
+
+
+def _find_cut_python(buf: bytearray, min_size: int, normal: int, limit: int,
+                     strict: int, loose: int) -> int:
+    """find_cut one byte at a time: h = (h << 1) + gear[byte], from min_size on"""
+    gear = _GEAR
+    h = 0
+    i = min_size
+    with memoryview(buf) as view:
+        for byte in view[min_size:normal]:
+            h = ((h << 1) + gear[byte]) & _MASK_64
+            i += 1
+            if not h & strict:
+                return i
+        for byte in view[normal:limit]:
+            h = ((h << 1) + gear[byte]) & _MASK_64
+            i += 1
+            if not h & loose:
+                return i
+    return limit
+
+
+def _gear_hashes(buf: bytearray, start: int, first: int, end: int):
+    """Gear hash after each byte in buf[first:end], hashing from buf[start]
+
+    The hash after byte i is sum(gear[buf[j]] << (i - j)) over the last 64
+    bytes j >= start (older bytes are shifted out of 64 bits), so it is
+    built from window sums that double in width: 1, 2, 4 ... 64 bytes.
+    """
+    lo = max(start, first - 63)
+    h = _GEAR_ARRAY[np.frombuffer(buf, np.uint8, end - lo, lo)]
+    for width in (1, 2, 4, 8, 16, 32):
+        h[width:] += h[:-width] << np.uint64(width)
+    return h[first - lo:]
+
+
+def _find_cut_numpy(buf: bytearray, min_size: int, normal: int, limit: int,
+                    strict: int, loose: int) -> int:
+    """find_cut over blocks of SCAN_BLOCK candidates; same cuts as _find_cut_python"""
+    for lo, hi, mask in ((min_size, normal, strict), (normal, limit, loose)):
+        mask = np.uint64(mask)
+        for first in range(lo, hi, SCAN_BLOCK):
+            end = min(first + SCAN_BLOCK, hi)
+            hits = np.flatnonzero((_gear_hashes(buf, min_size, first, end) & mask) == 0)
+            if hits.size:
+                return first + int(hits[0]) + 1
+    return limit
+
+
+def iter_chunks(f: BinaryIO, min_size: int = MIN_CHUNK_SIZE, avg_size: int = AVG_CHUNK_SIZE,
+                max_size: int = MAX_CHUNK_SIZE) -> Iterator[bytes]:
+    """Split a stream into content-defined chunks without reading it whole"""
+    buf = bytearray()
+    eof = False
+    while not eof:
+        data = f.read(READ_SIZE)
+        eof = not data
+        buf += data
+        # Only cut once a full max_size window is buffered (or at EOF), so
+        # boundaries never depend on read sizes
+        while len(buf) >= max_size or (eof and buf):
+            cut = find_cut(buf, min_size, avg_size, max_size)
+            yield bytes(buf[:cut])
+            del buf[:cut]
+
+
+def manifest_path(version_file: str) -> str:
+    """Manifest stored next to where the full version file would be"""
+    return version_file + MANIFEST_SUFFIX
+
+
+class ChunkStore:
+    """Deduplicated chunk storage for all versions of one part
+
+    Chunks live at <part_dir>/.chunks/ab/<sha256>. Each stored version has a
+    manifest listing its chunks in order; the file is rebuilt by streaming
+    those chunks back out.
+    """
+
+    def __init__(self, part_dir: str, min_size: int = MIN_CHUNK_SIZE,
+                 avg_size: int = AVG_CHUNK_SIZE, max_size: int = MAX_CHUNK_SIZE):
+        """
+        Args:
+            part_dir: Part folder (Projects/<P>/Parts/<name>)
+            min_size: Minimum chunk size in bytes
+            avg_size: Target average chunk size in bytes (power of two)
+            max_size: Maximum chunk size in bytes
+        """
+        self.part_dir = part_dir
+        self.chunk_dir = os.path.join(part_dir, ".chunks")
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+    @classmethod
+    def for_version_file(cls, version_file: str, **kwargs) -> "ChunkStore":
+        """Chunk store of the part owning Parts/<name>/vNNN/<file>"""
+        return cls(os.path.dirname(os.path.dirname(os.path.abspath(version_file))), **kwargs)
+
+    def chunk_path(self, digest: str) -> str:
+        """Storage path for a chunk digest"""
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def store(self, src: str, manifest: str) -> Dict[str, Any]:
+        """Chunk a file into the store and write its manifest
+
+        Args:
+            src: File to store
+            manifest: Manifest path to write
+
+        Returns:
+            dict with checksum, size_bytes, chunks, new_chunks, bytes_written
+        """
+        file_digest = hashlib.sha256()
+        chunks: List[List[Any]] = []
+        new_chunks = 0
+        bytes_written = 0
+
+        with open(src, "rb") as f:
+            for chunk in iter_chunks(f, self.min_size, self.avg_size, self.max_size):
+                file_digest.update(chunk)
+                digest = hashlib.sha256(chunk).hexdigest()
+                chunks.append([digest, len(chunk)])
+                if self._write_chunk(digest, chunk):
+                    new_chunks += 1
+                    bytes_written += len(chunk)
+
+        size = sum(length for _, length in chunks)
+        data = {
+            "format": MANIFEST_FORMAT,
+            "file_name": os.path.basename(src),
+            "size_bytes": size,
+            "checksum": file_digest.hexdigest(),
+            "chunking": [self.min_size, self.avg_size, self.max_size],
+            "chunks": chunks,
+        }
+        _write_atomic(manifest, json.dumps(data).encode("utf-8"))
+
+        return {"checksum": data["checksum"], "size_bytes": size, "chunks": len(chunks),
+                "new_chunks": new_chunks, "bytes_written": bytes_written}
+
+    def _write_chunk(self, digest: str, chunk: bytes) -> bool:
+        """Store a chunk unless present
+
+        Returns:
+            True if the chunk was new
+        """
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return False
+        _write_atomic(path, chunk)
+        return True
+
+    def iter_content(self, manifest: str, verify: bool = True) -> Iterator[bytes]:
+        """Stream a stored file back chunk by chunk
+
+        Raises:
+            Exception if a chunk is missing or the reassembled file does not
+            match the manifest checksum
+        """
+        with open(manifest, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        file_digest = hashlib.sha256() if verify else None
+        for digest, length in data["chunks"]:
+            path = self.chunk_path(digest)
+            try:
+                with open(path, "rb") as f:
+                    chunk = f.read()
+            except FileNotFoundError:
+                raise Exception(f"Missing chunk {digest} for {manifest}")
+            if len(chunk) != length:
+                raise Exception(f"Corrupt chunk {digest} for {manifest}")
+            if file_digest:
+                file_digest.update(chunk)
+            yield chunk
+
+        if file_digest and file_digest.hexdigest() != data["checksum"]:
+            raise Exception(f"Checksum mismatch reassembling {manifest}")
+
+    def restore(self, manifest: str, dest: str, verify: bool = True) -> int:
+        """Reassemble a stored file at dest (written atomically)
+
+        Returns:
+            bytes written
+        """
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dest)), suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in self.iter_content(manifest, verify=verify):
+                    out.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size
+
+    def disk_usage(self) -> int:
+        """Bytes held in this part's chunk directory"""
+        total = 0
+        for root, _, files in os.walk(self.chunk_dir):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write bytes via a temp file in the same directory and rename into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,154 @@
+"""
+PLM Concurrency Helpers
+- Connection tuning for many concurrent writers (WAL, busy_timeout)
+- SQLITE_BUSY retry with jittered exponential backoff
+"""
+
+import os
+import ntpath
+import sqlite3
+import threading
+import random
+import time
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def is_busy_error(error: Exception) -> bool:
+    """True if error is SQLITE_BUSY / SQLITE_LOCKED surfaced by sqlite3"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "database is locked" in message or "database is busy" in message \
+        or "database table is locked" in message
+
+
+# GetDriveTypeW results
+DRIVE_UNKNOWN = 0
+DRIVE_REMOTE = 4
+
+
+def _drive_type(root: str) -> int:
+    """GetDriveTypeW for a drive root such as 'Z:\\' (DRIVE_UNKNOWN off Windows)"""
+    if os.name != "nt":
+        return DRIVE_UNKNOWN
+    import ctypes
+    return ctypes.windll.kernel32.GetDriveTypeW(ctypes.c_wchar_p(root))
+
+
+def is_network_path(path: str) -> bool:
+    """Best-effort check for network filesystems where WAL is unsafe
+
+    UNC paths (\\\\server\\share, //server/share) are always remote. On
+    Windows a drive letter is remote when it is a mapped network drive.
+    """
+    if path.startswith("\\\\") or path.startswith("//"):
+        return True
+    if os.name == "nt":
+        path = os.path.abspath(path)
+    drive = ntpath.splitdrive(path)[0]
+    if len(drive) == 2 and drive[1] == ":":
+        return _drive_type(drive + "\\") == DRIVE_REMOTE
+    return False
+
+
+def enable_wal(conn: sqlite3.Connection, db_path: str) -> str:
+    """Switch database to WAL journal mode where the filesystem allows it
+
+    WAL needs shared memory between processes on the same host, so it is
+    skipped for network paths.
+
+    Returns:
+        journal mode actually in effect
+    """
+    if is_network_path(db_path):
+        logger.warning(f"Network vault detected, keeping rollback journal: {db_path}")
+        return conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+    mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    if mode.lower() != "wal":
+        logger.warning(f"WAL not supported here, journal mode is {mode}")
+    else:
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return mode
+
+
+class BusyRetryPolicy:
+    """Retry database operations that fail with SQLITE_BUSY
+
+    Every write in PLMDatabase goes through :meth:`call`, so this is the one
+    place where lock contention is absorbed and counted. Nested calls on the
+    same thread are not retried separately; the outermost operation is re-run
+    as a whole so a partially applied transaction is never resumed.
+    """
+
+    def __init__(self, max_retries: int = 8, base_delay: float = 0.02, max_delay: float = 1.0):
+        """Create retry policy
+
+        Args:
+            max_retries: Retries after the first attempt (0 disables retrying)
+            base_delay: First backoff delay in seconds
+            max_delay: Cap for a single backoff delay in seconds
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {"operations": 0, "retried_operations": 0, "retries": 0, "failures": 0}
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for attempt N"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func, retrying on SQLITE_BUSY"""
+        depth = getattr(self._local, "depth", 0)
+        if depth or self.max_retries <= 0:
+            return self._run_nested(func, depth, *args, **kwargs)
+
+        attempt = 0
+        while True:
+            self._local.depth = 1
+            try:
+                result = func(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt >= self.max_retries:
+                    with self._lock:
+                        self.stats["operations"] += 1
+                        if is_busy_error(e):
+                            self.stats["failures"] += 1
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                with self._lock:
+                    self.stats["retries"] += 1
+                    if attempt == 1:
+                        self.stats["retried_operations"] += 1
+                logger.debug(f"Database busy in {getattr(func, '__name__', func)}, "
+                             f"retry {attempt}/{self.max_retries} in {delay * 1000:.0f} ms")
+                time.sleep(delay)
+                continue
+            finally:
+                self._local.depth = 0
+
+            with self._lock:
+                self.stats["operations"] += 1
+            return result
+
+    def _run_nested(self, func: Callable, depth: int, *args, **kwargs) -> Any:
+        """Run without retrying (nested call or retries disabled)"""
+        self._local.depth = depth + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.depth = depth
+
+    def get_stats(self) -> Dict[str, int]:
+        """Retry counters since startup"""
+        with self._lock:
+            return dict(self.stats)
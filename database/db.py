@@ -9,31 +9,379 @@ PLM Database Layer
 import sqlite3
 import os
 import json
+import shutil
 import hashlib
+import time
+import itertools
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator
 import logging
+import functools
 from contextlib import contextmanager
 import uuid
 
+from .pool import ConnectionPool
+from .concurrency import BusyRetryPolicy, enable_wal
+from .audit import AuditWriter
+from .audit_archive import AuditArchive, month_bounds, month_key, months_ago_start
+from .blobstore import BlobStore, deduplicate_vault
+from .checksums import CHUNK_SIZE
+from .chunkstore import ChunkStore, manifest_path
+from .reconcile import VaultReconciler, norm_path
+from .metadata import MetadataCache
+from .properties import property_rows, property_filter_sql
+from .backup import BackupEngine, load_backup_config
+from .locks import DEFAULT_LEASE_SECONDS, SWEEP_BATCH_SIZE, LockSweeper, lease_modifier
+from .lockd import IDEMPOTENT_OPS, LockdClient, LockdUnavailable
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# PLM ID prefix per file type (projects use PRJ)
+FILE_TYPE_PREFIXES = {"PART": "PAR", "ASSEMBLY": "ASM", "DRAWING": "DRW", "OTHER": "FIL"}
+PLM_ID_PREFIXES = ("PRJ", "PAR", "ASM", "DRW", "FIL")
+
+# Lifecycle: In-Work -> Released -> Obsolete (a Released version is never
+# reworked; a new version is created instead)
+LIFECYCLE_STATES = ("In-Work", "Released", "Obsolete")
+LIFECYCLE_TRANSITIONS = {
+    "In-Work": ("Released", "Obsolete"),
+    "Released": ("Obsolete",),
+    "Obsolete": (),
+}
+
+
+# Multi-level BOM explosion over assembly_relationships. Paths are
+# '/root/child/.../component/' strings of file IDs; an edge that would revisit
+# a file already on the path is skipped, so cyclic data cannot recurse forever.
+# A parent that pins the same child at several versions yields one line per
+# pin, so lines are linked to their parent line by parent_relationship_id
+# (NULL at the first level), not by path.
+_BOM_EXPLOSION_CTE = """
+    WITH RECURSIVE bom(relationship_id, parent_relationship_id, parent_file_id, component_file_id,
+                       component_version, instance_count, extended_qty, depth, path) AS (
+        SELECT a.relationship_id, NULL, a.assembly_file_id, a.component_file_id, a.component_version,
+               a.instance_count, a.instance_count, 1,
+               '/' || a.assembly_file_id || '/' || a.component_file_id || '/'
+        FROM assembly_relationships a
+        WHERE a.assembly_file_id = :root
+          AND a.component_file_id != :root
+        UNION ALL
+        SELECT a.relationship_id, b.relationship_id, a.assembly_file_id, a.component_file_id,
+               a.component_version, a.instance_count, b.extended_qty * a.instance_count, b.depth + 1,
+               b.path || a.component_file_id || '/'
+        FROM bom b
+        JOIN assembly_relationships a ON a.assembly_file_id = b.component_file_id
+        WHERE instr(b.path, '/' || a.component_file_id || '/') = 0
+          AND (:max_depth IS NULL OR b.depth < :max_depth)
+    )
+"""
+
+# Reverse BOM walk: from a component up through every consuming assembly.
+# Only the first level is filtered by the pinned component version and lists
+# every pin. Above it an assembly is reached once per path: the walk starts
+# from the distinct first-level assemblies and follows only each parent's
+# newest pin of the child, so an assembly pinning a sub-assembly at several
+# versions is not repeated.
+_WHERE_USED_CTE = """
+    WITH RECURSIVE direct(relationship_id, assembly_file_id, component_file_id, component_version,
+                          instance_count, depth, path) AS (
+        SELECT a.relationship_id, a.assembly_file_id, a.component_file_id, a.component_version,
+               a.instance_count, 1,
+               '/' || a.component_file_id || '/' || a.assembly_file_id || '/'
+        FROM assembly_relationships a
+        WHERE a.component_file_id = :component
+          AND a.assembly_file_id != :component
+          AND (:version IS NULL OR a.component_version = :version)
+    ),
+    upper(relationship_id, assembly_file_id, component_file_id, component_version,
+          instance_count, depth, path) AS (
+        SELECT a.relationship_id, a.assembly_file_id, a.component_file_id, a.component_version,
+               a.instance_count, 2,
+               d.path || a.assembly_file_id || '/'
+        FROM (SELECT DISTINCT assembly_file_id, path FROM direct) d
+        JOIN assembly_relationships a ON a.component_file_id = d.assembly_file_id
+        WHERE instr(d.path, '/' || a.assembly_file_id || '/') = 0
+          AND a.component_version = (
+              SELECT MAX(p.component_version) FROM assembly_relationships p
+              WHERE p.assembly_file_id = a.assembly_file_id
+                AND p.component_file_id = a.component_file_id)
+          AND (:max_depth IS NULL OR :max_depth > 1)
+        UNION ALL
+        SELECT a.relationship_id, a.assembly_file_id, a.component_file_id, a.component_version,
+               a.instance_count, u.depth + 1,
+               u.path || a.assembly_file_id || '/'
+        FROM upper u
+        JOIN assembly_relationships a ON a.component_file_id = u.assembly_file_id
+        WHERE instr(u.path, '/' || a.assembly_file_id || '/') = 0
+          AND a.component_version = (
+              SELECT MAX(p.component_version) FROM assembly_relationships p
+              WHERE p.assembly_file_id = a.assembly_file_id
+                AND p.component_file_id = a.component_file_id)
+          AND (:max_depth IS NULL OR u.depth < :max_depth)
+    ),
+    used AS (
+        SELECT * FROM direct
+        UNION ALL
+        SELECT * FROM upper
+    )
+"""
+
+# Lifecycle state of every version in a project at :as_of. The newest
+# checkpoint taken at or before :as_of supplies a base state; only
+# transitions in [taken_at, :as_of] above its transition_id high-water mark
+# are consulted, newest first, via idx_transitions_version_time. Versions with
+# neither fall back to the from_state of their first later transition, and
+# versions that never transitioned keep their current state.
+_LIFECYCLE_AS_OF_QUERY = """
+    WITH cp AS (
+        SELECT checkpoint_id, taken_at, last_transition_id
+        FROM lifecycle_checkpoints
+        WHERE project_id = :project AND taken_at <= :as_of
+        ORDER BY taken_at DESC, checkpoint_id DESC
+        LIMIT 1
+    ),
+    states AS MATERIALIZED (
+        SELECT v.version_id, v.file_id, f.file_name, f.plm_id, v.version_number,
+               v.revision_letter, v.author, v.created_timestamp,
+               COALESCE(
+                   (SELECT t.to_state FROM version_transitions t
+                    WHERE t.version_id = v.version_id
+                      AND t.promotion_timestamp <= :as_of
+                      AND t.promotion_timestamp >= COALESCE((SELECT taken_at FROM cp), '')
+                      AND t.transition_id > COALESCE((SELECT last_transition_id FROM cp), 0)
+                    ORDER BY t.promotion_timestamp DESC, t.transition_id DESC
+                    LIMIT 1),
+                   (SELECT s.lifecycle_state FROM lifecycle_checkpoint_states s
+                    WHERE s.checkpoint_id = (SELECT checkpoint_id FROM cp)
+                      AND s.version_id = v.version_id),
+                   (SELECT t.from_state FROM version_transitions t
+                    WHERE t.version_id = v.version_id
+                      AND t.promotion_timestamp > :as_of
+                    ORDER BY t.promotion_timestamp, t.transition_id
+                    LIMIT 1),
+                   v.lifecycle_state
+               ) AS lifecycle_state
+        FROM versions v
+        JOIN files f ON f.file_id = v.file_id
+        WHERE f.project_id = :project
+          -- julianday() also orders rows stored before ingest normalized them
+          AND julianday(v.created_timestamp) <= julianday(:as_of)
+    )
+    SELECT * FROM states
+    WHERE :state IS NULL OR lifecycle_state = :state
+    ORDER BY file_name, version_number
+"""
+
+
+# Full-text search index. Files use rowid file_id*2 and versions
+# version_id*2+1, so both live in one table and the triggers can address
+# their row directly. Property JSON is flattened to "key value" text;
+# invalid JSON is indexed as empty.
+_PROPERTIES_TEXT = """
+    TRIM(
+        COALESCE((SELECT group_concat(COALESCE(key, '') || ' ' || value, ' ')
+                  FROM json_tree(CASE WHEN json_valid({row}.custom_properties)
+                                      THEN {row}.custom_properties ELSE '{{}}' END)
+                  WHERE type NOT IN ('object', 'array')), '')
+        || ' ' ||
+        COALESCE((SELECT group_concat(COALESCE(key, '') || ' ' || value, ' ')
+                  FROM json_tree(CASE WHEN json_valid({row}.solidworks_properties)
+                                      THEN {row}.solidworks_properties ELSE '{{}}' END)
+                  WHERE type NOT IN ('object', 'array')), '')
+    )
+"""
+
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    file_id UNINDEXED,
+    file_name,
+    description,
+    change_note,
+    properties,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_search_files_insert AFTER INSERT ON files
+BEGIN
+    INSERT INTO search_index (rowid, file_id, file_name, description, change_note, properties)
+    VALUES (new.file_id * 2, new.file_id, new.file_name, COALESCE(new.description, ''), '', '');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_files_update AFTER UPDATE OF file_name, description ON files
+BEGIN
+    UPDATE search_index SET file_name = new.file_name, description = COALESCE(new.description, '')
+    WHERE rowid = new.file_id * 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_files_delete AFTER DELETE ON files
+BEGIN
+    DELETE FROM search_index WHERE rowid = old.file_id * 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_versions_insert AFTER INSERT ON versions
+BEGIN
+    INSERT INTO search_index (rowid, file_id, file_name, description, change_note, properties)
+    VALUES (new.version_id * 2 + 1, new.file_id, '', '', COALESCE(new.change_note, ''),
+            """ + _PROPERTIES_TEXT.format(row="new") + """);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_versions_update
+AFTER UPDATE OF change_note, custom_properties, solidworks_properties ON versions
+BEGIN
+    UPDATE search_index SET change_note = COALESCE(new.change_note, ''),
+        properties = """ + _PROPERTIES_TEXT.format(row="new") + """
+    WHERE rowid = new.version_id * 2 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_search_versions_delete AFTER DELETE ON versions
+BEGIN
+    DELETE FROM search_index WHERE rowid = old.version_id * 2 + 1;
+END;
+"""
+
+# bm25 column weights: file_id, file_name, description, change_note, properties
+_SEARCH_WEIGHTS = "0.0, 10.0, 5.0, 2.0, 1.0"
+
+# Normalized, indexed copy of versions.custom_properties and
+# solidworks_properties (one row per flattened key)
+_PROPERTY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS version_properties (
+    version_id INTEGER NOT NULL REFERENCES versions(version_id),
+    source TEXT NOT NULL,
+    key TEXT NOT NULL COLLATE NOCASE,
+    value TEXT COLLATE NOCASE,
+    numeric_value REAL,
+    
+    PRIMARY KEY (version_id, source, key),
+    CHECK (source IN ('custom', 'solidworks'))
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_version_properties_value ON version_properties(key, value);
+CREATE INDEX IF NOT EXISTS idx_version_properties_numeric ON version_properties(key, numeric_value)
+    WHERE numeric_value IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS trg_version_properties_delete AFTER DELETE ON versions
+BEGIN
+    DELETE FROM version_properties WHERE version_id = old.version_id;
+END;
+"""
+
+# Change feed: every insert/update/delete on these tables appends
+# (table, primary key, operation) to change_log. seq is AUTOINCREMENT, so it
+# is never reused, and SQLite's single writer makes commit order = seq order.
+_CHANGE_LOG_TABLES = {
+    "projects": "project_id",
+    "files": "file_id",
+    "versions": "version_id",
+    "file_locks": "lock_id",
+    "assembly_relationships": "relationship_id",
+}
+
+_CHANGE_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    operation TEXT NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    CHECK (operation IN ('INSERT', 'UPDATE', 'DELETE'))
+);
+""" + "".join(f"""
+CREATE TRIGGER IF NOT EXISTS trg_change_log_{table}_{op.lower()} AFTER {op} ON {table}
+BEGIN
+    INSERT INTO change_log (table_name, row_id, operation)
+    VALUES ('{table}', {"old" if op == "DELETE" else "new"}.{key}, '{op}');
+END;
+""" for table, key in _CHANGE_LOG_TABLES.items() for op in ("INSERT", "UPDATE", "DELETE"))
+
+
+class LockConflictError(Exception):
+    """Raised when a file is already locked by another user
+    
+    For batch requests ``conflicts`` maps every refused file_id to its
+    holder; file_id / locked_by describe the first of them.
+    """
+    
+    def __init__(self, file_id: int, locked_by: str, conflicts: Optional[Dict[int, str]] = None):
+        self.conflicts = conflicts or {file_id: locked_by}
+        if len(self.conflicts) > 1:
+            holders = ", ".join(f"{fid} ({holder})" for fid, holder in sorted(self.conflicts.items()))
+            super().__init__(f"{len(self.conflicts)} files locked by other users: {holders}")
+        else:
+            super().__init__(f"File locked by {locked_by}")
+        self.file_id = file_id
+        self.locked_by = locked_by
+
+
+def _busy_retry(method):
+    """Route a write operation through the database's SQLITE_BUSY retry policy"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._retry.call(method, self, *args, **kwargs)
+    return wrapper
+
+
 class PLMDatabase:
     """Main database interface for PLM system"""
     
-    def __init__(self, vault_path: str):
+    def __init__(self, vault_path: str, pool_size: int = 5, statement_cache_size: int = 128,
+                 concurrent: bool = False, busy_timeout_ms: int = 5000, max_retries: int = 8,
+                 audit_mode: str = "sync", audit_queue_size: int = 10000,
+                 storage_mode: str = "blob", lock_lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 lock_sweep_interval: Optional[float] = None, use_lockd: bool = True):
         """Initialize PLM database
         
         Args:
             vault_path: Root path to PLM_VAULT directory
+            pool_size: Maximum number of pooled connections
+            statement_cache_size: Prepared statements cached per connection
+            concurrent: Enable concurrent-writer mode (WAL, busy_timeout, retries)
+            busy_timeout_ms: SQLite busy_timeout used in concurrent mode
+            max_retries: SQLITE_BUSY retries per operation in concurrent mode
+            audit_mode: "sync" writes each audit record before returning;
+                "async" queues records for a background batch writer
+            audit_queue_size: Queue bound for async audit mode
+            storage_mode: How store_version_file keeps version bytes: "blob"
+                (whole file, hardlinked from Blobs/) or "chunked"
+                (content-defined chunks shared by all versions of a part)
+            lock_lease_seconds: Default lease of a file lock; holders extend
+                it with renew_lock, lapsed leases can be taken over
+            lock_sweep_interval: Seconds between background sweeps that
+                release lapsed leases (None = no sweeper thread)
+            use_lockd: Send lock requests to the vault's lock daemon
+                (plm lockd) when one is running on this machine
         """
         self.vault_path = vault_path
         self.db_path = os.path.join(vault_path, "db.sqlite")
+        self.concurrent = concurrent
+        self.busy_timeout_ms = busy_timeout_ms
+        self.journal_mode = None
+        self._retry = BusyRetryPolicy(max_retries=max_retries if concurrent else 0)
         self._init_database()
+        self._pool = ConnectionPool(self.db_path, pool_size=pool_size,
+                                    statement_cache_size=statement_cache_size,
+                                    on_connect=self._configure_connection)
+        
+        if audit_mode not in ("sync", "async"):
+            raise ValueError(f"Invalid audit_mode: {audit_mode}")
+        if storage_mode not in ("blob", "chunked"):
+            raise ValueError(f"Invalid storage_mode: {storage_mode}")
+        self.storage_mode = storage_mode
+        self.metadata = MetadataCache()
+        self._audit_archive = AuditArchive(os.path.join(vault_path, "Logs", "audit"))
+        self._audit = None
+        if audit_mode == "async":
+            self._audit = AuditWriter(self._write_audit_batch, max_queue=audit_queue_size)
+        self.lock_lease_seconds = lock_lease_seconds
+        self._lockd = LockdClient(vault_path) if use_lockd else None
+        self._lock_sweeper = None
+        if lock_sweep_interval:
+            self._lock_sweeper = LockSweeper(self.expire_locks, interval=lock_sweep_interval)
     
     def _init_database(self):
         """Create database file if not exists, initialize schema"""
@@ -43,13 +391,28 @@ class PLMDatabase:
         
         # Connect and initialize
         conn = sqlite3.connect(self.db_path)
+        self._configure_connection(conn)
         cursor = conn.cursor()
         
         # Enable foreign keys
         cursor.execute("PRAGMA foreign_keys = ON")
         
+        # Concurrent-writer mode: WAL lets readers proceed while one writer commits
+        if self.concurrent:
+            self.journal_mode = enable_wal(conn, self.db_path)
+        else:
+            self.journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        
+        # One write transaction for the whole setup, so processes opening a
+        # new or outdated vault at the same time migrate it one after another
+        cursor.execute("BEGIN IMMEDIATE")
+        
         # Create tables
         self._create_schema(cursor)
+        self._migrate_schema(cursor)
+        self._create_property_index(cursor)
+        self._execute_script(cursor, _CHANGE_LOG_SCHEMA)
+        self.search_available = self._create_search_index(cursor)
         
         conn.commit()
         conn.close()
@@ -98,6 +461,7 @@ CREATE TABLE IF NOT EXISTS files (
     metadata_file_path TEXT,
     file_state TEXT DEFAULT 'Working',
     is_active BOOLEAN DEFAULT 1,
+    latest_version_id INTEGER REFERENCES versions(version_id),
     
     FOREIGN KEY (project_id) REFERENCES projects(project_id),
     CHECK (file_name != ''),
@@ -169,6 +533,7 @@ CREATE TABLE IF NOT EXISTS file_locks (
     lock_reason TEXT,
     session_id TEXT UNIQUE,
     is_stale BOOLEAN DEFAULT 0,
+    expires_at TIMESTAMP,
     
     FOREIGN KEY (file_id) REFERENCES files(file_id)
 );
@@ -196,6 +561,33 @@ CREATE TABLE IF NOT EXISTS version_transitions (
 
 CREATE INDEX IF NOT EXISTS idx_transitions_file ON version_transitions(file_id);
 CREATE INDEX IF NOT EXISTS idx_transitions_timestamp ON version_transitions(promotion_timestamp);
+CREATE INDEX IF NOT EXISTS idx_transitions_file_time ON version_transitions(file_id, promotion_timestamp);
+CREATE INDEX IF NOT EXISTS idx_transitions_version_time
+    ON version_transitions(version_id, promotion_timestamp, transition_id);
+
+-- Lifecycle checkpoints (state of every version in a project at taken_at;
+-- last_transition_id is the newest transition already reflected)
+CREATE TABLE IF NOT EXISTS lifecycle_checkpoints (
+    checkpoint_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL,
+    taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_transition_id INTEGER NOT NULL DEFAULT 0,
+    version_count INTEGER DEFAULT 0,
+    
+    FOREIGN KEY (project_id) REFERENCES projects(project_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_checkpoints_project ON lifecycle_checkpoints(project_id, taken_at);
+
+CREATE TABLE IF NOT EXISTS lifecycle_checkpoint_states (
+    checkpoint_id INTEGER NOT NULL,
+    version_id INTEGER NOT NULL,
+    lifecycle_state TEXT NOT NULL,
+    
+    PRIMARY KEY (checkpoint_id, version_id),
+    FOREIGN KEY (checkpoint_id) REFERENCES lifecycle_checkpoints(checkpoint_id),
+    FOREIGN KEY (version_id) REFERENCES versions(version_id)
+) WITHOUT ROWID;
 
 -- Access log
 CREATE TABLE IF NOT EXISTS access_log (
@@ -217,55 +609,279 @@ CREATE INDEX IF NOT EXISTS idx_log_user ON access_log(user);
 CREATE INDEX IF NOT EXISTS idx_log_action ON access_log(action);
 CREATE INDEX IF NOT EXISTS idx_log_timestamp ON access_log(action_timestamp);
 
--- Views
-CREATE VIEW IF NOT EXISTS latest_versions AS
-SELECT 
-    f.file_id,
-    f.plm_id,
-    f.file_name,
-    v.version_id,
-    v.version_number,
-    v.revision_letter,
-    v.author,
-    v.created_timestamp,
-    v.lifecycle_state,
-    f.locked_by,
-    f.is_active
-FROM files f
-JOIN versions v ON f.file_id = v.file_id
-WHERE v.version_id = (
-    SELECT MAX(version_id) FROM versions WHERE file_id = f.file_id
+-- Archived access_log month partitions (files under Logs/audit)
+CREATE TABLE IF NOT EXISTS audit_partitions (
+    partition_key TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    start_timestamp TIMESTAMP NOT NULL,
+    end_timestamp TIMESTAMP NOT NULL,
+    row_count INTEGER DEFAULT 0,
+    archived_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_audit_partitions_range ON audit_partitions(start_timestamp, end_timestamp);
+
+-- Content-addressable blobs (files under Blobs/ab/cd/<sha256>)
+CREATE TABLE IF NOT EXISTS blobs (
+    checksum TEXT PRIMARY KEY,
+    size_bytes INTEGER NOT NULL,
+    created_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE VIEW IF NOT EXISTS active_locks AS
-SELECT 
-    lock_id,
-    file_id,
-    locked_by,
-    lock_timestamp,
-    session_id,
-    CAST((julianday('now') - julianday(lock_timestamp)) * 24 AS INTEGER) AS hours_locked
-FROM file_locks
-WHERE lock_release_timestamp IS NULL
-  AND is_stale = 0;
+-- PLM ID sequences (last allocated number per prefix)
+CREATE TABLE IF NOT EXISTS id_sequences (
+    prefix TEXT PRIMARY KEY,
+    last_value INTEGER NOT NULL DEFAULT 0,
+    
+    CHECK (last_value >= 0)
+);
+        """
+        
+        self._execute_script(cursor, schema)
+    
+    def _execute_script(self, cursor, script: str):
+        """Run a multi-statement script inside the current transaction
+        
+        cursor.executescript() commits first, which would release the
+        IMMEDIATE lock taken in _init_database.
+        """
+        statement = ""
+        for line in script.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                cursor.execute(statement)
+                statement = ""
+    
+    def _migrate_schema(self, cursor):
+        """Bring an existing vault database up to the current schema"""
+        
+        # Maintained latest-version pointer on files
+        if self._add_column(cursor, "files", "latest_version_id",
+                            "INTEGER REFERENCES versions(version_id)"):
+            cursor.execute("""
+                UPDATE files SET latest_version_id = (
+                    SELECT MAX(version_id) FROM versions WHERE versions.file_id = files.file_id
+                )
+            """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_latest_version ON files(latest_version_id)")
+        
+        # latest_versions view reads the pointer instead of a correlated MAX()
+        self._ensure_view(cursor, "latest_versions", """
+            CREATE VIEW latest_versions AS
+            SELECT 
+                f.file_id,
+                f.plm_id,
+                f.file_name,
+                v.version_id,
+                v.version_number,
+                v.revision_letter,
+                v.author,
+                v.created_timestamp,
+                v.lifecycle_state,
+                f.locked_by,
+                f.is_active
+            FROM files f
+            JOIN versions v ON v.version_id = f.latest_version_id
+        """)
+        
+        # Seed ID sequences from IDs already issued (full numeric suffix, not
+        # just the last three digits)
+        cursor.execute("SELECT prefix FROM id_sequences")
+        seeded = {row[0] for row in cursor.fetchall()}
+        for prefix in PLM_ID_PREFIXES:
+            if prefix in seeded:
+                continue
+            pattern = f"PLM-{prefix}-%"
+            start = len(f"PLM-{prefix}-") + 1
+            cursor.execute("""
+                INSERT INTO id_sequences (prefix, last_value)
+                SELECT ?, COALESCE(MAX(n), 0) FROM (
+                    SELECT CAST(SUBSTR(plm_id, ?) AS INTEGER) AS n FROM files WHERE plm_id LIKE ?
+                    UNION ALL
+                    SELECT CAST(SUBSTR(plm_id, ?) AS INTEGER) AS n FROM projects WHERE plm_id LIKE ?
+                )
+            """, (prefix, start, pattern, start, pattern))
+        
+        # Lock leases: open locks from before leases get the old 24 hour stale age
+        if self._add_column(cursor, "file_locks", "expires_at", "TIMESTAMP"):
+            cursor.execute("""
+                UPDATE file_locks SET expires_at = datetime(lock_timestamp, ?)
+                WHERE lock_release_timestamp IS NULL
+            """, (lease_modifier(DEFAULT_LEASE_SECONDS),))
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_locks_expires ON file_locks(expires_at)
+            WHERE lock_release_timestamp IS NULL
+        """)
+        
+        self._ensure_view(cursor, "active_locks", """
+            CREATE VIEW active_locks AS
+            SELECT 
+                lock_id,
+                file_id,
+                locked_by,
+                lock_timestamp,
+                expires_at,
+                session_id,
+                CAST((julianday('now') - julianday(lock_timestamp)) * 24 AS INTEGER) AS hours_locked
+            FROM file_locks
+            WHERE lock_release_timestamp IS NULL
+              AND expires_at > CURRENT_TIMESTAMP
+        """)
+    
+    def _ensure_view(self, cursor, name: str, create_sql: str):
+        """Create a view, replacing it only if its stored definition differs
+        
+        Dropping and recreating on every open would bump the schema cookie
+        and force every other connection to re-prepare its statements.
+        """
+        create_sql = create_sql.strip()
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (name,))
+        row = cursor.fetchone()
+        if row and row[0] == create_sql:
+            return
+        cursor.execute(f"DROP VIEW IF EXISTS {name}")
+        cursor.execute(create_sql)
+    
+    def _create_property_index(self, cursor):
+        """Create version_properties, backfilling it for vaults that predate it"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'version_properties'")
+        exists = cursor.fetchone() is not None
+        self._execute_script(cursor, _PROPERTY_SCHEMA)
+        if not exists:
+            count = self._fill_property_index(cursor)
+            logger.info(f"Migrated schema: indexed {count} version properties")
+    
+    def _fill_property_index(self, cursor, page_size: int = 5000) -> int:
+        """(Re)build version_properties from the JSON columns, one page at a time
+        
+        Returns:
+            number of property rows written
+        """
+        cursor.execute("DELETE FROM version_properties")
+        total = 0
+        last_id = 0
+        while True:
+            cursor.execute("""
+                SELECT version_id, custom_properties, solidworks_properties FROM versions
+                WHERE version_id > ?
+                  AND (custom_properties IS NOT NULL OR solidworks_properties IS NOT NULL)
+                ORDER BY version_id
+                LIMIT ?
+            """, (last_id, page_size))
+            page = cursor.fetchall()
+            if not page:
+                return total
+            rows = [row for version_id, custom, sw in page
+                    for row in property_rows(version_id, custom, sw)]
+            self._insert_properties(cursor, rows)
+            total += len(rows)
+            last_id = page[-1][0]
+    
+    def _insert_properties(self, cursor, rows: List[Tuple]):
+        """Insert version_properties rows (version_id, source, key, value, numeric_value)"""
+        if rows:
+            cursor.executemany("""
+                INSERT INTO version_properties (version_id, source, key, value, numeric_value)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+    
+    def _create_search_index(self, cursor) -> bool:
+        """Create the FTS5 search index and its triggers, backfilling new indexes
+        
+        Returns:
+            False if this SQLite build has no FTS5 (search is then disabled)
         """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index'")
+        exists = cursor.fetchone() is not None
+        try:
+            self._execute_script(cursor, _SEARCH_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search disabled (FTS5 unavailable): {e}")
+            return False
+        if not exists:
+            self._fill_search_index(cursor)
+            logger.info("Migrated schema: built search_index")
+        return True
+    
+    def _fill_search_index(self, cursor):
+        """(Re)build search_index from files and versions"""
+        cursor.execute("DELETE FROM search_index")
+        cursor.execute("""
+            INSERT INTO search_index (rowid, file_id, file_name, description, change_note, properties)
+            SELECT file_id * 2, file_id, file_name, COALESCE(description, ''), '', ''
+            FROM files
+        """)
+        cursor.execute("""
+            INSERT INTO search_index (rowid, file_id, file_name, description, change_note, properties)
+            SELECT v.version_id * 2 + 1, v.file_id, '', '', COALESCE(v.change_note, ''),
+                   """ + _PROPERTIES_TEXT.format(row="v") + """
+            FROM versions v
+        """)
+    
+    def _add_column(self, cursor, table: str, column: str, definition: str) -> bool:
+        """Add column to existing table if missing
         
-        cursor.executescript(schema)
+        Returns:
+            True if the column was added
+        """
+        cursor.execute(f"PRAGMA table_info({table})")
+        if any(row[1] == column for row in cursor.fetchall()):
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Migrated schema: added {table}.{column}")
+        return True
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
+        """Context manager for database connections
+        
+        Hands out a warm connection from the pool; uncommitted work is
+        rolled back when the block exits.
+        """
+        with self._pool.connection() as conn:
             yield conn
-        finally:
-            conn.close()
+    
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Per-connection settings applied to every new connection"""
+        if self.concurrent:
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+    
+    def _begin_write(self, conn: sqlite3.Connection):
+        """Take the write lock up front for read-then-write operations
+        
+        Without this the read (e.g. MAX(version_number)) runs outside the
+        transaction and two writers can compute the same next value.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+    
+    def get_concurrency_stats(self) -> Dict[str, Any]:
+        """Journal mode and SQLITE_BUSY retry counters"""
+        return {
+            "concurrent": self.concurrent,
+            "journal_mode": self.journal_mode,
+            "busy_timeout_ms": self.busy_timeout_ms if self.concurrent else None,
+            **self._retry.get_stats()
+        }
+    
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Connection pool usage counters"""
+        return self._pool.get_stats()
+    
+    def close(self):
+        """Stop the lock sweeper, flush pending audit records and close all pooled connections"""
+        if self._lock_sweeper:
+            self._lock_sweeper.close()
+        if self._lockd:
+            self._lockd.close()
+        if self._audit:
+            self._audit.close()
+        self._pool.close_all()
     
     # ========================
     # PROJECT OPERATIONS
     # ========================
     
+    @_busy_retry
     def create_project(self, name: str, owner: str, description: str = "") -> Dict[str, Any]:
         """Create new project
         
@@ -279,6 +895,7 @@ WHERE lock_release_timestamp IS NULL
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._begin_write(conn)
             
             # Generate PLM ID
             plm_id = self._get_next_plm_id(cursor, "PRJ")
@@ -328,8 +945,10 @@ WHERE lock_release_timestamp IS NULL
     # FILE OPERATIONS
     # ========================
     
+    @_busy_retry
     def create_file(self, project_id: int, file_name: str, file_type: str, 
-                   vault_path: str, description: str = "", metadata_file_path: str = "") -> Dict[str, Any]:
+                   vault_path: str, description: str = "", metadata_file_path: str = "",
+                   plm_id: Optional[str] = None) -> Dict[str, Any]:
         """Create new file record in vault
         
         Args:
@@ -339,17 +958,19 @@ WHERE lock_release_timestamp IS NULL
             vault_path: Vault path to file folder (e.g., Projects/ProjectName/Parts/FileName/)
             description: Optional description
             metadata_file_path: Path to part_meta.json file
+            plm_id: PLM ID from reserve_plm_ids(); allocated if omitted
             
         Returns:
             dict with file_id, plm_id
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._begin_write(conn)
             
             # Generate PLM ID
-            type_map = {"PART": "PAR", "ASSEMBLY": "ASM", "DRAWING": "DRW"}
-            type_code = type_map.get(file_type, "FIL")
-            plm_id = self._get_next_plm_id(cursor, type_code)
+            if not plm_id:
+                type_code = FILE_TYPE_PREFIXES.get(file_type, "FIL")
+                plm_id = self._get_next_plm_id(cursor, type_code)
             
             try:
                 # Create folder structure on disk
@@ -433,10 +1054,63 @@ WHERE lock_release_timestamp IS NULL
             )
             return [dict(row) for row in cursor.fetchall()]
     
+    def list_files(self, active_only: bool = True) -> List[Dict]:
+        """List files across all projects"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            query = "SELECT * FROM files"
+            if active_only:
+                query += " WHERE is_active = 1"
+            cursor.execute(query)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @_busy_retry
+    def deactivate_records(self, project_ids: List[int], file_ids: List[int]):
+        """Soft-delete projects and files (is_active = 0) in one transaction"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            cursor.executemany(
+                "UPDATE projects SET is_active = 0, modified_date = CURRENT_TIMESTAMP WHERE project_id = ?",
+                [(project_id,) for project_id in project_ids]
+            )
+            cursor.executemany(
+                "UPDATE files SET is_active = 0, modified_date = CURRENT_TIMESTAMP WHERE file_id = ?",
+                [(file_id,) for file_id in file_ids]
+            )
+            conn.commit()
+        logger.info(f"Deactivated {len(project_ids)} project(s) and {len(file_ids)} file(s)")
+    
+    def iter_project_files(self, project_id: int, page_size: int = 500,
+                           active_only: bool = True) -> Iterator[Dict]:
+        """Stream files in a project ordered by name, one keyset page at a time
+        
+        Each page is a separate short query (file_name > last seen name), so no
+        connection is held between pages and memory stays at one page.
+        """
+        query = "SELECT * FROM files WHERE project_id = ? AND file_name > ?"
+        if active_only:
+            query += " AND is_active = 1"
+        query += " ORDER BY file_name LIMIT ?"
+        
+        last_name = ""
+        while True:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (project_id, last_name, page_size))
+                rows = cursor.fetchall()
+            
+            for row in rows:
+                yield dict(row)
+            if len(rows) < page_size:
+                return
+            last_name = rows[-1]["file_name"]
+    
     # ========================
     # VERSION OPERATIONS
     # ========================
     
+    @_busy_retry
     def create_version(self, file_id: int, author: str, change_note: str = "",
                       file_path: str = "", file_size: int = 0, checksum: str = "",
                       custom_properties: Optional[Dict] = None, 
@@ -458,6 +1132,7 @@ WHERE lock_release_timestamp IS NULL
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._begin_write(conn)
             
             # Get next version number
             cursor.execute(
@@ -475,19 +1150,23 @@ WHERE lock_release_timestamp IS NULL
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     file_id, next_version, author, change_note, file_path, file_size,
-                    checksum,
+                    checksum or None,
                     json.dumps(custom_properties) if custom_properties else None,
                     json.dumps(solidworks_properties) if solidworks_properties else None
                 ))
-                
-                # Update file's current_version
-                cursor.execute(
-                    "UPDATE files SET current_version = ?, modified_date = CURRENT_TIMESTAMP WHERE file_id = ?",
-                    (next_version, file_id)
+                version_id = cursor.lastrowid
+                self._insert_properties(
+                    cursor, property_rows(version_id, custom_properties, solidworks_properties)
                 )
                 
+                # Update file's current_version and latest-version pointer
+                cursor.execute("""
+                    UPDATE files SET current_version = ?, latest_version_id = ?,
+                                     modified_date = CURRENT_TIMESTAMP
+                    WHERE file_id = ?
+                """, (next_version, version_id, file_id))
+                
                 conn.commit()
-                version_id = cursor.lastrowid
                 
                 logger.info(f"Created version {next_version} for file_id {file_id}")
                 return {
@@ -499,6 +1178,137 @@ WHERE lock_release_timestamp IS NULL
                 logger.error(f"Failed to create version: {e}")
                 raise
     
+    def create_versions_bulk(self, records: Iterable[Dict[str, Any]],
+                             chunk_size: int = 5000) -> Dict[str, Any]:
+        """Ingest many versions (e.g. a vault migration) in chunked transactions
+        
+        Version numbers are allocated in memory per file, continuing from the
+        highest number already stored. Each chunk is written with executemany
+        in a single transaction that also moves files.current_version and
+        latest_version_id for the files it touched, so if a later chunk fails
+        the committed chunks are complete and current_version shows where to
+        resume. Intended for offline migrations: interleaving create_version()
+        calls for the same files is not supported.
+        
+        Args:
+            records: Iterable of dicts with file_id and author, plus any of
+                change_note, file_path, file_size, checksum, custom_properties,
+                solidworks_properties, created_timestamp (datetime or ISO-8601
+                text, stored as UTC 'YYYY-MM-DD HH:MM:SS'), lifecycle_state
+            chunk_size: Versions written per transaction
+            
+        Returns:
+            dict with versions, files, chunks, elapsed_s, versions_per_sec
+        """
+        start = time.perf_counter()
+        next_numbers: Dict[int, int] = {}
+        total = 0
+        chunks = 0
+        
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                next_numbers = self._write_version_chunk(chunk, next_numbers)
+                total += len(chunk)
+                chunks += 1
+                chunk = []
+        if chunk:
+            next_numbers = self._write_version_chunk(chunk, next_numbers)
+            total += len(chunk)
+            chunks += 1
+        
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Bulk ingested {total} versions for {len(next_numbers)} files "
+                    f"in {elapsed:.2f}s ({rate:.0f} versions/s)")
+        return {
+            "versions": total,
+            "files": len(next_numbers),
+            "chunks": chunks,
+            "elapsed_s": elapsed,
+            "versions_per_sec": rate
+        }
+    
+    @_busy_retry
+    def _write_version_chunk(self, chunk: List[Dict[str, Any]],
+                             next_numbers: Dict[int, int]) -> Dict[int, int]:
+        """Allocate version numbers for one chunk and insert it in one transaction
+        
+        Returns:
+            updated copy of the file_id -> last version number map
+        """
+        numbers = dict(next_numbers)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            
+            # Seed numbering for files not seen in earlier chunks
+            unseen = list({r["file_id"] for r in chunk if r["file_id"] not in numbers})
+            for i in range(0, len(unseen), 500):
+                batch = unseen[i:i + 500]
+                for file_id in batch:
+                    numbers[file_id] = 0
+                placeholders = ",".join("?" * len(batch))
+                cursor.execute(f"""
+                    SELECT file_id, MAX(version_number) FROM versions
+                    WHERE file_id IN ({placeholders})
+                    GROUP BY file_id
+                """, batch)
+                for file_id, max_version in cursor.fetchall():
+                    numbers[file_id] = max_version or 0
+            
+            rows = []
+            for r in chunk:
+                numbers[r["file_id"]] += 1
+                custom_properties = r.get("custom_properties")
+                solidworks_properties = r.get("solidworks_properties")
+                rows.append((
+                    r["file_id"], numbers[r["file_id"]], r["author"], r.get("change_note", ""),
+                    r.get("file_path", ""), r.get("file_size", 0), r.get("checksum") or None,
+                    json.dumps(custom_properties) if custom_properties else None,
+                    json.dumps(solidworks_properties) if solidworks_properties else None,
+                    self._utc_timestamp(r["created_timestamp"]) if r.get("created_timestamp") else None,
+                    r.get("lifecycle_state")
+                ))
+            
+            cursor.executemany("""
+                INSERT INTO versions (file_id, version_number, author, change_note,
+                                    file_path, file_size_bytes, checksum,
+                                    custom_properties, solidworks_properties,
+                                    created_timestamp, lifecycle_state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?,
+                        COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, 'In-Work'))
+            """, rows)
+            
+            # Under BEGIN IMMEDIATE the chunk received consecutive version_ids
+            cursor.execute("SELECT last_insert_rowid()")
+            first_id = cursor.fetchone()[0] - len(chunk) + 1
+            self._insert_properties(cursor, [
+                prop
+                for offset, r in enumerate(chunk)
+                for prop in property_rows(first_id + offset, r.get("custom_properties"),
+                                          r.get("solidworks_properties"))
+            ])
+            
+            # Point the files this chunk touched at their last version, in the
+            # same transaction, so a failure in a later chunk leaves no file
+            # with committed versions it does not show as current
+            touched = {r["file_id"] for r in chunk}
+            cursor.executemany("""
+                UPDATE files SET current_version = ?,
+                    latest_version_id = (
+                        SELECT MAX(version_id) FROM versions
+                        WHERE file_id = files.file_id AND version_number = ?
+                    ),
+                    modified_date = CURRENT_TIMESTAMP
+                WHERE file_id = ?
+            """, [(numbers[file_id], numbers[file_id], file_id) for file_id in touched])
+            
+            conn.commit()
+        return numbers
+    
     def get_version(self, version_id: int) -> Optional[Dict]:
         """Get version by ID"""
         with self.get_connection() as conn:
@@ -507,6 +1317,17 @@ WHERE lock_release_timestamp IS NULL
             row = cursor.fetchone()
             return dict(row) if row else None
     
+    def get_version_by_number(self, file_id: int, version_number: int) -> Optional[Dict]:
+        """Get a file's version by number (highest revision letter if several)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM versions WHERE file_id = ? AND version_number = ?
+                ORDER BY revision_letter DESC LIMIT 1
+            """, (file_id, version_number))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
     def list_file_versions(self, file_id: int) -> List[Dict]:
         """List all versions of a file"""
         with self.get_connection() as conn:
@@ -517,72 +1338,304 @@ WHERE lock_release_timestamp IS NULL
             )
             return [dict(row) for row in cursor.fetchall()]
     
+    def iter_file_versions(self, file_id: int, page_size: int = 200) -> Iterator[Dict]:
+        """Stream versions of a file, newest first, using keyset pagination"""
+        last_key = None
+        while True:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if last_key is None:
+                    cursor.execute("""
+                        SELECT * FROM versions WHERE file_id = ?
+                        ORDER BY version_number DESC, revision_letter DESC LIMIT ?
+                    """, (file_id, page_size))
+                else:
+                    cursor.execute("""
+                        SELECT * FROM versions
+                        WHERE file_id = ? AND (version_number, revision_letter) < (?, ?)
+                        ORDER BY version_number DESC, revision_letter DESC LIMIT ?
+                    """, (file_id, *last_key, page_size))
+                rows = cursor.fetchall()
+            
+            for row in rows:
+                yield dict(row)
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1]["version_number"], rows[-1]["revision_letter"])
+    
     def get_latest_version(self, file_id: int) -> Optional[Dict]:
         """Get latest version of file"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT * FROM versions 
-                WHERE file_id = ? 
-                ORDER BY version_id DESC 
-                LIMIT 1
+                SELECT v.* FROM files f
+                JOIN versions v ON v.version_id = f.latest_version_id
+                WHERE f.file_id = ?
             """, (file_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
     
+    def list_latest_versions(self, project_id: int, active_only: bool = True) -> List[Dict]:
+        """List every file in a project with its latest version, in one indexed pass
+        
+        Files without any version are included with NULL version columns.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT 
+                    f.file_id, f.plm_id, f.file_name, f.file_type, f.current_version,
+                    f.locked_by, f.lock_timestamp, f.file_state, f.vault_path, f.is_active,
+                    v.version_id, v.version_number, v.revision_letter, v.author,
+                    v.created_timestamp, v.change_note,
+                    COALESCE(v.lifecycle_state, f.lifecycle_state) AS lifecycle_state
+                FROM files f
+                LEFT JOIN versions v ON v.version_id = f.latest_version_id
+                WHERE f.project_id = ?
+            """
+            if active_only:
+                query += " AND f.is_active = 1"
+            query += " ORDER BY f.file_name"
+            cursor.execute(query, (project_id,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_versions_missing_checksum(self, after_version_id: int = 0,
+                                      limit: int = 200) -> List[Dict]:
+        """Next page of versions without a checksum, in version_id order"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT version_id, file_id, file_path FROM versions
+                WHERE version_id > ? AND (checksum IS NULL OR checksum = '')
+                ORDER BY version_id
+                LIMIT ?
+            """, (after_version_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @_busy_retry
+    def set_version_checksums(self, rows: List[Tuple[str, int, int]]):
+        """Write back a batch of (checksum, size_bytes, version_id) in one transaction
+        
+        file_size_bytes is only filled in where it was unknown (NULL or 0).
+        """
+        with self.get_connection() as conn:
+            conn.executemany("""
+                UPDATE versions
+                SET checksum = ?,
+                    file_size_bytes = CASE WHEN COALESCE(file_size_bytes, 0) = 0
+                                           THEN ? ELSE file_size_bytes END
+                WHERE version_id = ?
+            """, rows)
+            conn.commit()
+    
+    def resolve_vault_path(self, path: str) -> str:
+        """Absolute path for a stored path (relative paths are vault-relative)"""
+        if not path:
+            return ""
+        return path if os.path.isabs(path) else os.path.join(self.vault_path, path)
+    
+    def iter_version_files(self, page_size: int = 500) -> Iterator[Dict]:
+        """Stream (version_id, file_id, version_number, file_path, checksum) of every version"""
+        last_id = 0
+        while True:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT version_id, file_id, version_number, file_path, checksum FROM versions
+                    WHERE version_id > ?
+                    ORDER BY version_id
+                    LIMIT ?
+                """, (last_id, page_size))
+                page = [dict(row) for row in cursor.fetchall()]
+            if not page:
+                return
+            yield from page
+            last_id = page[-1]["version_id"]
+    
+    @_busy_retry
+    def set_version_file_paths(self, rows: List[Tuple[str, int]]):
+        """Repoint a batch of (file_path, version_id) in one transaction"""
+        with self.get_connection() as conn:
+            conn.executemany("UPDATE versions SET file_path = ? WHERE version_id = ?", rows)
+            conn.commit()
+    
+    # ========================
+    # BLOB STORE
+    # ========================
+    
+    @property
+    def blob_store(self) -> BlobStore:
+        """Content-addressable store for version file bytes"""
+        return BlobStore(os.path.join(self.vault_path, "Blobs"))
+    
+    @_busy_retry
+    def record_blobs(self, rows: List[Tuple[str, int]]):
+        """Register stored blobs as (checksum, size_bytes)"""
+        with self.get_connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO blobs (checksum, size_bytes) VALUES (?, ?)", rows
+            )
+            conn.commit()
+    
+    def list_blob_checksums(self) -> List[str]:
+        """Checksums of every registered blob"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT checksum FROM blobs ORDER BY checksum")
+            return [row[0] for row in cursor.fetchall()]
+    
+    def store_version_file(self, version_id: int, source_path: str) -> Dict[str, Any]:
+        """Store a version's file according to storage_mode instead of copying it
+        
+        In "blob" mode the source bytes are stored once under Blobs/ and the
+        version's file_path becomes a read-only hardlink to that blob (a
+        read-only copy where the filesystem has no hardlinks). In "chunked" mode only the chunks not
+        already held for the part are written, plus a manifest next to
+        file_path; read it back with iter_version_content/restore_version_file.
+        
+        Chunking costs CPU that a blob store does not: finding chunk
+        boundaries runs at roughly 60-90 MB/s with numpy installed and
+        5-6 MB/s without it, so a 300 MB assembly takes seconds with numpy
+        and about a minute without (bench_chunkstore.py measures this).
+        
+        Args:
+            version_id: Version whose file_path receives the content
+            source_path: File to store (e.g. the working copy)
+        
+        Returns:
+            dict with checksum and size_bytes, plus new_blob/linked ("blob")
+            or chunks/new_chunks/bytes_written ("chunked")
+        """
+        version = self.get_version(version_id)
+        if not version:
+            raise Exception(f"Version {version_id} not found")
+        dest = self.resolve_vault_path(version["file_path"])
+        
+        if self.storage_mode == "chunked":
+            result = ChunkStore.for_version_file(dest).store(source_path, manifest_path(dest))
+            self.set_version_checksums([(result["checksum"], result["size_bytes"], version_id)])
+            return result
+        
+        store = self.blob_store
+        digest, size, created = store.put_file(source_path)
+        self.record_blobs([(digest, size)])
+        
+        try:
+            store.link(digest, dest)
+            linked = True
+        except OSError:
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(store.blob_path(digest), dest)
+            store.protect(dest)
+            linked = False
+        
+        self.set_version_checksums([(digest, size, version_id)])
+        return {"checksum": digest, "size_bytes": size, "new_blob": created, "linked": linked}
+    
+    def iter_version_content(self, version_id: int) -> Iterator[bytes]:
+        """Stream a version's bytes, whether stored whole or chunked"""
+        version = self.get_version(version_id)
+        if not version:
+            raise Exception(f"Version {version_id} not found")
+        path = self.resolve_vault_path(version["file_path"])
+        
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                while True:
+                    block = f.read(CHUNK_SIZE)
+                    if not block:
+                        return
+                    yield block
+        
+        manifest = manifest_path(path)
+        if not os.path.isfile(manifest):
+            raise Exception(f"No stored content for version {version_id}: {path}")
+        yield from ChunkStore.for_version_file(path).iter_content(manifest)
+    
+    def restore_version_file(self, version_id: int, dest: str) -> int:
+        """Write a version's bytes to dest (e.g. back to the working folder)
+        
+        Returns:
+            bytes written
+        """
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest + ".plmrestore"
+        size = 0
+        try:
+            with open(tmp, "wb") as out:
+                for block in self.iter_version_content(version_id):
+                    out.write(block)
+                    size += len(block)
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return size
+    
+    def deduplicate_vault(self, dry_run: bool = False,
+                          allow_pointers: bool = False) -> Dict[str, Any]:
+        """Replace duplicate version copies with hardlinks into the blob store
+        
+        Args:
+            dry_run: Only report what would be reclaimed
+            allow_pointers: Without hardlink support, delete duplicates and
+                point versions.file_path at the blob instead
+        
+        Returns:
+            Deduplication report (see blobstore.deduplicate_vault)
+        """
+        return deduplicate_vault(self, self.blob_store, dry_run=dry_run,
+                                 allow_pointers=allow_pointers)
+    
     # ========================
     # LOCK MANAGEMENT
     # ========================
     
-    def acquire_lock(self, file_id: int, user: str, reason: str = "Edit") -> str:
+    @_busy_retry
+    def acquire_lock(self, file_id: int, user: str, reason: str = "Edit",
+                     lease_seconds: Optional[int] = None) -> str:
         """Acquire file lock
         
+        The ownership check and the claim are one compare-and-set UPDATE on
+        files inside BEGIN IMMEDIATE, so of two users racing for the same
+        file exactly one sees its row updated. A file whose holder let the
+        lease lapse can be taken over. When a lock daemon (plm lockd) runs
+        for this vault the request goes through it instead.
+        
         Args:
             file_id: File to lock
             user: Current user (Windows username)
             reason: Lock reason (Edit, Review, etc.)
+            lease_seconds: Lease length (default: lock_lease_seconds)
             
         Returns:
             session_id (unique identifier for this lock)
             
         Raises:
-            Exception if file already locked by different user
+            LockConflictError if file already locked by different user
         """
+        lease = lease_seconds if lease_seconds is not None else self.lock_lease_seconds
+        response = self._lockd_call("acquire", file_id=file_id, user=user, reason=reason,
+                                    lease_seconds=lease)
+        if response is not None:
+            return response["session_id"]
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # Check if already locked
-            cursor.execute(
-                "SELECT locked_by FROM files WHERE file_id = ?",
-                (file_id,)
-            )
-            row = cursor.fetchone()
-            if row and row[0] and row[0] != user:
-                raise Exception(f"File locked by {row[0]}")
-            
-            # Generate session ID
-            session_id = str(uuid.uuid4())
+            self._begin_write(conn)
             
             try:
-                # Create lock record
-                cursor.execute("""
-                    INSERT INTO file_locks (file_id, locked_by, lock_reason, session_id)
-                    VALUES (?, ?, ?, ?)
-                """, (file_id, user, reason, session_id))
-                
-                # Update files table
-                cursor.execute(
-                    "UPDATE files SET locked_by = ?, lock_timestamp = CURRENT_TIMESTAMP WHERE file_id = ?",
-                    (user, file_id)
-                )
-                
+                session_id = self._claim_lock(cursor, file_id, user, reason, lease)
                 conn.commit()
                 logger.info(f"Acquired lock for file_id {file_id}, user {user}, session {session_id}")
                 return session_id
+            except LockConflictError:
+                raise
             except Exception as e:
                 logger.error(f"Failed to acquire lock: {e}")
                 raise
     
+    @_busy_retry
     def release_lock(self, file_id: int, user: str):
         """Release file lock
         
@@ -590,67 +1643,430 @@ WHERE lock_release_timestamp IS NULL
             file_id: File to unlock
             user: Current user (must be lock owner)
         """
+        if self._lockd_call("release", file_id=file_id, user=user) is not None:
+            return
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._begin_write(conn)
             
             try:
-                # Update lock record
-                cursor.execute("""
-                    UPDATE file_locks 
-                    SET lock_release_timestamp = CURRENT_TIMESTAMP 
-                    WHERE file_id = ? AND locked_by = ? AND lock_release_timestamp IS NULL
-                """, (file_id, user))
-                
-                # Update files table
-                cursor.execute(
-                    "UPDATE files SET locked_by = NULL, lock_timestamp = NULL WHERE file_id = ?",
-                    (file_id,)
-                )
-                
+                self._release_lock_rows(cursor, file_id, user)
                 conn.commit()
                 logger.info(f"Released lock for file_id {file_id}")
             except Exception as e:
                 logger.error(f"Failed to release lock: {e}")
                 raise
     
-    def get_active_locks(self, max_age_hours: int = 24) -> List[Dict]:
-        """Get all active locks (optionally filter by age)"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    fl.lock_id, fl.file_id, fl.locked_by, fl.lock_timestamp, fl.session_id,
-                    CAST((julianday('now') - julianday(fl.lock_timestamp)) * 24 AS INTEGER) AS hours_locked,
-                    f.file_name
-                FROM file_locks fl
-                JOIN files f ON fl.file_id = f.file_id
-                WHERE fl.lock_release_timestamp IS NULL 
-                  AND fl.is_stale = 0
-                  AND CAST((julianday('now') - julianday(fl.lock_timestamp)) * 24 AS INTEGER) < ?
-                ORDER BY fl.lock_timestamp DESC
-            """, (max_age_hours,))
-            return [dict(row) for row in cursor.fetchall()]
-    
-    def clean_stale_locks(self, max_age_hours: int = 24) -> int:
-        """Release stale locks (not accessed for N hours)
+    @_busy_retry
+    def renew_lock(self, session_id: str, lease_seconds: Optional[int] = None) -> str:
+        """Extend the lease of a held lock (heartbeat)
         
+        Args:
+            session_id: Session returned by acquire_lock
+            lease_seconds: New lease length from now (default: lock_lease_seconds)
+            
         Returns:
-            count of locks released
-        """
+            New expires_at timestamp (UTC)
+            
+        Raises:
+            Exception if the lock was released or its lease already lapsed
+        """
+        lease = lease_seconds if lease_seconds is not None else self.lock_lease_seconds
+        response = self._lockd_call("renew", session_id=session_id, lease_seconds=lease)
+        if response is not None:
+            return response["expires_at"]
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._begin_write(conn)
+            expires_at = self._extend_lease(cursor, session_id, lease)
+            conn.commit()
+            return expires_at
+    
+    @_busy_retry
+    def acquire_locks(self, file_ids: Iterable[int], user: str, reason: str = "Edit",
+                      lease_seconds: Optional[int] = None) -> Dict[int, str]:
+        """Lock several files at once, all or nothing
+        
+        Every file is checked and claimed in one write transaction; if any
+        of them is held by another user nothing is locked.
+        
+        Args:
+            file_ids: Files to lock (e.g. get_assembly_file_ids())
+            user: Current user (Windows username)
+            reason: Lock reason (Edit, Review, etc.)
+            lease_seconds: Lease length (default: lock_lease_seconds)
             
+        Returns:
+            {file_id: session_id}
+            
+        Raises:
+            LockConflictError with .conflicts {file_id: holder} for every
+            file held by someone else
+        """
+        ids = sorted(set(file_ids))
+        if not ids:
+            return {}
+        lease = lease_seconds if lease_seconds is not None else self.lock_lease_seconds
+        response = self._lockd_call("acquire_many", file_ids=ids, user=user, reason=reason,
+                                    lease_seconds=lease)
+        if response is not None:
+            return {int(fid): sid for fid, sid in response["sessions"].items()}
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            sessions = self._claim_locks(cursor, ids, user, reason, lease)
+            conn.commit()
+        logger.info(f"Acquired {len(sessions)} locks for user {user}")
+        return sessions
+    
+    @_busy_retry
+    def release_locks(self, file_ids: Iterable[int], user: str):
+        """Release user's locks on several files in one transaction"""
+        ids = sorted(set(file_ids))
+        if not ids:
+            return
+        if self._lockd_call("release_many", file_ids=ids, user=user) is not None:
+            return
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            for file_id in ids:
+                self._release_lock_rows(cursor, file_id, user)
+            conn.commit()
+        logger.info(f"Released {len(ids)} locks for user {user}")
+    
+    @_busy_retry
+    def apply_lock_operations(self, operations: List[Dict[str, Any]]) -> List[Any]:
+        """Apply a batch of lock requests in one transaction (lock daemon write-through)
+        
+        Args:
+            operations: dicts with "op" ("acquire", "acquire_many", "release",
+                "release_many" or "renew") and the arguments of the matching
+                acquire_lock(s) / release_lock(s) / renew_lock method
+        
+        Returns:
+            One result per operation: session_id, None or expires_at, or the
+            exception that operation raised (LockConflictError on conflict)
+        """
+        results: List[Any] = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            for op in operations:
+                lease = op.get("lease_seconds")
+                if lease is None:
+                    lease = self.lock_lease_seconds
+                try:
+                    # Each request fails before writing anything, so a refused
+                    # one needs no savepoint to leave the batch intact
+                    if op["op"] == "acquire":
+                        results.append(self._claim_lock(cursor, op["file_id"], op["user"],
+                                                        op.get("reason", "Edit"), lease))
+                    elif op["op"] == "acquire_many":
+                        results.append(self._claim_locks(cursor, op["file_ids"], op["user"],
+                                                         op.get("reason", "Edit"), lease))
+                    elif op["op"] == "release":
+                        results.append(self._release_lock_rows(cursor, op["file_id"], op["user"]))
+                    elif op["op"] == "release_many":
+                        for file_id in op["file_ids"]:
+                            self._release_lock_rows(cursor, file_id, op["user"])
+                        results.append(None)
+                    elif op["op"] == "renew":
+                        results.append(self._extend_lease(cursor, op["session_id"], lease))
+                    else:
+                        raise ValueError(f"Unknown lock operation: {op['op']}")
+                except sqlite3.OperationalError:
+                    raise
+                except Exception as e:
+                    results.append(e)
+            conn.commit()
+        return results
+    
+    def _claim_lock(self, cursor, file_id: int, user: str, reason: str, lease_seconds: int) -> str:
+        """Compare-and-set claim of a file inside the caller's write transaction
+        
+        Returns:
+            session_id of the new file_locks row
+        """
+        # Claim the file only if it is free, already ours, or its holder has
+        # no unexpired lease left
+        cursor.execute("""
+            UPDATE files SET locked_by = ?, lock_timestamp = CURRENT_TIMESTAMP
+            WHERE file_id = ? AND (locked_by IS NULL OR locked_by = ? OR NOT EXISTS (
+                SELECT 1 FROM file_locks fl
+                WHERE fl.file_id = files.file_id
+                  AND fl.lock_release_timestamp IS NULL
+                  AND fl.expires_at > CURRENT_TIMESTAMP
+            ))
+        """, (user, file_id, user))
+        
+        if cursor.rowcount != 1:
+            cursor.execute("SELECT locked_by FROM files WHERE file_id = ?", (file_id,))
+            row = cursor.fetchone()
+            if row is None:
+                raise Exception(f"File {file_id} not found")
+            raise LockConflictError(file_id, row[0])
+        
+        # Close lapsed leases of a previous holder we took over from
+        cursor.execute("""
+            UPDATE file_locks SET is_stale = 1, lock_release_timestamp = CURRENT_TIMESTAMP
+            WHERE file_id = ? AND locked_by != ? AND lock_release_timestamp IS NULL
+              AND expires_at <= CURRENT_TIMESTAMP
+        """, (file_id, user))
+        
+        # Create lock record
+        session_id = str(uuid.uuid4())
+        cursor.execute("""
+            INSERT INTO file_locks (file_id, locked_by, lock_reason, session_id, expires_at)
+            VALUES (?, ?, ?, ?, datetime('now', ?))
+        """, (file_id, user, reason, session_id, lease_modifier(lease_seconds)))
+        return session_id
+    
+    def _claim_locks(self, cursor, file_ids: List[int], user: str, reason: str,
+                     lease_seconds: int) -> Dict[int, str]:
+        """All-or-nothing claim of several files inside the caller's write transaction
+        
+        Conflicts are collected before anything is written, so a refused
+        batch leaves no partial lock set behind.
+        
+        Returns:
+            {file_id: session_id}
+        """
+        ids_json = json.dumps(list(file_ids))
+        cursor.execute("""
+            SELECT f.file_id, f.locked_by,
+                   f.locked_by IS NOT NULL AND f.locked_by != ? AND EXISTS (
+                       SELECT 1 FROM file_locks fl
+                       WHERE fl.file_id = f.file_id
+                         AND fl.lock_release_timestamp IS NULL
+                         AND fl.expires_at > CURRENT_TIMESTAMP
+                   ) AS held
+            FROM files f
+            WHERE f.file_id IN (SELECT value FROM json_each(?))
+        """, (user, ids_json))
+        rows = cursor.fetchall()
+        
+        missing = sorted(set(file_ids) - {row[0] for row in rows})
+        if missing:
+            raise Exception(f"Files not found: {missing}")
+        conflicts = {row[0]: row[1] for row in rows if row[2]}
+        if conflicts:
+            first = min(conflicts)
+            raise LockConflictError(first, conflicts[first], conflicts)
+        
+        cursor.execute("""
+            UPDATE files SET locked_by = ?, lock_timestamp = CURRENT_TIMESTAMP
+            WHERE file_id IN (SELECT value FROM json_each(?))
+        """, (user, ids_json))
+        
+        # Close lapsed leases of previous holders we took over from
+        cursor.execute("""
+            UPDATE file_locks SET is_stale = 1, lock_release_timestamp = CURRENT_TIMESTAMP
+            WHERE file_id IN (SELECT value FROM json_each(?))
+              AND locked_by != ? AND lock_release_timestamp IS NULL
+              AND expires_at <= CURRENT_TIMESTAMP
+        """, (ids_json, user))
+        
+        sessions = {file_id: str(uuid.uuid4()) for file_id in file_ids}
+        cursor.executemany("""
+            INSERT INTO file_locks (file_id, locked_by, lock_reason, session_id, expires_at)
+            VALUES (?, ?, ?, ?, datetime('now', ?))
+        """, [(file_id, user, reason, session_id, lease_modifier(lease_seconds))
+              for file_id, session_id in sessions.items()])
+        return sessions
+    
+    def _release_lock_rows(self, cursor, file_id: int, user: str):
+        """Close user's open locks on a file inside the caller's write transaction"""
+        cursor.execute("""
+            UPDATE file_locks 
+            SET lock_release_timestamp = CURRENT_TIMESTAMP 
+            WHERE file_id = ? AND locked_by = ? AND lock_release_timestamp IS NULL
+        """, (file_id, user))
+        
+        # Clear the owner only if it is still this user, so a late release
+        # cannot drop a lock another user has since taken
+        cursor.execute(
+            "UPDATE files SET locked_by = NULL, lock_timestamp = NULL WHERE file_id = ? AND locked_by = ?",
+            (file_id, user)
+        )
+    
+    def _extend_lease(self, cursor, session_id: str, lease_seconds: int) -> str:
+        """Renew a live lease inside the caller's write transaction
+        
+        Returns:
+            New expires_at timestamp (UTC)
+        """
+        cursor.execute("""
+            UPDATE file_locks SET expires_at = datetime('now', ?)
+            WHERE session_id = ? AND lock_release_timestamp IS NULL
+              AND expires_at > CURRENT_TIMESTAMP
+        """, (lease_modifier(lease_seconds), session_id))
+        if cursor.rowcount != 1:
+            raise Exception(f"Lock session {session_id} is no longer active")
+        
+        cursor.execute("SELECT expires_at FROM file_locks WHERE session_id = ?", (session_id,))
+        return cursor.fetchone()[0]
+    
+    def _lockd_call(self, op: str, **args) -> Optional[Dict[str, Any]]:
+        """Send a lock request to the vault's lock daemon if one is running
+        
+        Returns:
+            The daemon's response, or None when the request must go to SQLite
+            directly (no daemon, or it could not be reached)
+        
+        Raises:
+            Exception if the connection broke after an acquire was sent; the
+            daemon may have granted it, so it is not repeated against SQLite
+            (acquiring again as the same user is safe)
+        """
+        if not self._lockd or not self._lockd.available():
+            return None
+        try:
+            response = self._lockd.call(op, **args)
+        except LockdUnavailable as e:
+            if e.delivered and op not in IDEMPOTENT_OPS:
+                raise Exception(f"Lock daemon connection lost during {op}; "
+                                f"the request may have been applied: {e}")
+            logger.warning(f"Lock daemon unavailable, using the database directly: {e}")
+            return None
+        if response.get("ok"):
+            return response
+        if response.get("conflict"):
+            conflicts = {int(fid): holder for fid, holder in response.get("conflicts", {}).items()}
+            file_id = args.get("file_id", min(conflicts) if conflicts else None)
+            raise LockConflictError(file_id, response.get("locked_by"), conflicts or None)
+        raise Exception(response.get("error", "Lock daemon request failed"))
+    
+    def get_active_locks(self, max_age_hours: Optional[int] = None) -> List[Dict]:
+        """Get all locks with an unexpired lease (optionally only those younger than N hours)"""
+        query = """
+            SELECT 
+                fl.lock_id, fl.file_id, fl.locked_by, fl.lock_timestamp, fl.expires_at, fl.session_id,
+                CAST((julianday('now') - julianday(fl.lock_timestamp)) * 24 AS INTEGER) AS hours_locked,
+                (julianday(fl.expires_at) - julianday('now')) * 86400.0 AS expires_in_s,
+                f.file_name
+            FROM file_locks fl
+            JOIN files f ON fl.file_id = f.file_id
+            WHERE fl.lock_release_timestamp IS NULL
+              AND fl.expires_at > CURRENT_TIMESTAMP
+        """
+        params: List[Any] = []
+        if max_age_hours is not None:
+            query += " AND fl.lock_timestamp > datetime('now', ?)"
+            params.append(f"-{int(max_age_hours)} hours")
+        query += " ORDER BY fl.lock_timestamp DESC"
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_lock_holders(self, file_ids: Iterable[int]) -> Dict[int, str]:
+        """Holders of the given files that still have an unexpired lease
+        
+        Returns:
+            {file_id: locked_by} for the files that are locked
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute("""
-                UPDATE file_locks 
-                SET is_stale = 1, lock_release_timestamp = CURRENT_TIMESTAMP
-                WHERE lock_release_timestamp IS NULL
-                  AND CAST((julianday('now') - julianday(lock_timestamp)) * 24 AS INTEGER) > ?
-            """, (max_age_hours,))
+                SELECT file_id, locked_by FROM file_locks
+                WHERE file_id IN (SELECT value FROM json_each(?))
+                  AND lock_release_timestamp IS NULL
+                  AND expires_at > CURRENT_TIMESTAMP
+                ORDER BY lock_id
+            """, (json.dumps(list(file_ids)),))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def expire_locks(self, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+        """Release every lock whose lease has lapsed
+        
+        Lapsed leases are found with a range scan of idx_locks_expires (open
+        locks only) and released a batch per transaction, clearing
+        files.locked_by when the holder has no other open lock on the file.
+        
+        Returns:
+            count of locks released
+        """
+        total = 0
+        while True:
+            released = self._expire_lock_batch(batch_size)
+            total += released
+            if released < batch_size:
+                break
+        if total:
+            logger.info(f"Expired {total} lapsed lock lease(s)")
+        return total
+    
+    @_busy_retry
+    def _expire_lock_batch(self, batch_size: int) -> int:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            
+            # Without the hint the planner prefers idx_locks_active, which
+            # walks every open lock instead of only the lapsed ones
+            cursor.execute("""
+                SELECT lock_id, file_id, locked_by FROM file_locks INDEXED BY idx_locks_expires
+                WHERE lock_release_timestamp IS NULL AND expires_at <= CURRENT_TIMESTAMP
+                ORDER BY expires_at
+                LIMIT ?
+            """, (batch_size,))
+            expired = cursor.fetchall()
+            if not expired:
+                return 0
+            
+            cursor.executemany("""
+                UPDATE file_locks SET is_stale = 1, lock_release_timestamp = CURRENT_TIMESTAMP
+                WHERE lock_id = ?
+            """, [(row[0],) for row in expired])
+            cursor.executemany("""
+                UPDATE files SET locked_by = NULL, lock_timestamp = NULL
+                WHERE file_id = ? AND locked_by = ? AND NOT EXISTS (
+                    SELECT 1 FROM file_locks fl
+                    WHERE fl.file_id = files.file_id AND fl.locked_by = files.locked_by
+                      AND fl.lock_release_timestamp IS NULL
+                )
+            """, {(row[1], row[2]) for row in expired})
             
             conn.commit()
-            count = cursor.rowcount
-            logger.info(f"Cleaned {count} stale locks")
-            return count
+            return len(expired)
+    
+    def clean_stale_locks(self, max_age_hours: Optional[int] = None) -> int:
+        """Release locks whose lease lapsed
+        
+        Args:
+            max_age_hours: Also release locks taken more than N hours ago,
+                even if their lease is still being renewed
+        
+        Returns:
+            count of locks released
+        """
+        if max_age_hours is not None:
+            self._lapse_old_locks(max_age_hours)
+        count = self.expire_locks()
+        logger.info(f"Cleaned {count} stale locks")
+        return count
+    
+    @_busy_retry
+    def _lapse_old_locks(self, max_age_hours: int):
+        """End the lease of open locks taken more than max_age_hours ago"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE file_locks SET expires_at = CURRENT_TIMESTAMP
+                WHERE lock_release_timestamp IS NULL AND expires_at > CURRENT_TIMESTAMP
+                  AND lock_timestamp <= datetime('now', ?)
+            """, (f"-{int(max_age_hours)} hours",))
+            conn.commit()
+    
+    def get_lock_sweeper_stats(self) -> Optional[Dict[str, Any]]:
+        """Background sweeper counters (None when no sweeper runs)"""
+        return self._lock_sweeper.get_stats() if self._lock_sweeper else None
     
     # ========================
     # LIFECYCLE MANAGEMENT
@@ -660,6 +2076,10 @@ WHERE lock_release_timestamp IS NULL
                        note: str = "") -> bool:
         """Promote version to new lifecycle state
         
+        Applies the same rules as promote_versions and promote_assembly: a
+        move not listed in LIFECYCLE_TRANSITIONS raises, and a version
+        already in new_state is left as it is.
+        
         Args:
             version_id: Version to promote
             new_state: Target state (Released, Obsolete)
@@ -667,54 +2087,174 @@ WHERE lock_release_timestamp IS NULL
             note: Promotion note
             
         Returns:
-            True if successful
+            True if the version moved, False if it was already in new_state
+        """
+        try:
+            report = self.promote_versions([version_id], new_state, user, note)
+        except Exception as e:
+            logger.error(f"Failed to promote version: {e}")
+            raise
+        if report["transitions"]:
+            logger.info(f"Promoted version {version_id} to {new_state}")
+        return bool(report["transitions"])
+    
+    @_busy_retry
+    def promote_versions(self, version_ids: Iterable[int], new_state: str, user: str,
+                         note: str = "") -> Dict[str, Any]:
+        """Promote many versions in one transaction, all or nothing
+        
+        Args:
+            version_ids: Versions to promote
+            new_state: Target state
+            user: User performing promotion
+            note: Promotion note recorded on every transition
+            
+        Returns:
+            Promotion report (see _apply_promotions)
         """
+        ids_json = json.dumps(sorted(set(version_ids)))
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._begin_write(conn)
+            cursor.execute("""
+                SELECT t.value AS requested_id, v.version_id, v.file_id, v.version_number,
+                       v.lifecycle_state, f.file_name, f.latest_version_id
+                FROM json_each(?) t
+                LEFT JOIN versions v ON v.version_id = t.value
+                LEFT JOIN files f ON f.file_id = v.file_id
+            """, (ids_json,))
+            targets = [dict(row) for row in cursor.fetchall()]
+            for target in targets:
+                if target["version_id"] is None:
+                    target["missing"] = f"Version {target['requested_id']} not found"
+            report = self._apply_promotions(cursor, targets, new_state, user, note)
+            conn.commit()
+        return report
+    
+    @_busy_retry
+    def promote_assembly(self, assembly_file_id: int, new_state: str, user: str, note: str = "",
+                         version_number: Optional[int] = None,
+                         recursive: bool = True) -> Dict[str, Any]:
+        """Promote an assembly version and every component version it pins
+        
+        The assembly version and the pinned component versions of its BOM
+        are resolved with one query, every transition is validated before
+        anything is written, and all updates and version_transitions rows go
+        into a single transaction.
+        
+        An assembly that was re-pinned keeps its older pins in
+        assembly_relationships, so only the newest pinned version of each
+        component per parent is promoted. A pinned version number with
+        several revision rows resolves to its latest revision.
+        
+        Args:
+            assembly_file_id: Top-level assembly
+            new_state: Target state (e.g. Released)
+            user: User performing promotion
+            note: Promotion note recorded on every transition
+            version_number: Assembly version to promote (default: latest).
+                Pins are recorded per assembly file, not per version, so the
+                components promoted are the current newest pins either way.
+            recursive: Include sub-assembly components at all levels
             
-            try:
-                # Get current version state
-                cursor.execute(
-                    "SELECT file_id, lifecycle_state, revision_letter FROM versions WHERE version_id = ?",
-                    (version_id,)
-                )
-                row = cursor.fetchone()
-                if not row:
-                    raise Exception(f"Version {version_id} not found")
-                
-                file_id, from_state, revision = row[0], row[1], row[2]
-                
-                # Update version lifecycle
-                cursor.execute("""
-                    UPDATE versions 
-                    SET lifecycle_state = ? 
-                    WHERE version_id = ?
-                """, (new_state, version_id))
-                
-                # Log transition
-                cursor.execute("""
-                    INSERT INTO version_transitions 
-                    (file_id, version_id, from_state, to_state, promoted_by, promotion_note)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (file_id, version_id, from_state, new_state, user, note))
-                
-                # Update file lifecycle if this is latest version
-                cursor.execute(
-                    "SELECT MAX(version_id) FROM versions WHERE file_id = ?",
-                    (file_id,)
-                )
-                if cursor.fetchone()[0] == version_id:
-                    cursor.execute(
-                        "UPDATE files SET lifecycle_state = ? WHERE file_id = ?",
-                        (new_state, file_id)
+        Returns:
+            Promotion report (see _apply_promotions)
+        """
+        params = {"root": assembly_file_id, "root_version": version_number,
+                  "max_depth": None if recursive else 1}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            cursor.execute(_BOM_EXPLOSION_CTE + """
+                , pins(file_id, version_number) AS (
+                    SELECT component_file_id, MAX(component_version) FROM bom
+                    GROUP BY parent_file_id, component_file_id
+                ),
+                targets(file_id, version_number, version_id) AS (
+                    SELECT f.file_id, COALESCE(:root_version, v.version_number),
+                           CASE WHEN :root_version IS NULL THEN f.latest_version_id ELSE (
+                               SELECT r.version_id FROM versions r
+                               WHERE r.file_id = f.file_id AND r.version_number = :root_version
+                               ORDER BY r.revision_letter DESC LIMIT 1
+                           ) END
+                    FROM files f
+                    LEFT JOIN versions v ON v.version_id = f.latest_version_id
+                    WHERE f.file_id = :root
+                    UNION
+                    SELECT p.file_id, p.version_number, (
+                        SELECT r.version_id FROM versions r
+                        WHERE r.file_id = p.file_id AND r.version_number = p.version_number
+                        ORDER BY r.revision_letter DESC LIMIT 1
                     )
-                
-                conn.commit()
-                logger.info(f"Promoted version {version_id} to {new_state}")
-                return True
-            except Exception as e:
-                logger.error(f"Failed to promote version: {e}")
-                raise
+                    FROM pins p
+                )
+                SELECT t.file_id, t.version_number, v.version_id, v.lifecycle_state,
+                       f.file_name, f.latest_version_id
+                FROM targets t
+                JOIN files f ON f.file_id = t.file_id
+                LEFT JOIN versions v ON v.version_id = t.version_id
+                ORDER BY f.file_name, t.version_number
+            """, params)
+            targets = [dict(row) for row in cursor.fetchall()]
+            if not targets:
+                raise Exception(f"Assembly {assembly_file_id} not found")
+            for target in targets:
+                if target["version_id"] is None:
+                    target["missing"] = (f"{target['file_name']} v{target['version_number'] or 0:03d} "
+                                         f"not found")
+            report = self._apply_promotions(cursor, targets, new_state, user, note)
+            conn.commit()
+        logger.info(f"Promoted assembly {assembly_file_id}: {len(report['promoted'])} versions "
+                    f"to {new_state}, {report['unchanged']} already {new_state}")
+        return report
+    
+    def _apply_promotions(self, cursor, targets: List[Dict], new_state: str, user: str,
+                          note: str) -> Dict[str, Any]:
+        """Validate resolved versions in memory, then write every promotion
+        
+        Versions already in new_state are left alone. Any missing version or
+        disallowed transition (LIFECYCLE_TRANSITIONS) aborts the whole batch
+        before a row is written.
+        
+        Returns:
+            dict with promoted (version rows), unchanged count and transitions
+        """
+        if new_state not in LIFECYCLE_STATES:
+            raise ValueError(f"Invalid state: {new_state}")
+        
+        errors = []
+        promote = []
+        unchanged = 0
+        for target in targets:
+            if target.get("missing"):
+                errors.append(target["missing"])
+            elif target["lifecycle_state"] == new_state:
+                unchanged += 1
+            elif new_state not in LIFECYCLE_TRANSITIONS.get(target["lifecycle_state"], ()):
+                errors.append(f"{target['file_name']} v{target['version_number']:03d}: "
+                              f"{target['lifecycle_state']} → {new_state} not allowed")
+            else:
+                promote.append(target)
+        if errors:
+            raise Exception(f"Promotion refused ({len(errors)} problem(s)): " + "; ".join(errors))
+        
+        cursor.executemany(
+            "UPDATE versions SET lifecycle_state = ? WHERE version_id = ?",
+            [(new_state, t["version_id"]) for t in promote]
+        )
+        cursor.executemany("""
+            INSERT INTO version_transitions 
+            (file_id, version_id, from_state, to_state, promoted_by, promotion_note)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(t["file_id"], t["version_id"], t["lifecycle_state"], new_state, user, note)
+              for t in promote])
+        
+        # Files follow the state of their latest version
+        cursor.executemany(
+            "UPDATE files SET lifecycle_state = ? WHERE file_id = ?",
+            [(new_state, t["file_id"]) for t in promote if t["latest_version_id"] == t["version_id"]]
+        )
+        return {"promoted": promote, "unchanged": unchanged, "transitions": len(promote)}
     
     def freeze_version(self, file_id: int, version_number: int, user: str) -> bool:
         """Freeze version (make read-only) and release lock
@@ -768,10 +2308,150 @@ WHERE lock_release_timestamp IS NULL
                 logging.error(f"Error freezing version: {e}")
                 return False
     
+    @staticmethod
+    def _utc_timestamp(when, end_of_day: bool = False) -> str:
+        """Normalize a point in time to the vault's UTC timestamp text
+        
+        Timezone-aware datetimes and ISO-8601 text with an offset or "Z" are
+        converted to UTC; naive values are taken as UTC already. A bare date
+        (YYYY-MM-DD) means the start of that day, or its end with end_of_day.
+        """
+        if isinstance(when, datetime):
+            parsed = when
+        else:
+            text = str(when).strip()
+            parsed = datetime.fromisoformat(text)
+            if len(text) == 10 and end_of_day:
+                parsed = parsed.replace(hour=23, minute=59, second=59)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc)
+        return parsed.strftime("%Y-%m-%d %H:%M:%S")
+    
+    @classmethod
+    def _as_of_timestamp(cls, when) -> str:
+        """as_of() point in time as UTC text; a bare date means the end of that day"""
+        return cls._utc_timestamp(when, end_of_day=True)
+    
+    def as_of(self, project_id: int, timestamp, state: Optional[str] = None) -> List[Dict]:
+        """Lifecycle state of every version in a project at a point in time
+        
+        Versions created after the timestamp are left out. Each version costs
+        one index seek into the transitions logged since the newest
+        checkpoint at or before the timestamp (see
+        create_lifecycle_checkpoint), so the query does not replay history.
+        
+        Args:
+            project_id: Project to reconstruct
+            timestamp: datetime (naive = UTC, aware is converted) or ISO-8601
+                text ('YYYY-MM-DD[ HH:MM:SS][+HH:MM]')
+            state: Only versions that were in this state (e.g. Released)
+            
+        Returns:
+            list of version dicts with the lifecycle_state they had then,
+            ordered by file name and version number
+        """
+        if state is not None and state not in LIFECYCLE_STATES:
+            raise ValueError(f"Unknown lifecycle state: {state}")
+        params = {"project": project_id, "as_of": self._as_of_timestamp(timestamp), "state": state}
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_LIFECYCLE_AS_OF_QUERY, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @_busy_retry
+    def create_lifecycle_checkpoint(self, project_id: Optional[int] = None,
+                                    min_transitions: int = 0) -> List[Dict]:
+        """Snapshot the current lifecycle state of every version in a project
+        
+        Meant to run periodically (e.g. nightly from a scheduler) so as_of()
+        only has to look at transitions logged after the newest checkpoint.
+        
+        Args:
+            project_id: Project to snapshot (None = every project)
+            min_transitions: Skip projects with fewer transitions than this
+                since their last checkpoint
+            
+        Returns:
+            list of created checkpoints {checkpoint_id, project_id,
+            last_transition_id, version_count, new_transitions}
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            
+            if project_id is None:
+                cursor.execute("SELECT project_id FROM projects ORDER BY project_id")
+                project_ids = [row[0] for row in cursor.fetchall()]
+            else:
+                cursor.execute("SELECT 1 FROM projects WHERE project_id = ?", (project_id,))
+                if not cursor.fetchone():
+                    raise Exception(f"Project {project_id} not found")
+                project_ids = [project_id]
+            
+            cursor.execute("SELECT COALESCE(MAX(transition_id), 0) FROM version_transitions")
+            high_water = cursor.fetchone()[0]
+            
+            created = []
+            for pid in project_ids:
+                cursor.execute("""
+                    SELECT COUNT(*) FROM version_transitions t
+                    JOIN files f ON f.file_id = t.file_id
+                    WHERE f.project_id = ? AND t.transition_id > COALESCE(
+                        (SELECT MAX(last_transition_id) FROM lifecycle_checkpoints
+                         WHERE project_id = ?), 0)
+                """, (pid, pid))
+                new_transitions = cursor.fetchone()[0]
+                if min_transitions and new_transitions < min_transitions:
+                    continue
+                
+                cursor.execute("""
+                    INSERT INTO lifecycle_checkpoints (project_id, last_transition_id)
+                    VALUES (?, ?)
+                """, (pid, high_water))
+                checkpoint_id = cursor.lastrowid
+                cursor.execute("""
+                    INSERT INTO lifecycle_checkpoint_states (checkpoint_id, version_id, lifecycle_state)
+                    SELECT ?, v.version_id, v.lifecycle_state
+                    FROM versions v
+                    JOIN files f ON f.file_id = v.file_id
+                    WHERE f.project_id = ?
+                """, (checkpoint_id, pid))
+                version_count = cursor.rowcount
+                cursor.execute(
+                    "UPDATE lifecycle_checkpoints SET version_count = ? WHERE checkpoint_id = ?",
+                    (version_count, checkpoint_id)
+                )
+                created.append({
+                    "checkpoint_id": checkpoint_id,
+                    "project_id": pid,
+                    "last_transition_id": high_water,
+                    "version_count": version_count,
+                    "new_transitions": new_transitions
+                })
+            
+            conn.commit()
+        
+        logger.info(f"Created {len(created)} lifecycle checkpoint(s)")
+        return created
+    
+    def list_lifecycle_checkpoints(self, project_id: int) -> List[Dict]:
+        """Checkpoints of a project, newest first"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT checkpoint_id, project_id, taken_at, last_transition_id, version_count
+                FROM lifecycle_checkpoints
+                WHERE project_id = ?
+                ORDER BY taken_at DESC, checkpoint_id DESC
+            """, (project_id,))
+            return [dict(row) for row in cursor.fetchall()]
+    
     # ========================
     # ASSEMBLY MANAGEMENT
     # ========================
     
+    @_busy_retry
     def add_assembly_component(self, assembly_file_id: int, component_file_id: int,
                               component_version: int, quantity: int = 1,
                               instance_names: Optional[List[str]] = None) -> Optional[int]:
@@ -830,18 +2510,441 @@ WHERE lock_release_timestamp IS NULL
             """, (assembly_file_id,))
             return [dict(row) for row in cursor.fetchall()]
     
+    def explode_bom(self, assembly_file_id: int, max_depth: Optional[int] = None,
+                    flat: bool = False) -> List[Dict]:
+        """Multi-level BOM explosion using a recursive CTE
+        
+        Args:
+            assembly_file_id: Top-level assembly
+            max_depth: Deepest level to expand (None = all levels)
+            flat: Summarise per component/version instead of returning the tree
+            
+        Returns:
+            Indented mode: one row per BOM line in depth-first order (children
+            sorted by name) with depth, path, parent_file_id, instance_count and
+            extended_qty (product of instance counts down the path).
+            Flat mode: one row per (component, version) with total_qty summed
+            over every path, plus min_depth and occurrences.
+        """
+        params = {"root": assembly_file_id, "max_depth": max_depth}
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            if flat:
+                cursor.execute(_BOM_EXPLOSION_CTE + """
+                    SELECT 
+                        b.component_file_id,
+                        f.plm_id AS component_plm_id,
+                        f.file_name AS component_name,
+                        f.file_type AS component_type,
+                        b.component_version,
+                        SUM(b.extended_qty) AS total_qty,
+                        MIN(b.depth) AS min_depth,
+                        COUNT(*) AS occurrences
+                    FROM bom b
+                    JOIN files f ON f.file_id = b.component_file_id
+                    GROUP BY b.component_file_id, b.component_version
+                    ORDER BY f.file_name, b.component_version
+                """, params)
+                return [dict(row) for row in cursor.fetchall()]
+            
+            cursor.execute(_BOM_EXPLOSION_CTE + """
+                SELECT 
+                    b.relationship_id,
+                    b.parent_file_id,
+                    b.component_file_id,
+                    f.plm_id AS component_plm_id,
+                    f.file_name AS component_name,
+                    f.file_type AS component_type,
+                    b.component_version,
+                    b.instance_count,
+                    b.extended_qty,
+                    b.depth,
+                    b.path,
+                    b.parent_relationship_id
+                FROM bom b
+                JOIN files f ON f.file_id = b.component_file_id
+            """, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+        
+        # Depth-first ordering: group lines under their parent line
+        children: Dict[Optional[int], List[Dict]] = {}
+        for row in rows:
+            children.setdefault(row.pop("parent_relationship_id"), []).append(row)
+        for siblings in children.values():
+            siblings.sort(key=lambda r: (r["component_name"], r["component_version"]), reverse=True)
+        
+        ordered = []
+        stack = list(children.get(None, []))
+        while stack:
+            row = stack.pop()
+            ordered.append(row)
+            stack.extend(children.get(row["relationship_id"], []))
+        return ordered
+    
+    def get_assembly_file_ids(self, assembly_file_id: int, recursive: bool = True) -> List[int]:
+        """The assembly and every component file below it
+        
+        Args:
+            assembly_file_id: Top-level assembly
+            recursive: Include sub-assembly components at all levels
+                (False = direct components only)
+            
+        Returns:
+            file_ids, the assembly first
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_BOM_EXPLOSION_CTE + """
+                SELECT DISTINCT component_file_id FROM bom
+                WHERE component_file_id != :root
+                ORDER BY component_file_id
+            """, {"root": assembly_file_id, "max_depth": None if recursive else 1})
+            return [assembly_file_id] + [row[0] for row in cursor.fetchall()]
+    
+    def where_used(self, component_file_id: int, transitive: bool = True,
+                   component_version: Optional[int] = None,
+                   max_depth: Optional[int] = None) -> List[Dict]:
+        """Reverse BOM: every assembly that consumes a component
+        
+        Args:
+            component_file_id: Part or sub-assembly to look up
+            transitive: Walk up through all levels (False = direct parents only)
+            component_version: Only count direct parents pinned to this version
+            max_depth: Highest level to walk up to (None = all levels)
+            
+        Returns:
+            list of dicts, one per direct pin and then one per usage path
+            above the first level, ordered by level then name:
+            assembly file info, via_file_id (the child it uses at that level),
+            component_version, instance_count, depth, path
+        """
+        params = {
+            "component": component_file_id,
+            "version": component_version,
+            "max_depth": max_depth if transitive else 1
+        }
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_WHERE_USED_CTE + """
+                SELECT 
+                    u.relationship_id,
+                    u.assembly_file_id,
+                    f.plm_id AS assembly_plm_id,
+                    f.file_name AS assembly_name,
+                    f.lifecycle_state AS assembly_lifecycle_state,
+                    u.component_file_id AS via_file_id,
+                    u.component_version,
+                    u.instance_count,
+                    u.depth,
+                    u.path
+                FROM used u
+                JOIN files f ON f.file_id = u.assembly_file_id
+                ORDER BY u.depth, f.file_name
+            """, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    # ========================
+    # SEARCH
+    # ========================
+    
+    def search(self, query: str, project_id: Optional[int] = None,
+               limit: int = 20) -> List[Dict]:
+        """Full-text search over file names, descriptions, change notes and properties
+        
+        Every word must match (as a prefix) somewhere in the file's rows: its
+        name and description or any version's change note and properties, so
+        "bracket 6061" finds bracket.SLDPRT whose version has Material 6061.
+        Files are ranked by the best bm25 score of a row matching any word.
+        
+        Args:
+            query: Search words (e.g. "bracket m4")
+            project_id: Restrict to one project
+            limit: Maximum files returned
+            
+        Returns:
+            List of file dicts with score (lower is better), hits and
+            best_version (version number of the best matching version, if any)
+        """
+        if not self.search_available:
+            raise Exception("Full-text search is not available (SQLite built without FTS5)")
+        
+        terms = query.split()
+        if not terms:
+            return []
+        # Quote every word so punctuation in part numbers is not FTS syntax
+        phrases = ['"' + t.replace('"', '""') + '"*' for t in terms]
+        # File and version rows are separate, so a file qualifies when each
+        # word matches any of its rows; its rows are then ranked by an OR query
+        matched = " INTERSECT ".join(
+            "SELECT file_id FROM search_index WHERE search_index MATCH ?" for _ in phrases
+        )
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            sql = f"""
+                WITH matched AS MATERIALIZED ({matched}),
+                hits AS MATERIALIZED (
+                    SELECT file_id, rowid AS hit_rowid,
+                           bm25(search_index, {_SEARCH_WEIGHTS}) AS score
+                    FROM search_index
+                    WHERE search_index MATCH ?
+                      AND file_id IN (SELECT file_id FROM matched)
+                ),
+                ranked AS (
+                    SELECT file_id, MIN(score) AS score, COUNT(*) AS hits
+                    FROM hits GROUP BY file_id
+                )
+                SELECT f.file_id, f.plm_id, f.project_id, f.file_name, f.file_type,
+                       f.description, f.lifecycle_state, f.current_version,
+                       r.score, r.hits,
+                       (SELECT v.version_number FROM hits h
+                        JOIN versions v ON v.version_id = (h.hit_rowid - 1) / 2
+                        WHERE h.file_id = r.file_id AND h.hit_rowid % 2 = 1
+                        ORDER BY h.score, v.version_number DESC LIMIT 1) AS best_version
+                FROM ranked r
+                JOIN files f ON f.file_id = r.file_id
+                WHERE f.is_active = 1
+            """
+            params: List[Any] = phrases + [" OR ".join(phrases)]
+            if project_id is not None:
+                sql += " AND f.project_id = ?"
+                params.append(project_id)
+            sql += " ORDER BY r.score, f.file_name LIMIT ?"
+            params.append(limit)
+            cursor.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @_busy_retry
+    def rebuild_search_index(self) -> int:
+        """Rebuild the full-text index from scratch (e.g. after bulk SQL edits)
+        
+        Returns:
+            number of indexed rows
+        """
+        if not self.search_available:
+            raise Exception("Full-text search is not available (SQLite built without FTS5)")
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            self._fill_search_index(cursor)
+            cursor.execute("SELECT COUNT(*) FROM search_index")
+            count = cursor.fetchone()[0]
+            conn.commit()
+        logger.info(f"Rebuilt search index: {count} rows")
+        return count
+    
+    # ========================
+    # PROPERTY QUERIES
+    # ========================
+    
+    def find_versions_by_properties(self, filters: Dict[str, Any],
+                                    lifecycle_state: Optional[str] = None,
+                                    file_type: Optional[str] = None,
+                                    project_id: Optional[int] = None,
+                                    latest_only: bool = False,
+                                    limit: Optional[int] = None) -> List[Dict]:
+        """Find versions by indexed custom/SolidWorks property values
+        
+        Example: all released parts in 6061 between 0.5 and 2 kg
+            find_versions_by_properties({"Material": "6061", "Mass": (0.5, 2)},
+                                        lifecycle_state="Released", file_type="PART")
+        
+        Args:
+            filters: Property key -> condition (see properties.property_filter_sql);
+                keys and text values match case-insensitively
+            lifecycle_state: Only versions in this state
+            file_type: Only files of this type
+            project_id: Only files of this project
+            latest_only: Only each file's latest version
+            limit: Maximum rows
+            
+        Returns:
+            List of version dicts with plm_id, file_name, file_type, project_id
+        """
+        if not filters:
+            raise ValueError("At least one property filter is required")
+        matches, params = property_filter_sql(filters)
+        
+        sql = f"""
+            SELECT v.version_id, v.file_id, v.version_number, v.revision_letter, v.author,
+                   v.created_timestamp, v.lifecycle_state, v.change_note,
+                   f.plm_id, f.file_name, f.file_type, f.project_id
+            FROM versions v
+            JOIN files f ON f.file_id = v.file_id
+            WHERE v.version_id IN ({matches})
+              AND f.is_active = 1
+        """
+        if lifecycle_state:
+            sql += " AND v.lifecycle_state = ?"
+            params.append(lifecycle_state)
+        if file_type:
+            sql += " AND f.file_type = ?"
+            params.append(file_type)
+        if project_id is not None:
+            sql += " AND f.project_id = ?"
+            params.append(project_id)
+        if latest_only:
+            sql += " AND f.latest_version_id = v.version_id"
+        sql += " ORDER BY f.file_name, v.version_number DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_version_properties(self, version_id: int) -> List[Dict]:
+        """Indexed properties of one version (source, key, value, numeric_value)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT source, key, value, numeric_value FROM version_properties
+                WHERE version_id = ?
+                ORDER BY source, key
+            """, (version_id,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @_busy_retry
+    def rebuild_property_index(self) -> int:
+        """Rebuild version_properties from the JSON columns (e.g. after SQL edits)
+        
+        Returns:
+            number of property rows written
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            count = self._fill_property_index(cursor)
+            conn.commit()
+        logger.info(f"Rebuilt property index: {count} rows")
+        return count
+    
+    # ========================
+    # CHANGE FEED
+    # ========================
+    
+    def changes_since(self, seq: int = 0, limit: int = 1000,
+                      tables: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Changes recorded after a sequence number, oldest first
+        
+        A consumer stores the seq of the last change it processed and asks
+        for the next page; rows are re-read by (table_name, row_id), so a
+        sync costs O(changes) instead of re-querying whole tables. The log
+        starts when a vault is first opened with this version, so a new
+        consumer takes a full snapshot together with get_change_seq() first.
+        
+        Args:
+            seq: Last sequence number already processed (0 = from the start)
+            limit: Maximum changes returned
+            tables: Only these tables (projects, files, versions, file_locks,
+                assembly_relationships)
+            
+        Returns:
+            List of {seq, table_name, row_id, operation, changed_at}
+        """
+        query = "SELECT seq, table_name, row_id, operation, changed_at FROM change_log WHERE seq > ?"
+        params: List[Any] = [seq]
+        if tables is not None:
+            tables = list(tables)
+            unknown = set(tables) - set(_CHANGE_LOG_TABLES)
+            if unknown:
+                raise ValueError(f"Tables without change tracking: {sorted(unknown)}")
+            query += f" AND table_name IN ({', '.join('?' * len(tables))})"
+            params.extend(tables)
+        query += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_change_seq(self) -> int:
+        """Sequence number of the newest recorded change (0 if none), even if pruned"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'change_log'")
+            return cursor.fetchone()[0]
+    
+    def get_first_change_seq(self) -> int:
+        """Sequence number of the oldest change still in the log (0 if none)
+        
+        A consumer whose last processed seq is below this minus one missed
+        pruned changes and has to take a full snapshot again.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MIN(seq), 0) FROM change_log")
+            return cursor.fetchone()[0]
+    
+    @_busy_retry
+    def prune_change_log(self, before_seq: Optional[int] = None,
+                         older_than_days: Optional[int] = None) -> int:
+        """Delete old changes (retention)
+        
+        The log has no record of its consumers, so the caller decides what
+        they have all processed: everything below before_seq, and/or
+        everything recorded more than older_than_days ago. Both delete a seq
+        range, so the cost is O(changes deleted).
+        
+        Args:
+            before_seq: Delete changes with seq < before_seq
+            older_than_days: Delete changes older than this many days
+        
+        Returns:
+            count of changes deleted
+        """
+        if before_seq is None and older_than_days is None:
+            raise ValueError("prune_change_log needs before_seq or older_than_days")
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            cutoff = before_seq
+            if older_than_days is not None:
+                # seq follows commit order, so the first recent change ends the range
+                cursor.execute("""
+                    SELECT COALESCE(
+                        (SELECT seq FROM change_log WHERE changed_at >= datetime('now', ?)
+                         ORDER BY seq LIMIT 1),
+                        (SELECT COALESCE(MAX(seq), 0) + 1 FROM change_log))
+                """, (f"-{int(older_than_days)} days",))
+                by_age = cursor.fetchone()[0]
+                cutoff = by_age if cutoff is None else max(cutoff, by_age)
+            cursor.execute("DELETE FROM change_log WHERE seq < ?", (cutoff,))
+            count = cursor.rowcount
+            conn.commit()
+        logger.info(f"Pruned {count} change log entries before seq {cutoff}")
+        return count
+    
     # ========================
     # ACCESS LOGGING
     # ========================
     
+    @_busy_retry
     def log_action(self, user: str, action: str, file_id: Optional[int] = None, 
                   project_id: Optional[int] = None, duration_ms: Optional[int] = None, 
                   details: Optional[Dict] = None) -> Optional[int]:
         """Log user action to audit trail
         
+        In async audit mode the record is queued for the background writer
+        and None is returned.
+        
         Returns:
             log_id
         """
+        if self._audit:
+            timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            self._audit.submit((
+                user, action, file_id, project_id, timestamp, duration_ms,
+                json.dumps(details) if details else None
+            ))
+            return None
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -856,55 +2959,336 @@ WHERE lock_release_timestamp IS NULL
             row_id = cursor.lastrowid
             return row_id if row_id else None
     
-    def get_audit_trail(self, file_id: Optional[int] = None, user: Optional[str] = None, 
-                       limit: int = 100) -> List[Dict]:
-        """Get audit trail"""
+    @_busy_retry
+    def _write_audit_batch(self, rows: List[Tuple]):
+        """Insert queued audit records in one transaction"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            query = "SELECT * FROM access_log WHERE 1=1"
-            params = []
-            
-            if file_id:
-                query += " AND file_id = ?"
-                params.append(file_id)
-            
-            if user:
-                query += " AND user = ?"
-                params.append(user)
+            conn.executemany("""
+                INSERT INTO access_log 
+                (user, action, file_id, project_id, action_timestamp, duration_ms, details)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+    
+    def flush_audit(self):
+        """Wait until queued audit records are written (no-op in sync mode)"""
+        if self._audit:
+            self._audit.flush()
+    
+    def get_audit_stats(self) -> Optional[Dict[str, int]]:
+        """Async audit writer counters (None in sync mode)"""
+        return self._audit.get_stats() if self._audit else None
+    
+    def get_audit_trail(self, file_id: Optional[int] = None, user: Optional[str] = None, 
+                       limit: int = 100, since: Optional[str] = None,
+                       until: Optional[str] = None) -> List[Dict]:
+        """Get audit trail, newest first
+        
+        Archived month partitions are read only when the hot table cannot fill
+        the limit, and only those overlapping the [since, until) window.
+        """
+        entries = self.iter_audit_trail(file_id, user, page_size=min(limit, 500),
+                                        since=since, until=until)
+        return list(itertools.islice(entries, limit))
+    
+    def iter_audit_trail(self, file_id: Optional[int] = None, user: Optional[str] = None,
+                         page_size: int = 500, since: Optional[str] = None,
+                         until: Optional[str] = None) -> Iterator[Dict]:
+        """Stream the audit trail, newest first, using keyset pagination
+        
+        Pages are keyed on (action_timestamp, log_id) so consumers can stop at
+        any point without the rest of the log ever being read. After the hot
+        access_log table, archived month partitions that overlap the
+        [since, until) window are streamed newest first.
+        """
+        self.flush_audit()
+        filters = ""
+        params: List[Any] = []
+        if file_id:
+            filters += " AND file_id = ?"
+            params.append(file_id)
+        if user:
+            filters += " AND user = ?"
+            params.append(user)
+        if since:
+            filters += " AND action_timestamp >= ?"
+            params.append(since)
+        if until:
+            filters += " AND action_timestamp < ?"
+            params.append(until)
+        
+        yield from self._iter_audit_source(self.get_connection, filters, params, page_size)
+        
+        for partition in self.list_audit_partitions(since, until):
+            path = partition["file_path"]
+            if not os.path.exists(path):
+                logger.warning(f"Audit partition {partition['partition_key']} missing: {path}")
+                continue
+            yield from self._iter_audit_source(
+                lambda: self._audit_archive.open_partition(path), filters, params, page_size
+            )
+    
+    def _iter_audit_source(self, connect, filters: str, params: List[Any],
+                           page_size: int) -> Iterator[Dict]:
+        """Keyset-paginate access_log rows from one database"""
+        last_key = None
+        while True:
+            query = "SELECT * FROM access_log WHERE 1=1" + filters
+            page_params = list(params)
+            if last_key is not None:
+                query += " AND (action_timestamp, log_id) < (?, ?)"
+                page_params.extend(last_key)
+            query += " ORDER BY action_timestamp DESC, log_id DESC LIMIT ?"
+            page_params.append(page_size)
             
-            query += " ORDER BY action_timestamp DESC LIMIT ?"
-            params.append(limit)
+            with connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, page_params)
+                rows = cursor.fetchall()
             
+            for row in rows:
+                yield dict(row)
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1]["action_timestamp"], rows[-1]["log_id"])
+    
+    def list_audit_partitions(self, since: Optional[str] = None,
+                              until: Optional[str] = None) -> List[Dict]:
+        """Archived audit partitions overlapping [since, until), newest first"""
+        query = "SELECT * FROM audit_partitions WHERE 1=1"
+        params = []
+        if since:
+            query += " AND end_timestamp > ?"
+            params.append(since)
+        if until:
+            query += " AND start_timestamp < ?"
+            params.append(until)
+        query += " ORDER BY start_timestamp DESC"
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
     
+    def archive_audit_log(self, hot_months: int = 3,
+                          purge_months: Optional[int] = None) -> Dict[str, Any]:
+        """Move cold months of access_log into monthly archive databases
+        
+        Args:
+            hot_months: Months (including the current one) kept in db.sqlite
+            purge_months: Delete archived partitions entirely older than this
+                many months (None = keep archives forever)
+            
+        Returns:
+            dict with partitions_archived, rows_archived, partitions_purged,
+            bytes_purged
+        """
+        if hot_months < 1:
+            raise ValueError("hot_months must be at least 1")
+        self.flush_audit()
+        
+        cutoff = months_ago_start(hot_months - 1)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT DISTINCT substr(action_timestamp, 1, 7) FROM access_log WHERE action_timestamp < ?",
+                (cutoff,)
+            )
+            keys = sorted(row[0] for row in cursor.fetchall() if row[0])
+        
+        results = {"partitions_archived": 0, "rows_archived": 0,
+                   "partitions_purged": 0, "bytes_purged": 0}
+        for key in keys:
+            results["rows_archived"] += self._archive_audit_month(month_key(key))
+            results["partitions_archived"] += 1
+        
+        if purge_months is not None:
+            purge_cutoff = months_ago_start(purge_months)
+            for partition in self.list_audit_partitions(until=purge_cutoff):
+                if partition["end_timestamp"] > purge_cutoff:
+                    continue
+                results["bytes_purged"] += self._audit_archive.remove_partition(partition["file_path"])
+                with self.get_connection() as conn:
+                    conn.execute("DELETE FROM audit_partitions WHERE partition_key = ?",
+                                 (partition["partition_key"],))
+                    conn.commit()
+                results["partitions_purged"] += 1
+        
+        logger.info(f"Audit archive: {results}")
+        return results
+    
+    @_busy_retry
+    def _archive_audit_month(self, key: str) -> int:
+        """Move one month of access_log rows into its partition database
+        
+        Copy, delete and catalog update share one transaction across the
+        attached databases; INSERT OR IGNORE makes a re-run after a crash safe.
+        
+        Returns:
+            number of rows moved
+        """
+        start, end = month_bounds(key)
+        with self.get_connection() as conn:
+            path = self._audit_archive.attach(conn, key)
+            try:
+                cursor = conn.cursor()
+                self._begin_write(conn)
+                cursor.execute("""
+                    INSERT OR IGNORE INTO audit_archive.access_log
+                    SELECT log_id, user, action, file_id, project_id, action_timestamp, duration_ms, details
+                    FROM main.access_log
+                    WHERE action_timestamp >= ? AND action_timestamp < ?
+                """, (start, end))
+                moved = cursor.rowcount
+                cursor.execute(
+                    "DELETE FROM main.access_log WHERE action_timestamp >= ? AND action_timestamp < ?",
+                    (start, end)
+                )
+                cursor.execute("""
+                    INSERT INTO main.audit_partitions
+                    (partition_key, file_path, start_timestamp, end_timestamp, row_count)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(partition_key) DO UPDATE SET
+                        row_count = row_count + excluded.row_count,
+                        file_path = excluded.file_path,
+                        archived_timestamp = CURRENT_TIMESTAMP
+                """, (key, path, start, end, moved))
+                conn.commit()
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute("DETACH DATABASE audit_archive")
+        
+        logger.info(f"Archived {moved} audit records for {key} to {path}")
+        return moved
+    
     # ========================
     # UTILITY FUNCTIONS
     # ========================
     
     def _get_next_plm_id(self, cursor, prefix: str) -> str:
         """Generate next PLM ID (e.g., PLM-PAR-001)"""
-        # Search pattern must include the full PLM- prefix
-        search_pattern = f"PLM-{prefix}-%"
+        return self._allocate_plm_ids(cursor, prefix, 1)[0]
+    
+    def _allocate_plm_ids(self, cursor, prefix: str, count: int) -> List[str]:
+        """Atomically allocate a block of PLM IDs from the prefix sequence
         
-        cursor.execute(
-            f"SELECT MAX(CAST(SUBSTR(plm_id, -3) AS INTEGER)) FROM files WHERE plm_id LIKE ?"
-            , (search_pattern,)
-        )
-        result = cursor.fetchone()
-        next_num = (result[0] or 0) + 1
+        The UPDATE takes the write lock, so concurrent creators always get
+        disjoint blocks. Runs inside the caller's transaction.
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
         
-        # Also check projects table
         cursor.execute(
-            f"SELECT MAX(CAST(SUBSTR(plm_id, -3) AS INTEGER)) FROM projects WHERE plm_id LIKE ?",
-            (search_pattern,)
+            "UPDATE id_sequences SET last_value = last_value + ? WHERE prefix = ?",
+            (count, prefix)
         )
-        proj_result = cursor.fetchone()
-        proj_num = proj_result[0] or 0
+        if cursor.rowcount == 0:
+            cursor.execute(
+                "INSERT INTO id_sequences (prefix, last_value) VALUES (?, ?)",
+                (prefix, count)
+            )
+        cursor.execute("SELECT last_value FROM id_sequences WHERE prefix = ?", (prefix,))
+        last = cursor.fetchone()[0]
+        return [f"PLM-{prefix}-{n:03d}" for n in range(last - count + 1, last + 1)]
+    
+    @_busy_retry
+    def reserve_plm_ids(self, prefix: str, count: int) -> List[str]:
+        """Reserve a block of PLM IDs in one round trip
+        
+        Args:
+            prefix: ID prefix (PRJ, PAR, ASM, DRW, FIL) or a file type (PART, ...)
+            count: Number of IDs to reserve
+            
+        Returns:
+            list of PLM IDs, in allocation order
+        """
+        prefix = FILE_TYPE_PREFIXES.get(prefix, prefix)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._begin_write(conn)
+            plm_ids = self._allocate_plm_ids(cursor, prefix, count)
+            conn.commit()
+            logger.info(f"Reserved {count} PLM IDs: {plm_ids[0]} .. {plm_ids[-1]}")
+            return plm_ids
+    
+    def get_part_metadata(self, file_id: int) -> Optional[Dict]:
+        """part_meta.json of a file (cached, revalidated by mtime/size)"""
+        file = self.get_file(file_id)
+        if not file:
+            return None
+        return self.metadata.load_part_meta(self.resolve_vault_path(file["vault_path"]))
+    
+    def get_project_metadata(self, project_id: int) -> Dict[int, Dict[str, Any]]:
+        """part_meta.json and version_meta.json of every file in a project, in one pass
+        
+        Returns:
+            {file_id: {"part": part_meta or None, "versions": {"v001": version_meta}}}
+            for active files whose part folder has metadata
+        """
+        project = self.get_project(project_id)
+        if not project:
+            return {}
+        folders = self.metadata.load_project(project["vault_path"])
+        result = {}
+        for f in self.list_project_files(project_id):
+            meta = folders.get(norm_path(self.resolve_vault_path(f["vault_path"])))
+            if meta:
+                result[f["file_id"]] = meta
+        return result
+    
+    def get_metadata_stats(self) -> Dict[str, Any]:
+        """Metadata cache hit/miss/eviction counters"""
+        return self.metadata.get_stats()
+    
+    def backup_database(self, compress: bool = False, pages: int = 256, step_pause: float = 0.05,
+                        if_due: bool = False, apply_retention: bool = True,
+                        progress=None) -> Optional[Dict[str, Any]]:
+        """Online backup of db.sqlite into <vault>/db_backup
+        
+        Writers keep working during the copy (see backup.BackupEngine).
+        Retention and frequency come from the "backup" section of config.json.
         
-        next_num = max(next_num, proj_num) + 1
-        return f"PLM-{prefix}-{next_num:03d}"
+        Args:
+            compress: gzip the backup while writing it
+            pages: Pages copied per step (rollback journal mode)
+            step_pause: Seconds writers get between steps
+            if_due: Only back up when the newest backup is older than the
+                configured frequency
+            apply_retention: Delete backups older than retention_days afterwards
+            progress: Called with (pages remaining, total pages)
+        
+        Returns:
+            Backup result with "deleted" (paths removed by retention), or None
+            if no backup was due
+        """
+        config = load_backup_config(self.vault_path)
+        engine = BackupEngine(self.db_path, os.path.join(self.vault_path, "db_backup"),
+                              pages=pages, step_pause=step_pause,
+                              busy_timeout_ms=self.busy_timeout_ms)
+        if if_due and not engine.is_due(config["frequency"]):
+            return None
+        
+        result = engine.backup(compress=compress, progress=progress)
+        result["deleted"] = engine.enforce_retention(int(config["retention_days"])) \
+            if apply_retention else []
+        return result
+    
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Database backups in <vault>/db_backup, newest first"""
+        return BackupEngine(self.db_path, os.path.join(self.vault_path, "db_backup")).list_backups()
+    
+    def reconcile_vault(self, repair: bool = False, full: bool = False) -> Dict[str, Any]:
+        """Compare Projects/ on disk with the database (see reconcile.VaultReconciler)
+        
+        Args:
+            repair: Deactivate orphaned rows and register untracked versions
+            full: Ignore the directory mtime cache
+        
+        Returns:
+            Reconciliation report
+        """
+        return VaultReconciler(self).run(repair=repair, full=full)
     
     def validate_vault_integrity(self) -> Dict[str, Any]:
         """Validate vault database integrity
@@ -942,14 +3326,13 @@ WHERE lock_release_timestamp IS NULL
             results["orphaned_versions"] = cursor.fetchone()[0]
             
             # Find missing checksums
-            cursor.execute("SELECT COUNT(*) FROM versions WHERE checksum IS NULL")
+            cursor.execute("SELECT COUNT(*) FROM versions WHERE checksum IS NULL OR checksum = ''")
             results["missing_checksums"] = cursor.fetchone()[0]
             
-            # Find stale locks
+            # Find stale locks (lease lapsed, not yet swept)
             cursor.execute("""
                 SELECT COUNT(*) FROM file_locks 
-                WHERE lock_release_timestamp IS NULL
-                  AND CAST((julianday('now') - julianday(lock_timestamp)) * 24 AS INTEGER) > 24
+                WHERE lock_release_timestamp IS NULL AND expires_at <= CURRENT_TIMESTAMP
             """)
             results["stale_locks"] = cursor.fetchone()[0]
             
@@ -0,0 +1,623 @@
+"""
+PLM Lock Daemon
+- In-memory table of active file locks for one vault, served over a local socket
+- Newline-delimited JSON protocol (acquire[_many] / release[_many] / renew / status / list / stats)
+- Write-through to file_locks in batches (group commit)
+- Client used transparently by PLMDatabase when the daemon is running
+"""
+
+import os
+import json
+import stat
+import time
+import queue
+import select
+import socket
+import hashlib
+import tempfile
+import threading
+import socketserver
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a client skips the daemon after failing to reach it
+RETRY_AFTER_S = 5.0
+
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+
+# Requests that may safely reach the daemon twice. A repeated acquire would
+# open a second session, so it is never resent after a lost connection.
+IDEMPOTENT_OPS = frozenset({"ping", "status", "list", "stats", "release", "release_many", "renew"})
+
+
+class LockdUnavailable(Exception):
+    """Raised by LockdClient when the daemon cannot be reached
+
+    ``delivered`` is True when the connection broke after the request was
+    sent, so the daemon may have applied it.
+    """
+
+    def __init__(self, message: str, delivered: bool = False):
+        super().__init__(message)
+        self.delivered = delivered
+
+
+def runtime_dir() -> str:
+    """Private directory for daemon addresses of the current user
+
+    Any local user can create files in the shared temp directory, and a
+    planted socket or port file there would receive every lock request. On
+    POSIX the addresses therefore live in a 0700 directory owned by the user
+    ($XDG_RUNTIME_DIR/plm-lockd-<uid>, else <tmp>/plm-lockd-<uid>), so only
+    that user's processes share a daemon; other users fall back to SQLite.
+    The Windows temp directory is already per user.
+
+    Raises:
+        PermissionError if the directory exists but is not private
+    """
+    if os.name == "nt":
+        return tempfile.gettempdir()
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if not base or not os.path.isdir(base):
+        base = tempfile.gettempdir()
+    path = os.path.join(base, f"plm-lockd-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() \
+            or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"Lock daemon directory {path} must be a directory "
+                              f"owned by the current user with mode 0700")
+    return path
+
+
+def lockd_address(vault_path: str) -> str:
+    """Base path of the daemon's socket / port file for a vault
+
+    The daemon is local to one machine, so its address lives in the user's
+    runtime directory (keyed by the vault path), never on the shared vault.
+    """
+    key = os.path.normcase(os.path.abspath(vault_path)).encode("utf-8")
+    return os.path.join(runtime_dir(), f"plm-lockd-{hashlib.sha1(key).hexdigest()[:16]}")
+
+
+def _owned_by_user(path: str) -> bool:
+    """True if path exists, is not a symlink and belongs to the current user"""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    if stat.S_ISLNK(info.st_mode):
+        return False
+    return os.name == "nt" or info.st_uid == os.getuid()
+
+
+def _peer_closed(sock: socket.socket) -> bool:
+    """True if an idle kept-alive connection has been closed by the daemon
+
+    Between requests the daemon never sends anything, so a readable socket
+    means end of stream (or a broken connection).
+    """
+    try:
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class _Request:
+    """A mutation waiting for its batch to commit"""
+
+    __slots__ = ("op", "done", "result")
+
+    def __init__(self, op: Dict[str, Any]):
+        self.op = op
+        self.done = threading.Event()
+        self.result: Any = None
+
+
+class LockDaemon:
+    """Lock coordinator for one vault
+
+    Status and list requests are answered from memory without touching
+    SQLite. Acquire, release and renew requests are queued to a writer thread
+    that applies everything queued so far in one transaction
+    (PLMDatabase.apply_lock_operations) and only then replies, so a granted
+    lock is always on disk. The database stays authoritative: the writes use
+    the same compare-and-set as the direct path, so a lock taken by a client
+    that bypassed the daemon is never overwritten, and the memory table is
+    reloaded every refresh_interval seconds after expiring lapsed leases.
+    Because a lock may also have been released directly in SQLite since the
+    last reload, a holder found in memory is confirmed with one indexed read
+    of file_locks before an acquire is refused.
+    """
+
+    def __init__(self, db, transport: Optional[str] = None, host: str = "127.0.0.1",
+                 port: int = 0, refresh_interval: float = 5.0, batch_size: int = 256):
+        """
+        Args:
+            db: PLMDatabase instance (created with use_lockd=False)
+            transport: "unix" or "tcp" (default: unix where available)
+            host: TCP bind address
+            port: TCP port (0 = any free port)
+            refresh_interval: Seconds between lease expiry + reload from the database
+            batch_size: Maximum requests written per transaction
+        """
+        self.db = db
+        self.transport = transport or ("unix" if HAS_UNIX_SOCKETS else "tcp")
+        self.host = host
+        self.port = port
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.address_base = lockd_address(db.vault_path)
+
+        # file_id -> {session_id: [user, expires (epoch seconds)]}
+        self._by_file: Dict[int, Dict[str, List]] = {}
+        # session_id -> file_id
+        self._sessions: Dict[str, int] = {}
+        # file_id -> [user, requests in flight]
+        self._pending: Dict[int, List] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._server = None
+        self.stats = {"requests": 0, "conflicts_from_memory": 0, "stale_memory_holders": 0,
+                      "batches": 0, "batched_ops": 0, "refreshes": 0, "expired": 0}
+
+    def start(self):
+        """Load the lock table, bind the socket and start serving in background threads"""
+        self._check_not_running()
+        self.refresh()
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = daemon.handle(json.loads(line))
+                    except Exception as e:
+                        response = {"ok": False, "error": str(e)}
+                    self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+        base = socketserver.ThreadingUnixStreamServer if self.transport == "unix" \
+            else socketserver.ThreadingTCPServer
+
+        class Server(base):
+            # Check-out storms open many connections at once
+            request_queue_size = 128
+            daemon_threads = True
+
+        if self.transport == "unix":
+            path = self.address_base + ".sock"
+            if os.path.lexists(path):
+                os.remove(path)
+            self._server = Server(path, Handler)
+            os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+        else:
+            self._server = Server((self.host, self.port), Handler)
+            host, port = self._server.server_address[:2]
+            tmp = self.address_base + ".port.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"host": host, "port": port, "pid": os.getpid()}, f)
+            os.replace(tmp, self.address_base + ".port")
+
+        for target, name in ((self._server.serve_forever, "plm-lockd-server"),
+                             (self._write_loop, "plm-lockd-writer"),
+                             (self._refresh_loop, "plm-lockd-refresh")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Lock daemon serving {self.db.vault_path} on {self.describe_address()}")
+
+    def describe_address(self) -> str:
+        if self.transport == "unix":
+            return self.address_base + ".sock"
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"{host}:{port}"
+
+    def shutdown(self):
+        """Stop serving, flush queued writes and remove the address file"""
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        for suffix in (".sock", ".port"):
+            path = self.address_base + suffix
+            if os.path.exists(path):
+                os.remove(path)
+        logger.info("Lock daemon stopped")
+
+    def _check_not_running(self):
+        client = LockdClient(self.db.vault_path)
+        if client.available():
+            try:
+                client.call("ping")
+                raise Exception(f"Lock daemon already running for {self.db.vault_path}")
+            except LockdUnavailable:
+                pass
+            finally:
+                client.close()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one protocol request"""
+        op = request.get("op")
+        with self._lock:
+            self.stats["requests"] += 1
+        if op == "acquire":
+            return self._acquire(request)
+        if op == "acquire_many":
+            return self._acquire_many(request)
+        if op == "release":
+            return self._release(request)
+        if op == "release_many":
+            return self._release_many(request)
+        if op == "renew":
+            return self._renew(request)
+        if op == "status":
+            with self._lock:
+                holder = self._holder(int(request["file_id"]), time.time())
+            return {"ok": True, "file_id": request["file_id"], "locked_by": holder}
+        if op == "list":
+            return {"ok": True, "locks": self.list_locks()}
+        if op == "stats":
+            return {"ok": True, "stats": self.get_stats()}
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def _holder(self, file_id: int, now: float) -> Optional[str]:
+        """Current holder from memory (caller holds self._lock)"""
+        pending = self._pending.get(file_id)
+        if pending:
+            return pending[0]
+        for user, expires in self._by_file.get(file_id, {}).values():
+            if expires > now:
+                return user
+        return None
+
+    def _conflicts(self, file_ids: List[int], user: str) -> Dict[int, str]:
+        """Files held by other users
+
+        Requests in flight are trusted as they are. A holder remembered from
+        the last refresh is re-read from the database first, and forgotten if
+        its lock was released there in the meantime.
+        """
+        conflicts: Dict[int, str] = {}
+        remembered: Dict[int, List[str]] = {}
+        with self._lock:
+            now = time.time()
+            for file_id in file_ids:
+                pending = self._pending.get(file_id)
+                if pending:
+                    if pending[0] != user:
+                        conflicts[file_id] = pending[0]
+                    continue
+                sessions = [session_id for session_id, (holder, expires)
+                            in self._by_file.get(file_id, {}).items()
+                            if holder != user and expires > now]
+                if sessions:
+                    remembered[file_id] = sessions
+        if not remembered:
+            return conflicts
+
+        holders = self.db.get_lock_holders(remembered)
+        with self._lock:
+            for file_id, sessions in remembered.items():
+                holder = holders.get(file_id)
+                if holder is not None and holder != user:
+                    conflicts[file_id] = holder
+                    continue
+                self.stats["stale_memory_holders"] += 1
+                file_sessions = self._by_file.get(file_id, {})
+                for session_id in sessions:
+                    file_sessions.pop(session_id, None)
+                    self._sessions.pop(session_id, None)
+                if not file_sessions:
+                    self._by_file.pop(file_id, None)
+        return conflicts
+
+    def _claim_pending(self, file_ids: List[int], user: str,
+                       conflicts: Dict[int, str]) -> Optional[Dict[int, str]]:
+        """Mark files as being acquired by user, unless they are held
+
+        Returns:
+            {file_id: holder} if the request must be refused, else None
+            (caller holds self._lock)
+        """
+        # Another user's request may have been queued while the database was read
+        conflicts = dict(conflicts)
+        for file_id in file_ids:
+            pending = self._pending.get(file_id)
+            if pending and pending[0] != user:
+                conflicts[file_id] = pending[0]
+        if conflicts:
+            self.stats["conflicts_from_memory"] += 1
+            return conflicts
+        for file_id in file_ids:
+            self._pending.setdefault(file_id, [user, 0])[1] += 1
+        return None
+
+    def _lease(self, request: Dict[str, Any]) -> int:
+        lease = request.get("lease_seconds")
+        return lease if lease is not None else self.db.lock_lease_seconds
+
+    def _acquire(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        file_id = int(request["file_id"])
+        user = request["user"]
+        conflicts = self._conflicts([file_id], user)
+        with self._lock:
+            conflicts = self._claim_pending([file_id], user, conflicts)
+            if conflicts:
+                return {"ok": False, "conflict": True, "locked_by": conflicts[file_id]}
+
+        result = self._submit({"op": "acquire", "file_id": file_id, "user": user,
+                               "reason": request.get("reason", "Edit"),
+                               "lease_seconds": request.get("lease_seconds")})
+
+        with self._lock:
+            pending = self._pending[file_id]
+            pending[1] -= 1
+            if not pending[1]:
+                del self._pending[file_id]
+            if isinstance(result, Exception):
+                return self._error(result)
+            self._add_session(file_id, result, user, time.time() + self._lease(request))
+        return {"ok": True, "session_id": result}
+
+    def _acquire_many(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """All-or-nothing lock of several files (e.g. an assembly subtree)"""
+        file_ids = sorted({int(fid) for fid in request["file_ids"]})
+        user = request["user"]
+        conflicts = self._conflicts(file_ids, user)
+        with self._lock:
+            conflicts = self._claim_pending(file_ids, user, conflicts)
+            if conflicts:
+                return {"ok": False, "conflict": True, "locked_by": conflicts[min(conflicts)],
+                        "conflicts": conflicts}
+
+        result = self._submit({"op": "acquire_many", "file_ids": file_ids, "user": user,
+                               "reason": request.get("reason", "Edit"),
+                               "lease_seconds": request.get("lease_seconds")})
+
+        with self._lock:
+            for file_id in file_ids:
+                pending = self._pending[file_id]
+                pending[1] -= 1
+                if not pending[1]:
+                    del self._pending[file_id]
+            if isinstance(result, Exception):
+                return self._error(result)
+            expires = time.time() + self._lease(request)
+            for file_id, session_id in result.items():
+                self._add_session(file_id, session_id, user, expires)
+        return {"ok": True, "sessions": result}
+
+    def _add_session(self, file_id: int, session_id: str, user: str, expires: float):
+        """Record a granted lock, dropping lapsed sessions of other users (caller holds self._lock)"""
+        sessions = self._by_file.setdefault(file_id, {})
+        for other in [s for s, (u, _) in sessions.items() if u != user]:
+            del sessions[other]
+            self._sessions.pop(other, None)
+        sessions[session_id] = [user, expires]
+        self._sessions[session_id] = file_id
+
+    def _release(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        file_id = int(request["file_id"])
+        user = request["user"]
+        result = self._submit({"op": "release", "file_id": file_id, "user": user})
+        if isinstance(result, Exception):
+            return self._error(result)
+        with self._lock:
+            self._drop_sessions(file_id, user)
+        return {"ok": True}
+
+    def _release_many(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        file_ids = sorted({int(fid) for fid in request["file_ids"]})
+        user = request["user"]
+        result = self._submit({"op": "release_many", "file_ids": file_ids, "user": user})
+        if isinstance(result, Exception):
+            return self._error(result)
+        with self._lock:
+            for file_id in file_ids:
+                self._drop_sessions(file_id, user)
+        return {"ok": True}
+
+    def _drop_sessions(self, file_id: int, user: str):
+        """Forget user's sessions on a file (caller holds self._lock)"""
+        sessions = self._by_file.get(file_id, {})
+        for session_id in [s for s, (u, _) in sessions.items() if u == user]:
+            del sessions[session_id]
+            self._sessions.pop(session_id, None)
+        if not sessions:
+            self._by_file.pop(file_id, None)
+
+    def _renew(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        session_id = request["session_id"]
+        result = self._submit({"op": "renew", "session_id": session_id,
+                               "lease_seconds": request.get("lease_seconds")})
+        if isinstance(result, Exception):
+            return self._error(result)
+        lease = self._lease(request)
+        with self._lock:
+            file_id = self._sessions.get(session_id)
+            if file_id is not None and session_id in self._by_file.get(file_id, {}):
+                self._by_file[file_id][session_id][1] = time.time() + lease
+        return {"ok": True, "expires_at": result}
+
+    def _error(self, error: Exception) -> Dict[str, Any]:
+        if hasattr(error, "locked_by"):
+            return {"ok": False, "conflict": True, "locked_by": error.locked_by,
+                    "conflicts": getattr(error, "conflicts", {})}
+        return {"ok": False, "error": str(error)}
+
+    def list_locks(self) -> List[Dict[str, Any]]:
+        """Active locks held in memory"""
+        now = time.time()
+        with self._lock:
+            return [{"file_id": file_id, "session_id": session_id, "locked_by": user,
+                     "expires_in_s": round(expires - now, 1)}
+                    for file_id, sessions in self._by_file.items()
+                    for session_id, (user, expires) in sessions.items() if expires > now]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Request, batch and refresh counters"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["active_locks"] = sum(len(s) for s in self._by_file.values())
+        stats["mean_batch_size"] = stats["batched_ops"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _submit(self, op: Dict[str, Any]) -> Any:
+        """Queue a mutation and wait until its batch committed"""
+        request = _Request(op)
+        self._queue.put(request)
+        request.done.wait()
+        return request.result
+
+    def _write_loop(self):
+        """Group commit: everything queued while the last batch was written goes in the next"""
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                results = self.db.apply_lock_operations([r.op for r in batch])
+            except Exception as e:
+                logger.error(f"Lock batch of {len(batch)} failed: {e}")
+                results = [e] * len(batch)
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["batched_ops"] += len(batch)
+            for request, result in zip(batch, results):
+                request.result = result
+                request.done.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Lock daemon refresh failed: {e}")
+
+    def refresh(self):
+        """Expire lapsed leases and reload the lock table from the database"""
+        expired = self.db.expire_locks()
+        by_file: Dict[int, Dict[str, List]] = {}
+        sessions: Dict[str, int] = {}
+        now = time.time()
+        for lock in self.db.get_active_locks():
+            expires = now + float(lock["expires_in_s"])
+            by_file.setdefault(lock["file_id"], {})[lock["session_id"]] = [lock["locked_by"], expires]
+            sessions[lock["session_id"]] = lock["file_id"]
+        with self._lock:
+            self._by_file = by_file
+            self._sessions = sessions
+            self.stats["refreshes"] += 1
+            self.stats["expired"] += expired
+
+
+class LockdClient:
+    """Connection to a vault's lock daemon (one socket per thread)"""
+
+    def __init__(self, vault_path: str, timeout: float = 10.0):
+        """
+        Args:
+            vault_path: Vault whose daemon to use
+            timeout: Socket timeout in seconds
+        """
+        try:
+            self.address_base = lockd_address(vault_path)
+        except OSError as e:
+            logger.warning(f"Lock daemon disabled: {e}")
+            self.address_base = None
+        self.timeout = timeout
+        self._local = threading.local()
+        self._skip_until = 0.0
+
+    def available(self) -> bool:
+        """True if a daemon of this user advertises itself for this vault (no connect)"""
+        if self.address_base is None or time.monotonic() < self._skip_until:
+            return False
+        return (HAS_UNIX_SOCKETS and _owned_by_user(self.address_base + ".sock")) \
+            or _owned_by_user(self.address_base + ".port")
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        if self.address_base is None:
+            raise ConnectionError("No private directory for lock daemon addresses")
+        if HAS_UNIX_SOCKETS and _owned_by_user(self.address_base + ".sock"):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address_base + ".sock")
+        else:
+            if not _owned_by_user(self.address_base + ".port"):
+                raise ConnectionError("No lock daemon address owned by the current user")
+            with open(self.address_base + ".port", "r", encoding="utf-8") as f:
+                address = json.load(f)
+            sock = socket.create_connection((address["host"], address["port"]), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile("rb")
+
+    def call(self, op: str, **args) -> Dict[str, Any]:
+        """Send one request and return the daemon's response
+
+        A kept-alive connection the daemon has closed is replaced before the
+        request is sent. If the connection breaks after sending, only
+        IDEMPOTENT_OPS are sent again (once, on a new connection).
+
+        Raises:
+            LockdUnavailable if the daemon cannot be reached (delivered=True
+            if it may have received the request)
+        """
+        message = json.dumps({"op": op, **args}).encode("utf-8") + b"\n"
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and _peer_closed(conn[0]):
+            self._drop()
+            conn = None
+        for attempt in range(2):
+            reused = conn is not None
+            try:
+                if conn is None:
+                    conn = self._local.conn = self._connect()
+            except (OSError, ValueError) as e:
+                self._drop()
+                self._skip_until = time.monotonic() + RETRY_AFTER_S
+                raise LockdUnavailable(str(e))
+            try:
+                conn[0].sendall(message)
+                line = conn[1].readline()
+                if not line:
+                    raise ConnectionError("Connection closed by lock daemon")
+                return json.loads(line)
+            except (OSError, ValueError) as e:
+                self._drop()
+                conn = None
+                if attempt or not reused or op not in IDEMPOTENT_OPS:
+                    self._skip_until = time.monotonic() + RETRY_AFTER_S
+                    raise LockdUnavailable(str(e), delivered=True)
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def close(self):
+        """Close this thread's connection"""
+        self._drop()
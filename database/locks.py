@@ -0,0 +1,74 @@
+"""
+PLM Lock Leases
+- Lease length defaults for file locks
+- Background sweeper that expires lapsed leases
+"""
+
+import atexit
+import threading
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# A lock nobody renews lapses after this long (the old 24 hour stale age)
+DEFAULT_LEASE_SECONDS = 24 * 60 * 60
+
+# Lapsed leases expired per sweeper transaction
+SWEEP_BATCH_SIZE = 500
+
+
+def lease_modifier(seconds: int) -> str:
+    """SQLite datetime() modifier for a lease length"""
+    return f"+{int(seconds)} seconds"
+
+
+class LockSweeper:
+    """Daemon thread that periodically expires lapsed lock leases
+
+    The sweep itself is an indexed range query on file_locks.expires_at over
+    open locks only, so each pass costs O(expired) regardless of how many
+    locks have been taken in the vault's lifetime.
+    """
+
+    def __init__(self, sweep: Callable[[], int], interval: float = 60.0):
+        """Start sweeper thread
+
+        Args:
+            sweep: Expires lapsed leases and returns how many it released
+            interval: Seconds between sweeps
+        """
+        self.sweep = sweep
+        self.interval = interval
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {"sweeps": 0, "expired": 0, "errors": 0}
+
+        self._thread = threading.Thread(target=self._run, name="plm-lock-sweeper", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                expired = self.sweep()
+                with self._lock:
+                    self.stats["sweeps"] += 1
+                    self.stats["expired"] += expired
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                logger.error(f"Lock sweep failed: {e}")
+
+    def close(self):
+        """Stop the sweeper thread"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sweep, expiry and error counters"""
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,142 @@
+"""
+PLM Metadata Cache
+- part_meta.json / version_meta.json access with an in-process LRU cache
+- Entries validated by (mtime, size) so edits by the SolidWorks add-in are seen
+- Batch loading of every metadata file of a project in one directory walk
+"""
+
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .reconcile import norm_path
+
+logger = logging.getLogger(__name__)
+
+PART_META_FILE = "part_meta.json"
+VERSION_META_FILE = "version_meta.json"
+
+
+class MetadataCache:
+    """LRU cache of parsed metadata JSON files
+
+    A lookup costs one stat: the cached document is returned only while the
+    file's (st_mtime_ns, st_size) still match what was parsed, otherwise the
+    file is read again. Unparsable files are cached as None under the same
+    rule, so repeated lookups do not re-read them either.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        Args:
+            max_entries: Parsed files kept before least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Optional[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def load(self, path: str) -> Optional[Dict[str, Any]]:
+        """Parsed JSON of a metadata file, or None if missing/invalid"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+        return self._load(path, (st.st_mtime_ns, st.st_size))
+
+    def _load(self, path: str, validator: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+        key = norm_path(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == validator:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                self.stats["stale"] += 1
+            self.stats["misses"] += 1
+
+        data = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot read metadata {path}: {e}")
+
+        with self._lock:
+            self._entries[key] = (validator, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return data
+
+    def load_part_meta(self, part_folder: str) -> Optional[Dict[str, Any]]:
+        """part_meta.json of a part folder (Parts/<name>)"""
+        return self.load(os.path.join(part_folder, PART_META_FILE))
+
+    def load_version_meta(self, version_folder: str) -> Optional[Dict[str, Any]]:
+        """version_meta.json of a version folder (Parts/<name>/vNNN)"""
+        return self.load(os.path.join(version_folder, VERSION_META_FILE))
+
+    def load_project(self, project_path: str) -> Dict[str, Dict[str, Any]]:
+        """Load all metadata of a project in one walk
+
+        Uses the stat information os.scandir already has, so unchanged files
+        cost no extra system call on Windows and are served from the cache.
+
+        Returns:
+            {normalized part folder: {"part": part_meta, "versions": {"v001": version_meta}}}
+            where an existing but unreadable file is returned as {}
+        """
+        parts: Dict[str, Dict[str, Any]] = {}
+        stack = [project_path]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith("."):
+                        stack.append(entry.path)
+                elif entry.name in (PART_META_FILE, VERSION_META_FILE):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    data = self._load(entry.path, (st.st_mtime_ns, st.st_size))
+                    if data is None:
+                        data = {}
+                    if entry.name == PART_META_FILE:
+                        parts.setdefault(norm_path(directory), {"part": None, "versions": {}})["part"] = data
+                    else:
+                        part_key = norm_path(os.path.dirname(directory))
+                        parts.setdefault(part_key, {"part": None, "versions": {}})["versions"][
+                            os.path.basename(directory)] = data
+        return parts
+
+    def invalidate(self, path: Optional[str] = None):
+        """Drop one cached file (or everything when path is None)"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(norm_path(path), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and hit ratio"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "entries": len(self._entries),
+                    "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0}
@@ -0,0 +1,183 @@
+"""
+PLM Connection Pool
+- Bounded pool of warm SQLite connections
+- Per-thread connection affinity
+- Prepared statement cache per connection
+"""
+
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable SQLite connections
+
+    Connections are opened lazily up to ``pool_size`` and handed back to the
+    pool instead of being closed. A thread asking for a connection gets the one
+    it used last when it is idle, so a single CLI command or GUI refresh keeps
+    working against the same warm connection and its statement cache.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 5, statement_cache_size: int = 128,
+                 timeout: float = 30.0,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None):
+        """Create connection pool
+
+        Args:
+            db_path: Path to SQLite database file
+            pool_size: Maximum number of open connections
+            statement_cache_size: Prepared statements cached per connection
+            timeout: Seconds to wait for a free connection before failing
+            on_connect: Optional hook run once on every new connection
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.statement_cache_size = statement_cache_size
+        self.timeout = timeout
+        self.on_connect = on_connect
+
+        self._idle: List[sqlite3.Connection] = []
+        self._owner: Dict[int, int] = {}   # id(conn) -> thread ident that last used it
+        self._open_count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.stats = {"created": 0, "reused": 0, "waits": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new configured connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            cached_statements=self.statement_cache_size,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take a connection from the pool, opening one if allowed
+
+        Raises:
+            TimeoutError if no connection frees up within ``timeout`` seconds
+        """
+        thread_id = threading.get_ident()
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                if self._idle:
+                    # Prefer the connection this thread used last
+                    for i in range(len(self._idle) - 1, -1, -1):
+                        if self._owner.get(id(self._idle[i])) == thread_id:
+                            conn = self._idle.pop(i)
+                            break
+                    else:
+                        conn = self._idle.pop()
+                    self._owner[id(conn)] = thread_id
+                    self.stats["reused"] += 1
+                    return conn
+
+                if self._open_count < self.pool_size:
+                    self._open_count += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool_size={self.pool_size})"
+                    )
+                self.stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        # Open outside the lock so slow network shares don't block other threads
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._owner[id(conn)] = thread_id
+            self.stats["created"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool
+
+        Any transaction left open by the caller is rolled back, which matches
+        the old behaviour of closing the connection without committing.
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding broken pooled connection: {e}")
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._open_count -= 1
+                self._owner.pop(id(conn), None)
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection and free its pool slot"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open_count -= 1
+            self._owner.pop(id(conn), None)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for conn in idle:
+                self._owner.pop(id(conn), None)
+                conn.close()
+            self._open_count -= len(idle)
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Pool usage counters"""
+        with self._cond:
+            return {
+                **self.stats,
+                "open": self._open_count,
+                "idle": len(self._idle),
+                "pool_size": self.pool_size
+            }
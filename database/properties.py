@@ -0,0 +1,118 @@
+"""
+PLM Property Index
+- Flattening of custom_properties / solidworks_properties JSON into rows
+- Numeric parsing of property values ("6061", "2.5 mm") for range queries
+- SQL for property filters over the version_properties table
+"""
+
+import re
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Property sources stored in version_properties.source
+CUSTOM = "custom"
+SOLIDWORKS = "solidworks"
+
+# A number optionally followed by a unit ("12.5 mm", "-3", "1e-3", "45°")
+_NUMBER_RE = re.compile(r"^\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)\s*[^\d\s.,;:/]{0,8}\s*$")
+
+_RANGE_OPERATORS = {">": ">", ">=": ">=", "<": "<", "<=": "<=", "=": "=", "==": "=", "!=": "!="}
+
+
+def numeric_value(value: Any) -> Optional[float]:
+    """Numeric form of a property value, or None if it is not a number"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if not text or text[0] not in "0123456789+-.":
+        return None
+    match = _NUMBER_RE.match(text)
+    return float(match.group(1)) if match else None
+
+
+def flatten_properties(properties: Any, prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    """Yield (key, leaf value) pairs; nested keys are joined with '.'"""
+    if isinstance(properties, dict):
+        for key, value in properties.items():
+            yield from flatten_properties(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(properties, list):
+        for index, value in enumerate(properties):
+            yield from flatten_properties(value, f"{prefix}.{index}" if prefix else str(index))
+    elif prefix:
+        yield prefix, properties
+
+
+def property_rows(version_id: int, custom_properties: Any,
+                  solidworks_properties: Any) -> List[Tuple[int, str, str, Optional[str], Optional[float]]]:
+    """version_properties rows (version_id, source, key, value, numeric_value)
+
+    Property dicts may be given parsed or as stored JSON text.
+    """
+    rows = []
+    for source, properties in ((CUSTOM, custom_properties), (SOLIDWORKS, solidworks_properties)):
+        if isinstance(properties, str):
+            try:
+                properties = json.loads(properties)
+            except ValueError:
+                continue
+        if not properties:
+            continue
+        seen = set()
+        for key, value in flatten_properties(properties):
+            # Keys are case-insensitive; the first spelling wins
+            if key.lower() in seen:
+                continue
+            seen.add(key.lower())
+            text = None if value is None else (
+                str(value).lower() if isinstance(value, bool) else str(value))
+            rows.append((version_id, source, key, text, numeric_value(value)))
+    return rows
+
+
+def property_filter_sql(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Version-id subquery matching every filter (INTERSECT of index lookups)
+
+    Filter values:
+        "6061" / 6061          equality (numbers compare numerically)
+        (lo, hi)               inclusive numeric range, None for an open end
+        {">=": 2, "<": 5}      explicit numeric comparisons
+        None                   property present with any value
+
+    Returns:
+        (sql, params) selecting version_id
+    """
+    parts = []
+    params: List[Any] = []
+    for key, condition in filters.items():
+        clauses = ["key = ?"]
+        params.append(key)
+        if condition is None:
+            pass
+        elif isinstance(condition, tuple):
+            if len(condition) != 2:
+                raise ValueError(f"Range for {key} must be (low, high)")
+            low, high = condition
+            if low is not None:
+                clauses.append("numeric_value >= ?")
+                params.append(float(low))
+            if high is not None:
+                clauses.append("numeric_value <= ?")
+                params.append(float(high))
+            if low is None and high is None:
+                clauses.append("numeric_value IS NOT NULL")
+        elif isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op not in _RANGE_OPERATORS:
+                    raise ValueError(f"Unsupported operator for {key}: {op}")
+                clauses.append(f"numeric_value {_RANGE_OPERATORS[op]} ?")
+                params.append(float(operand))
+        elif isinstance(condition, (int, float)) and not isinstance(condition, bool):
+            clauses.append("numeric_value = ?")
+            params.append(float(condition))
+        else:
+            clauses.append("value = ?")
+            params.append(str(condition).lower() if isinstance(condition, bool) else str(condition))
+        parts.append("SELECT version_id FROM version_properties WHERE " + " AND ".join(clauses))
+    return " INTERSECT ".join(parts), params
@@ -0,0 +1,338 @@
+"""
+PLM Vault Reconciliation
+- Single os.scandir walk of Projects/ with a persistent directory mtime cache
+- In-memory comparison of the tree against projects, files and versions
+- Orphan report and repair in both directions
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .chunkstore import MANIFEST_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT = 1
+
+# Directory mtimes this close to the previous scan may hide a later change
+# within the same timestamp tick; such listings are never reused
+MTIME_SLACK_NS = 2 * 1000 * 1000 * 1000
+
+VERSION_DIR_RE = re.compile(r"^v(\d{3,})$")
+META_FILES = ("part_meta.json", "version_meta.json")
+
+
+def norm_path(path: str) -> str:
+    """Comparison key for a filesystem path (case-insensitive on Windows)"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+class DirectoryScanner:
+    """Walk a directory tree once, reusing listings of unchanged directories
+
+    Every directory is stat'ed, but only directories whose mtime changed since
+    the cached scan are listed again with os.scandir. Adding or removing an
+    entry updates a directory's mtime, so existence checks stay exact while an
+    unchanged vault costs one stat per directory.
+    """
+
+    def __init__(self, root: str, cache_path: Optional[str] = None):
+        """
+        Args:
+            root: Directory to walk (e.g. <vault>/Projects)
+            cache_path: JSON file for the mtime cache (None = no cache)
+        """
+        self.root = root
+        self.cache_path = cache_path
+
+    def _load_cache(self) -> Tuple[Dict[str, List], int]:
+        if not self.cache_path or not os.path.isfile(self.cache_path):
+            return {}, 0
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable scan cache {self.cache_path}: {e}")
+            return {}, 0
+        if data.get("format") != CACHE_FORMAT or data.get("root") != norm_path(self.root):
+            return {}, 0
+        return data.get("dirs", {}), data.get("scanned_at_ns", 0)
+
+    def _save_cache(self, tree: Dict[str, List], scanned_at_ns: int):
+        if not self.cache_path:
+            return
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": CACHE_FORMAT, "root": norm_path(self.root),
+                       "scanned_at_ns": scanned_at_ns, "dirs": tree}, f)
+        os.replace(tmp, self.cache_path)
+
+    def scan(self, full: bool = False) -> Tuple[Dict[str, List], Dict[str, Any]]:
+        """Walk the tree
+
+        Args:
+            full: Ignore the cache and list every directory
+
+        Returns:
+            (tree, stats) - tree maps norm_path(dir) to [mtime_ns, subdirs, files]
+        """
+        start = time.perf_counter()
+        scanned_at_ns = time.time_ns()
+        cached, cached_at_ns = ({}, 0) if full else self._load_cache()
+        trusted_before = cached_at_ns - MTIME_SLACK_NS
+
+        tree: Dict[str, List] = {}
+        stats = {"dirs": 0, "listed": 0, "reused": 0}
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            key = norm_path(directory)
+            entry = cached.get(key)
+
+            if entry and entry[0] == mtime_ns and mtime_ns < trusted_before:
+                subdirs, files = entry[1], entry[2]
+                stats["reused"] += 1
+            else:
+                subdirs, files = [], []
+                try:
+                    with os.scandir(directory) as it:
+                        for item in it:
+                            if item.is_dir(follow_symlinks=False):
+                                # Hidden folders (.chunks) are storage internals
+                                if not item.name.startswith("."):
+                                    subdirs.append(item.name)
+                            else:
+                                files.append(item.name)
+                except FileNotFoundError:
+                    continue
+                stats["listed"] += 1
+
+            tree[key] = [mtime_ns, subdirs, files]
+            stats["dirs"] += 1
+            stack.extend(os.path.join(directory, name) for name in subdirs)
+
+        self._save_cache(tree, scanned_at_ns)
+        stats["elapsed_s"] = time.perf_counter() - start
+        return tree, stats
+
+
+class VaultReconciler:
+    """Compare Projects/ on disk with the vault database
+
+    Database rows whose folders or files are gone, and project, part and
+    version folders the database does not know about, are reported. With
+    repair, orphaned projects and files are deactivated (is_active = 0, never
+    deleted) and untracked version folders that continue a tracked file's
+    history are registered. Untracked projects and parts are only reported,
+    since registering them needs a name, type and owner a person must choose.
+    Blobs that became writable (every version hardlinked to one would change
+    if it were edited in place) are reported and made read-only again.
+    """
+
+    def __init__(self, db, cache_path: Optional[str] = None):
+        """
+        Args:
+            db: PLMDatabase instance
+            cache_path: Directory mtime cache (default: <vault>/Utils/scan_cache.json)
+        """
+        self.db = db
+        self.root = os.path.join(db.vault_path, "Projects")
+        self.cache_path = cache_path or os.path.join(db.vault_path, "Utils", "scan_cache.json")
+        self._root_key = norm_path(self.root)
+
+    def run(self, repair: bool = False, full: bool = False) -> Dict[str, Any]:
+        """Scan the vault and reconcile it with the database
+
+        Args:
+            repair: Apply repairs instead of only reporting
+            full: Ignore the mtime cache
+
+        Returns:
+            dict with scan stats, missing_projects, missing_files,
+            missing_versions, untracked_projects, untracked_parts,
+            untracked_versions, writable_blobs and repaired counts
+        """
+        tree, scan_stats = DirectoryScanner(self.root, self.cache_path).scan(full=full)
+        self._tree = tree
+
+        projects = self.db.list_projects(active_only=False)
+        files = self.db.list_files(active_only=False)
+        project_paths = {p["project_id"]: norm_path(p["vault_path"]) for p in projects}
+        file_paths = {f["file_id"]: norm_path(self.db.resolve_vault_path(f["vault_path"]))
+                      for f in files}
+
+        missing_projects = [p for p in projects
+                            if p["is_active"] and not self._dir_exists(project_paths[p["project_id"]])]
+        missing_project_ids = {p["project_id"] for p in missing_projects}
+        missing_files = [f for f in files
+                         if f["is_active"] and (f["project_id"] in missing_project_ids
+                                                or not self._dir_exists(file_paths[f["file_id"]]))]
+        missing_file_ids = {f["file_id"] for f in missing_files}
+        active_files = {f["file_id"]: f for f in files
+                        if f["is_active"] and f["file_id"] not in missing_file_ids}
+
+        # Versions of live files whose stored file is gone
+        known_versions: Dict[int, Set[int]] = {}
+        missing_versions = []
+        for v in self.db.iter_version_files():
+            known_versions.setdefault(v["file_id"], set()).add(v["version_number"])
+            if v["file_id"] not in active_files:
+                continue
+            if v["file_path"]:
+                present = self._file_exists(norm_path(self.db.resolve_vault_path(v["file_path"])))
+            else:
+                folder = os.path.join(file_paths[v["file_id"]], f"v{v['version_number']:03d}")
+                present = self._dir_exists(folder)
+            if not present:
+                missing_versions.append(v)
+
+        # Disk entries the database does not know
+        tracked_projects = set(project_paths.values())
+        tracked_parts = set(file_paths.values())
+        root_entry = tree.get(self._root_key)
+        untracked_projects = sorted(
+            os.path.join(self.root, name) for name in (root_entry[1] if root_entry else [])
+            if norm_path(os.path.join(self.root, name)) not in tracked_projects
+        )
+        untracked_parts = sorted(
+            key for key, (_, _, names) in tree.items()
+            if "part_meta.json" in names and key not in tracked_parts
+        )
+        untracked_versions = []
+        for file_id, f in active_files.items():
+            entry = tree.get(file_paths[file_id])
+            if not entry:
+                continue
+            known = known_versions.get(file_id, set())
+            for name in entry[1]:
+                match = VERSION_DIR_RE.match(name)
+                if match and int(match.group(1)) not in known:
+                    untracked_versions.append({
+                        "file_id": file_id,
+                        "version_number": int(match.group(1)),
+                        "path": os.path.join(file_paths[file_id], name),
+                    })
+        untracked_versions.sort(key=lambda u: (u["file_id"], u["version_number"]))
+
+        # One stat per blob covers every version file hardlinked to it
+        writable_blobs = self.db.blob_store.unprotected(self.db.list_blob_checksums())
+
+        report = {
+            "scan": scan_stats,
+            "missing_projects": missing_projects,
+            "missing_files": missing_files,
+            "missing_versions": missing_versions,
+            "untracked_projects": untracked_projects,
+            "untracked_parts": untracked_parts,
+            "untracked_versions": untracked_versions,
+            "writable_blobs": writable_blobs,
+            "repaired": {"projects_deactivated": 0, "files_deactivated": 0,
+                         "versions_registered": 0, "blobs_protected": 0},
+        }
+
+        if repair:
+            self._repair(report, known_versions)
+
+        logger.info(f"Vault reconcile: {len(missing_projects)} missing projects, "
+                    f"{len(missing_files)} missing files, {len(missing_versions)} missing versions, "
+                    f"{len(untracked_versions)} untracked versions, "
+                    f"{len(writable_blobs)} writable blobs "
+                    f"({scan_stats['listed']} dirs listed, {scan_stats['reused']} cached)")
+        return report
+
+    def _dir_exists(self, key: str) -> bool:
+        """Directory existence from the scan (falls back to the filesystem outside it)"""
+        if self._in_root(key):
+            return key in self._tree
+        return os.path.isdir(key)
+
+    def _file_exists(self, key: str) -> bool:
+        """File existence from the scan; a chunk manifest counts as the file"""
+        if not self._in_root(key):
+            return os.path.isfile(key) or os.path.isfile(key + MANIFEST_SUFFIX)
+        entry = self._tree.get(os.path.dirname(key))
+        if not entry:
+            return False
+        names = {os.path.normcase(name) for name in entry[2]}
+        name = os.path.basename(key)
+        return name in names or name + MANIFEST_SUFFIX in names
+
+    def _in_root(self, key: str) -> bool:
+        return key == self._root_key or key.startswith(self._root_key + os.sep)
+
+    def _repair(self, report: Dict[str, Any], known_versions: Dict[int, Set[int]]):
+        """Deactivate orphaned rows, register untracked version folders and
+        make writable blobs read-only again"""
+        project_ids = [p["project_id"] for p in report["missing_projects"]]
+        file_ids = [f["file_id"] for f in report["missing_files"]]
+        if project_ids or file_ids:
+            self.db.deactivate_records(project_ids, file_ids)
+        report["repaired"]["projects_deactivated"] = len(project_ids)
+        report["repaired"]["files_deactivated"] = len(file_ids)
+
+        # Bulk ingest numbers versions after the highest stored one, so only a
+        # contiguous run of folders right after it can be registered faithfully
+        records = []
+        next_numbers: Dict[int, int] = {}
+        for untracked in report["untracked_versions"]:
+            file_id = untracked["file_id"]
+            expected = next_numbers.get(file_id, max(known_versions.get(file_id, {0})) + 1)
+            if untracked["version_number"] != expected:
+                continue
+            record = self._version_record(file_id, untracked["path"])
+            if record:
+                records.append(record)
+                next_numbers[file_id] = expected + 1
+
+        if records:
+            self.db.create_versions_bulk(records)
+        report["repaired"]["versions_registered"] = len(records)
+
+        store = self.db.blob_store
+        for digest in report["writable_blobs"]:
+            store.protect(store.blob_path(digest))
+        report["repaired"]["blobs_protected"] = len(report["writable_blobs"])
+
+    def _version_record(self, file_id: int, folder: str) -> Optional[Dict[str, Any]]:
+        """create_versions_bulk record for a vNNN folder frozen outside the database"""
+        entry = self._tree.get(norm_path(folder))
+        names = sorted(n for n in (entry[2] if entry else [])
+                       if n not in META_FILES and not n.endswith(".tmp"))
+        if not names:
+            return None
+        name = names[0]
+        if name.endswith(MANIFEST_SUFFIX):
+            name = name[:-len(MANIFEST_SUFFIX)]
+            size = 0
+        else:
+            size = os.path.getsize(os.path.join(folder, name))
+
+        meta = {}
+        try:
+            with open(os.path.join(folder, "version_meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        # version_meta.json uses ISO-8601 UTC ("2026-01-04T12:00:00Z")
+        created = meta.get("created_timestamp")
+        if created:
+            created = created.replace("T", " ").rstrip("Z")[:19]
+        return {
+            "file_id": file_id,
+            "author": meta.get("created_by") or "reconcile",
+            "change_note": meta.get("change_note", ""),
+            "file_path": os.path.join(folder, name),
+            "file_size": size,
+            "created_timestamp": created,
+        }
@@ -34,7 +34,7 @@ class PLMGUI:
             messagebox.showerror("Error", f"PLM vault not found at {vault_path_str}\n\nRun SETUP.py first to initialize.")
             sys.exit(1)
         
-        self.db = PLMDatabase(str(self.vault_root))
+        self.db = PLMDatabase(str(self.vault_root), lock_sweep_interval=60)
         self.current_user = os.getenv("USERNAME", "Unknown")
         
         # Initialize combo boxes as None (will be created in tabs)
@@ -239,15 +239,16 @@ class PLMGUI:
         if not project:
             return
         
-        files = self.db.list_project_files(project["project_id"])
+        files = self.db.list_latest_versions(project["project_id"])
+        # All part_meta.json files of the project in one cached pass
+        metadata = self.db.get_project_metadata(project["project_id"])
         valid_files = []
         for f in files:
             # Check if file exists in new structure: Parts/FileName/part_meta.json
-            file_folder = Path(f["vault_path"])
-            metadata_file = file_folder / "part_meta.json"
-            if metadata_file.exists():
+            part_meta = metadata.get(f["file_id"], {}).get("part")
+            if part_meta is not None:
                 locked = f.get("locked_by", "")
-                state = f.get("file_state", "Working")
+                state = part_meta.get("state") or f.get("file_state", "Working")
                 self.files_tree.insert("", "end", text=f["file_name"],
                     values=(f["plm_id"], f["file_type"], locked, state))
                 valid_files.append(f)
@@ -0,0 +1,183 @@
+"""Assembly BOM tests: explosion, where-used, bulk promotion (run against a temporary vault)"""
+
+
+def make_files(db, *names, versions=1):
+    """Create files with `versions` versions each; returns {name: file_id}"""
+    project = db.create_project("Assembly", "tester", "")
+    ids = {}
+    for name in names:
+        file_type = "ASSEMBLY" if name.endswith(".SLDASM") else "PART"
+        file_id = db.create_file(project["project_id"], name, file_type, project["vault_path"])["file_id"]
+        for _ in range(versions):
+            db.create_version(file_id, "tester")
+        ids[name] = file_id
+    return ids
+
+
+def multi_pin_tree(db):
+    """top pins sub at v1 and v2; sub uses bracket v1 twice"""
+    ids = make_files(db, "top.SLDASM", "sub.SLDASM", "bracket.SLDPRT", versions=2)
+    db.add_assembly_component(ids["top.SLDASM"], ids["sub.SLDASM"], 1)
+    db.add_assembly_component(ids["top.SLDASM"], ids["sub.SLDASM"], 2)
+    db.add_assembly_component(ids["sub.SLDASM"], ids["bracket.SLDPRT"], 1, quantity=2)
+    return ids
+
+
+def test_explode_bom_indented_order(db):
+    ids = make_files(db, "top.SLDASM", "sub.SLDASM", "bolt.SLDPRT", "bracket.SLDPRT")
+    db.add_assembly_component(ids["top.SLDASM"], ids["sub.SLDASM"], 1, quantity=2)
+    db.add_assembly_component(ids["top.SLDASM"], ids["bolt.SLDPRT"], 1, quantity=4)
+    db.add_assembly_component(ids["sub.SLDASM"], ids["bracket.SLDPRT"], 1, quantity=3)
+
+    bom = db.explode_bom(ids["top.SLDASM"])
+    lines = [(r["depth"], r["component_name"], r["extended_qty"]) for r in bom]
+    assert lines == [(1, "bolt.SLDPRT", 4), (1, "sub.SLDASM", 2), (2, "bracket.SLDPRT", 6)], lines
+
+
+def test_explode_bom_multi_version_pin(db):
+    ids = multi_pin_tree(db)
+    bom = db.explode_bom(ids["top.SLDASM"])
+    lines = [(r["depth"], r["component_name"], r["component_version"]) for r in bom]
+    assert lines == [
+        (1, "sub.SLDASM", 1), (2, "bracket.SLDPRT", 1),
+        (1, "sub.SLDASM", 2), (2, "bracket.SLDPRT", 1),
+    ], lines
+
+    flat = db.explode_bom(ids["top.SLDASM"], flat=True)
+    totals = {(r["component_name"], r["component_version"]): r["total_qty"] for r in flat}
+    assert totals == {("bracket.SLDPRT", 1): 4, ("sub.SLDASM", 1): 1, ("sub.SLDASM", 2): 1}, totals
+
+
+def test_explode_bom_max_depth_and_cycle(db):
+    ids = make_files(db, "a.SLDASM", "b.SLDASM", "c.SLDPRT")
+    db.add_assembly_component(ids["a.SLDASM"], ids["b.SLDASM"], 1)
+    db.add_assembly_component(ids["b.SLDASM"], ids["c.SLDPRT"], 1)
+    db.add_assembly_component(ids["b.SLDASM"], ids["a.SLDASM"], 1)
+
+    names = [r["component_name"] for r in db.explode_bom(ids["a.SLDASM"])]
+    assert names == ["b.SLDASM", "c.SLDPRT"], names
+    names = [r["component_name"] for r in db.explode_bom(ids["a.SLDASM"], max_depth=1)]
+    assert names == ["b.SLDASM"], names
+
+
+def test_where_used_multi_version_pin(db):
+    ids = multi_pin_tree(db)
+    usages = [(r["depth"], r["assembly_name"]) for r in db.where_used(ids["bracket.SLDPRT"])]
+    assert usages == [(1, "sub.SLDASM"), (2, "top.SLDASM")], usages
+
+    usages = db.where_used(ids["sub.SLDASM"])
+    assert [(r["depth"], r["component_version"]) for r in usages] == [(1, 1), (1, 2)], usages
+    assert db.where_used(ids["sub.SLDASM"], component_version=2)[0]["component_version"] == 2
+
+
+def test_where_used_multi_pin_at_first_level(db):
+    ids = make_files(db, "top.SLDASM", "sub.SLDASM", "bracket.SLDPRT", versions=2)
+    db.add_assembly_component(ids["sub.SLDASM"], ids["bracket.SLDPRT"], 1)
+    db.add_assembly_component(ids["sub.SLDASM"], ids["bracket.SLDPRT"], 2)
+    db.add_assembly_component(ids["top.SLDASM"], ids["sub.SLDASM"], 1)
+
+    usages = [(r["depth"], r["assembly_name"]) for r in db.where_used(ids["bracket.SLDPRT"])]
+    assert usages == [(1, "sub.SLDASM"), (1, "sub.SLDASM"), (2, "top.SLDASM")], usages
+    direct = db.where_used(ids["bracket.SLDPRT"], transitive=False)
+    assert [r["depth"] for r in direct] == [1, 1], direct
+
+
+def version_id(db, file_id, number):
+    return db.get_version_by_number(file_id, number)["version_id"]
+
+
+def states(db, *file_ids):
+    """{(file_id, version_number, revision_letter): lifecycle_state}"""
+    with db.get_connection() as conn:
+        rows = conn.execute(
+            f"SELECT file_id, version_number, revision_letter, lifecycle_state FROM versions "
+            f"WHERE file_id IN ({','.join('?' * len(file_ids))})", file_ids
+        ).fetchall()
+    return {(r[0], r[1], r[2]): r[3] for r in rows}
+
+
+def test_promote_assembly_uses_newest_pins(db):
+    ids = multi_pin_tree(db)
+    top, sub, bracket = ids["top.SLDASM"], ids["sub.SLDASM"], ids["bracket.SLDPRT"]
+    db.promote_version(version_id(db, sub, 1), "Obsolete", "tester")
+
+    report = db.promote_assembly(top, "Released", "tester", recursive=True)
+    promoted = sorted((v["file_name"], v["version_number"]) for v in report["promoted"])
+    assert promoted == [("bracket.SLDPRT", 1), ("sub.SLDASM", 2), ("top.SLDASM", 2)], promoted
+    assert states(db, top, sub, bracket) == {
+        (top, 1, ""): "In-Work", (top, 2, ""): "Released",
+        (sub, 1, ""): "Obsolete", (sub, 2, ""): "Released",
+        (bracket, 1, ""): "Released", (bracket, 2, ""): "In-Work",
+    }
+    assert db.get_file(sub)["lifecycle_state"] == "Released"
+    assert db.get_file(bracket)["lifecycle_state"] == "In-Work"  # v2 is the latest
+
+
+def test_promote_assembly_resolves_revision_rows_once(db):
+    ids = make_files(db, "top.SLDASM", "bracket.SLDPRT")
+    top, bracket = ids["top.SLDASM"], ids["bracket.SLDPRT"]
+    db.add_assembly_component(top, bracket, 1)
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO versions (file_id, version_number, revision_letter, author, file_path) "
+                     "VALUES (?, 1, 'A', 'tester', '')", (bracket,))
+        conn.commit()
+
+    report = db.promote_assembly(top, "Released", "tester")
+    assert report["transitions"] == 2, report
+    assert states(db, bracket) == {(bracket, 1, ""): "In-Work", (bracket, 1, "A"): "Released"}
+
+
+def test_promote_assembly_is_all_or_nothing(db):
+    ids = multi_pin_tree(db)
+    top, sub, bracket = ids["top.SLDASM"], ids["sub.SLDASM"], ids["bracket.SLDPRT"]
+    db.promote_version(version_id(db, bracket, 1), "Obsolete", "tester")
+    before = states(db, top, sub, bracket)
+    try:
+        db.promote_assembly(top, "Released", "tester", recursive=True)
+        raise AssertionError("promoted a tree with an obsolete component")
+    except Exception as e:
+        assert "bracket.SLDPRT v001: Obsolete → Released not allowed" in str(e), e
+    assert states(db, top, sub, bracket) == before
+
+    # Direct components only, and an explicit assembly version
+    report = db.promote_assembly(top, "Released", "tester", version_number=1, recursive=False)
+    promoted = sorted((v["file_name"], v["version_number"]) for v in report["promoted"])
+    assert promoted == [("sub.SLDASM", 2), ("top.SLDASM", 1)], promoted
+
+
+
+def test_single_version_promotion_follows_the_same_rules(db):
+    ids = make_files(db, "top.SLDASM", "bracket.SLDPRT")
+    top, bracket = ids["top.SLDASM"], ids["bracket.SLDPRT"]
+    db.add_assembly_component(top, bracket, 1)
+    v1 = version_id(db, bracket, 1)
+
+    assert db.promote_version(v1, "Released", "tester") is True
+    assert db.promote_version(v1, "Released", "tester") is False
+    for state in ("In-Work", "Frozen"):
+        try:
+            db.promote_version(v1, state, "tester")
+            raise AssertionError(f"Released → {state} accepted")
+        except ValueError:
+            assert state == "Frozen"
+        except Exception as e:
+            assert "bracket.SLDPRT v001: Released → In-Work not allowed" in str(e), e
+    try:
+        db.promote_version(v1 + 100, "Released", "tester")
+        raise AssertionError("missing version promoted")
+    except Exception as e:
+        assert f"Version {v1 + 100} not found" in str(e), e
+
+    with db.get_connection() as conn:
+        transitions = conn.execute("SELECT from_state, to_state FROM version_transitions "
+                                   "WHERE version_id = ?", (v1,)).fetchall()
+    assert [tuple(t) for t in transitions] == [("In-Work", "Released")]
+    assert db.get_file(bracket)["lifecycle_state"] == "Released"
+
+    # The assembly path refuses the same move
+    db.promote_version(v1, "Obsolete", "tester")
+    try:
+        db.promote_assembly(top, "Released", "tester")
+        raise AssertionError("assembly promotion accepted Obsolete → Released")
+    except Exception as e:
+        assert "Obsolete → Released not allowed" in str(e), e
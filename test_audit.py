@@ -0,0 +1,158 @@
+"""Audit log tests: write-behind queue, monthly archive (run against a temporary vault)"""
+
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+from database.audit import AuditWriter
+
+
+def insert_audit(db, *timestamps):
+    """Backdated access_log rows, one per timestamp"""
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO access_log (user, action, action_timestamp) VALUES ('tester', 'OPEN', ?)",
+            [(ts,) for ts in timestamps]
+        )
+        conn.commit()
+
+
+class Sink:
+    """write_batch stand-in that records rows, optionally slowly"""
+
+    def __init__(self, delay: float = 0.0):
+        self.rows = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.rows.extend(batch)
+
+
+def test_async_log_action_flushes_on_close(open_vault):
+    db = open_vault(audit_mode="async")
+    for i in range(250):
+        assert db.log_action("tester", "OPEN", details={"i": i}) is None
+    db.close()
+
+    db = open_vault()
+    assert len(db.get_audit_trail(user="tester", limit=1000)) == 250
+
+
+def test_flush_writes_everything_queued():
+    sink = Sink()
+    writer = AuditWriter(sink, batch_size=7, flush_interval=0.05)
+    for i in range(100):
+        writer.submit((i,))
+    writer.flush()
+    assert sorted(sink.rows) == [(i,) for i in range(100)]
+    stats = writer.get_stats()
+    assert stats["written"] == 100 and stats["pending"] == 0, stats
+    writer.close()
+
+
+def test_full_queue_falls_back_to_sync_write():
+    sink = Sink(delay=0.05)
+    writer = AuditWriter(sink, max_queue=2, batch_size=1, put_timeout=0.01)
+    for i in range(20):
+        writer.submit((i,))
+    writer.close()
+    assert sorted(sink.rows) == [(i,) for i in range(20)]
+    assert writer.get_stats()["sync_fallbacks"] > 0
+
+
+def test_submit_racing_close_loses_nothing():
+    for _ in range(20):
+        sink = Sink()
+        writer = AuditWriter(sink, flush_interval=0.01)
+        start = threading.Event()
+
+        def submitter(base):
+            start.wait()
+            for i in range(200):
+                writer.submit((base + i,))
+
+        threads = [threading.Thread(target=submitter, args=(n * 1000,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        start.set()
+        writer.close()
+        for t in threads:
+            t.join()
+        assert len(sink.rows) == 800, len(sink.rows)
+
+
+def test_close_waits_for_submit_in_progress():
+    class SlowQueue(queue.Queue):
+        """Widens the window between submit()'s closed check and its put"""
+        def put(self, item, block=True, timeout=None):
+            if isinstance(item, tuple):
+                time.sleep(0.1)
+            super().put(item, block, timeout)
+
+    sink = Sink()
+    writer = AuditWriter(sink, flush_interval=0.01)
+    writer._queue = SlowQueue()
+    time.sleep(0.05)
+    submitter = threading.Thread(target=writer.submit, args=(("in-flight",),))
+    submitter.start()
+    time.sleep(0.02)
+    writer.close()
+    submitter.join()
+    assert sink.rows == [("in-flight",)], sink.rows
+
+
+def test_submit_after_close_writes_synchronously():
+    sink = Sink()
+    writer = AuditWriter(sink)
+    writer.close()
+    writer.submit(("late",))
+    assert sink.rows == [("late",)]
+
+
+def test_archive_moves_cold_months_and_reads_union(db):
+    insert_audit(db, "2020-01-10 09:00:00", "2020-01-20 09:00:00", "2020-02-03 09:00:00")
+    db.log_action("tester", "SAVE")
+
+    result = db.archive_audit_log(hot_months=3)
+    assert result["partitions_archived"] == 2 and result["rows_archived"] == 3, result
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM access_log").fetchone()[0] == 1
+
+    trail = db.get_audit_trail(user="tester", limit=10)
+    assert [t["action"] for t in trail] == ["SAVE", "OPEN", "OPEN", "OPEN"], trail
+    window = db.get_audit_trail(since="2020-01-15", until="2020-02-01")
+    assert [t["action_timestamp"] for t in window] == ["2020-01-20 09:00:00"], window
+
+    assert db.archive_audit_log(hot_months=3)["rows_archived"] == 0
+    result = db.archive_audit_log(hot_months=3, purge_months=12)
+    assert result["partitions_purged"] == 2, result
+    assert db.list_audit_partitions() == []
+
+
+def test_failed_attach_leaves_connection_usable(open_vault):
+    db = open_vault(pool_size=1)
+    insert_audit(db, "2020-01-10 09:00:00")
+    partition = db._audit_archive.partition_path("2020-01")
+    os.makedirs(os.path.dirname(partition), exist_ok=True)
+    # Attaches fine, but the partition schema script then fails
+    broken = sqlite3.connect(partition)
+    broken.execute("CREATE TABLE idx_log_user (x)")
+    broken.close()
+
+    try:
+        db.archive_audit_log(hot_months=1)
+        raise AssertionError("archiving into a broken partition succeeded")
+    except sqlite3.Error as e:
+        assert "idx_log_user" in str(e), e
+    with db.get_connection() as conn:
+        assert [row[1] for row in conn.execute("PRAGMA database_list")] == ["main"]
+
+    os.remove(partition)
+    assert db.archive_audit_log(hot_months=1)["rows_archived"] == 1
+
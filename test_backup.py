@@ -0,0 +1,63 @@
+"""Database backup tests (run against a temporary vault)"""
+
+import os
+import gzip
+import shutil
+import sqlite3
+from datetime import datetime
+
+from database import backup as backup_module
+
+
+class FrozenClock(datetime):
+    """datetime whose now() never advances"""
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 4, 12, 0, 0, 123456)
+
+
+def project_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backups_in_the_same_instant_get_distinct_names(db):
+    db.create_project("Backup", "tester", "")
+    backup_module.datetime = FrozenClock
+    try:
+        first = db.backup_database(apply_retention=False)
+        second = db.backup_database(apply_retention=False)
+        third = db.backup_database(compress=True, apply_retention=False)
+    finally:
+        backup_module.datetime = datetime
+
+    paths = [first["path"], second["path"], third["path"]]
+    assert len(set(os.path.basename(p).split(".")[0] for p in paths)) == 3, paths
+    assert os.path.basename(first["path"]) == "db_20260104_120000_123456.sqlite"
+    assert project_count(first["path"]) == project_count(second["path"]) == 1
+    with gzip.open(third["path"], "rb") as f:
+        assert f.read(16) == b"SQLite format 3\x00"
+
+    listed = db.list_backups()
+    assert sorted(b["path"] for b in listed) == sorted(paths), listed
+    assert not [n for n in os.listdir(os.path.dirname(first["path"])) if n.endswith(".tmp")]
+
+
+def test_list_backups_orders_and_expires_by_name(db):
+    db.backup_database(apply_retention=False)
+    backup_dir = os.path.join(db.vault_path, "db_backup")
+    shutil.copy(db.list_backups()[0]["path"], os.path.join(backup_dir, "db_20200101_090000_000000.sqlite"))
+    open(os.path.join(backup_dir, "notes.txt"), "w").close()
+
+    backups = db.list_backups()
+    assert len(backups) == 2, backups
+    assert backups[-1]["created"] == datetime(2020, 1, 1, 9, 0, 0)
+    assert backups[0]["created"].year == datetime.now().year
+
+    engine = backup_module.BackupEngine(db.db_path, backup_dir)
+    assert engine.enforce_retention(30) == [backups[-1]["path"]]
+    assert not engine.is_due("daily")
+
@@ -0,0 +1,103 @@
+"""Change feed tests: change_log triggers, paging, retention (run against a temporary vault)"""
+
+
+def make_part(db):
+    """Project, file and one version; returns (project_id, file_id, version_id)"""
+    project = db.create_project("Feed", "tester", "")
+    file_id = db.create_file(project["project_id"], "bracket.SLDPRT", "PART",
+                             project["vault_path"])["file_id"]
+    version_id = db.create_version(file_id, "tester")["version_id"]
+    return project["project_id"], file_id, version_id
+
+
+def entries(changes):
+    return [(c["table_name"], c["row_id"], c["operation"]) for c in changes]
+
+
+def test_changes_are_recorded_in_commit_order(db):
+    start = db.get_change_seq()
+    project_id, file_id, version_id = make_part(db)
+    changes = db.changes_since(start)
+    seqs = [c["seq"] for c in changes]
+    assert seqs == sorted(seqs) and seqs[-1] == db.get_change_seq()
+    assert ("projects", project_id, "INSERT") in entries(changes)
+    assert entries(changes).index(("files", file_id, "INSERT")) \
+        < entries(changes).index(("versions", version_id, "INSERT"))
+
+    mark = db.get_change_seq()
+    db.acquire_lock(file_id, "alice")
+    assert ("file_locks", 1, "INSERT") in entries(db.changes_since(mark))
+    assert set(c["table_name"] for c in db.changes_since(mark)) == {"files", "file_locks"}
+
+
+def test_paging_and_table_filter(db):
+    _, file_id, _ = make_part(db)
+    for _ in range(4):
+        db.create_version(file_id, "tester")
+
+    versions = db.changes_since(0, tables=["versions"])
+    assert [c["operation"] for c in versions] == ["INSERT"] * 5, entries(versions)
+
+    pages, seq = [], 0
+    while True:
+        page = db.changes_since(seq, limit=3)
+        if not page:
+            break
+        pages.append(page)
+        seq = page[-1]["seq"]
+    assert all(len(p) <= 3 for p in pages)
+    assert [c for p in pages for c in p] == db.changes_since(0, limit=1000)
+
+    try:
+        db.changes_since(0, tables=["access_log"])
+        raise AssertionError("untracked table accepted")
+    except ValueError as e:
+        assert "access_log" in str(e)
+
+
+def test_prune_by_seq_and_age(db):
+    _, file_id, _ = make_part(db)
+    for _ in range(3):
+        db.create_version(file_id, "tester")
+    latest = db.get_change_seq()
+    assert latest == 10
+    assert db.prune_change_log(before_seq=3) == 2
+    assert db.get_first_change_seq() == 3
+
+    with db.get_connection() as conn:
+        conn.execute("UPDATE change_log SET changed_at = datetime('now', '-40 days') WHERE seq < 6")
+        conn.commit()
+    assert db.prune_change_log(older_than_days=30) == 3
+    assert db.get_first_change_seq() == 6
+    assert db.prune_change_log(before_seq=1, older_than_days=30) == 0
+
+    # Sequence numbers are never reused after the log is emptied
+    assert db.prune_change_log(before_seq=latest + 1) == 5
+    assert db.get_first_change_seq() == 0 and db.get_change_seq() == latest
+    db.create_project("Later", "tester", "")
+    assert db.changes_since(latest)[0]["seq"] == latest + 1
+
+    try:
+        db.prune_change_log()
+        raise AssertionError("prune without a bound accepted")
+    except ValueError:
+        pass
+
+
+def test_old_vault_starts_logging_on_open(open_vault):
+    db = open_vault()
+    _, file_id, _ = make_part(db)
+    with db.get_connection() as conn:
+        names = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_change_log_%'")]
+        for name in names:
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("DROP TABLE change_log")
+        conn.commit()
+    db.close()
+
+    db = open_vault()
+    assert db.get_change_seq() == 0 and db.changes_since(0) == []
+    db.create_version(file_id, "tester")
+    assert entries(db.changes_since(0)) == [("versions", 2, "INSERT"), ("files", file_id, "UPDATE")]
+
@@ -0,0 +1,76 @@
+"""Checksum backfill tests: resume, missing files, process pool (run against a temporary vault)"""
+
+import os
+import hashlib
+
+from database.checksums import ChecksumBackfill, sha256_file
+
+
+def make_versions(db, count, missing=()):
+    """Versions of one part with files on disk (except numbers in missing); returns {version_id: digest}"""
+    project = db.create_project("Checksums", "tester", "")
+    file_id = db.create_file(project["project_id"], "bracket.SLDPRT", "PART", project["vault_path"])["file_id"]
+    digests = {}
+    for number in range(1, count + 1):
+        path = os.path.join(project["vault_path"], f"v{number:03d}", "bracket.SLDPRT")
+        version_id = db.create_version(file_id, "tester", file_path=os.path.relpath(path, db.vault_path))["version_id"]
+        if number in missing:
+            digests[version_id] = None
+            continue
+        data = os.urandom(1000 * number)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(data)
+        digests[version_id] = hashlib.sha256(data).hexdigest()
+    return digests
+
+
+def stored(db):
+    with db.get_connection() as conn:
+        return {row[0]: row[1] for row in conn.execute("SELECT version_id, checksum FROM versions")}
+
+
+def test_sha256_file_streams_in_chunks(vault):
+    path = os.path.join(vault, "data.bin")
+    data = os.urandom(10_000)
+    with open(path, "wb") as f:
+        f.write(data)
+    assert sha256_file(path, chunk_size=333) == (hashlib.sha256(data).hexdigest(), 10_000)
+
+
+def test_limited_run_resumes_where_it_stopped(db):
+    digests = make_versions(db, 7)
+    first = ChecksumBackfill(db, workers=1, batch_size=2).run(limit=3)
+    assert first["hashed"] == 3 and first["missing"] == 0, first
+    assert sum(1 for digest in stored(db).values() if digest) == 3
+
+    batches = []
+    rest = ChecksumBackfill(db, workers=1, batch_size=2).run(progress=batches.append)
+    assert rest["hashed"] == 4 and len(batches) == 2, rest
+    assert stored(db) == digests
+    assert ChecksumBackfill(db, workers=1).run()["hashed"] == 0
+
+
+def test_missing_files_are_counted_and_left_empty(db):
+    digests = make_versions(db, 5, missing={2, 4})
+    stats = ChecksumBackfill(db, workers=1, batch_size=2).run()
+    assert stats["hashed"] == 3 and stats["missing"] == 2, stats
+    assert stats["bytes"] == 1000 + 3000 + 5000, stats
+    assert stored(db) == digests
+
+    # Still missing next time; nothing already hashed is read again
+    again = ChecksumBackfill(db, workers=1).run()
+    assert again["hashed"] == 0 and again["missing"] == 2, again
+
+
+def test_process_pool_matches_in_process(db):
+    digests = make_versions(db, 9, missing={5})
+    pooled = ChecksumBackfill(db, workers=2, batch_size=3).run()
+    assert pooled["hashed"] == 8 and pooled["missing"] == 1, pooled
+    from_pool = stored(db)
+
+    with db.get_connection() as conn:
+        conn.execute("UPDATE versions SET checksum = NULL")
+        conn.commit()
+    ChecksumBackfill(db, workers=1, batch_size=3).run()
+    assert stored(db) == from_pool == digests
@@ -0,0 +1,109 @@
+"""Concurrent-writer tests: network vault detection, SQLITE_BUSY retries (run against a temporary vault)"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from database import concurrency
+from database.concurrency import BusyRetryPolicy, DRIVE_REMOTE, is_network_path
+
+FIXED_DRIVE = 3
+
+
+def busy():
+    return sqlite3.OperationalError("database is locked")
+
+
+class Flaky:
+    """Raises busy() on the first `failures` calls, then returns "done" """
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise busy()
+        return "done"
+
+
+def test_network_paths(monkeypatch):
+    queried = []
+
+    def drive_type(root):
+        queried.append(root)
+        return DRIVE_REMOTE if root == "Z:\\" else FIXED_DRIVE
+
+    monkeypatch.setattr(concurrency, "_drive_type", drive_type)
+    assert is_network_path("\\\\server\\plm\\db.sqlite")
+    assert is_network_path("//server/plm/db.sqlite")
+    assert is_network_path("Z:\\PLM_VAULT\\db.sqlite")
+    assert not is_network_path("C:\\PLM_VAULT\\db.sqlite")
+    assert not is_network_path("/srv/plm/db.sqlite")
+    assert queried == ["Z:\\", "C:\\"], queried
+
+
+def test_network_vault_keeps_rollback_journal(monkeypatch, open_vault):
+    monkeypatch.setattr(concurrency, "is_network_path", lambda path: True)
+    db = open_vault(concurrent=True)
+    assert db.get_concurrency_stats()["journal_mode"] == "delete"
+
+
+def test_busy_call_is_retried():
+    policy = BusyRetryPolicy(max_retries=3, base_delay=0)
+    func = Flaky(2)
+    assert policy.call(func) == "done" and func.calls == 3
+    assert policy.get_stats() == {"operations": 1, "retried_operations": 1, "retries": 2, "failures": 0}
+
+    func = Flaky(10)
+    with pytest.raises(sqlite3.OperationalError):
+        policy.call(func)
+    assert func.calls == 4
+    assert policy.get_stats() == {"operations": 2, "retried_operations": 2, "retries": 5, "failures": 1}
+
+
+def test_other_errors_are_not_retried():
+    policy = BusyRetryPolicy(base_delay=0)
+
+    def broken():
+        raise sqlite3.OperationalError("no such table: files")
+
+    with pytest.raises(sqlite3.OperationalError):
+        policy.call(broken)
+    assert policy.get_stats()["retries"] == 0 and policy.get_stats()["failures"] == 0
+
+
+def test_nested_call_reruns_outermost_operation():
+    policy = BusyRetryPolicy(max_retries=3, base_delay=0)
+    inner = Flaky(1)
+    outer_calls = []
+
+    def outer():
+        outer_calls.append(1)
+        return policy.call(inner)
+
+    assert policy.call(outer) == "done"
+    # The inner failure is not retried in place; the outer operation runs again
+    assert len(outer_calls) == 2 and inner.calls == 2
+    assert policy.get_stats()["retries"] == 1 and policy.get_stats()["operations"] == 1
+
+
+def test_write_waits_out_a_held_lock(open_vault):
+    db = open_vault(concurrent=True, busy_timeout_ms=1, max_retries=50)
+    db._retry.base_delay, db._retry.max_delay = 0.01, 0.05
+    holder = sqlite3.connect(db.db_path, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.2, holder.commit)
+    release.start()
+    try:
+        project = db.create_project("Contended", "tester", "")
+    finally:
+        release.join()
+        holder.close()
+
+    stats = db.get_concurrency_stats()
+    assert stats["journal_mode"] == "wal" and stats["busy_timeout_ms"] == 1, stats
+    assert stats["retried_operations"] == 1 and stats["retries"] >= 1 and stats["failures"] == 0, stats
+    assert db.get_project(project["project_id"])["name"] == "Contended"
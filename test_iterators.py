@@ -0,0 +1,80 @@
+"""Streaming iterator tests: keyset pages match the list APIs (run against a temporary vault)"""
+
+import itertools
+
+
+def make_project(db, files=7):
+    project = db.create_project("Paging", "tester", "")
+    ids = [db.create_file(project["project_id"], f"part{n:02d}.SLDPRT", "PART", project["vault_path"])["file_id"]
+           for n in range(files)]
+    return project["project_id"], ids
+
+
+def test_iter_project_files_matches_list(db):
+    project_id, ids = make_project(db)
+    db.deactivate_records([], [ids[3]])
+    listed = [f["file_id"] for f in db.list_project_files(project_id)]
+    assert len(listed) == 6
+
+    for page_size in (1, 2, 3, 6, 7, 100):
+        streamed = [f["file_id"] for f in db.iter_project_files(project_id, page_size=page_size)]
+        assert streamed == listed, page_size
+    everything = [f["file_id"] for f in db.iter_project_files(project_id, page_size=2, active_only=False)]
+    assert everything == ids
+
+
+def test_iter_file_versions_pages_through_revision_rows(db):
+    _, (file_id,) = make_project(db, files=1)
+    for _ in range(3):
+        db.create_version(file_id, "tester")
+    with db.get_connection() as conn:
+        # Revision rows share version_number 2, so page boundaries fall inside it
+        conn.executemany(
+            "INSERT INTO versions (file_id, version_number, revision_letter, author, file_path) "
+            "VALUES (?, 2, ?, 'tester', '')",
+            [(file_id, letter) for letter in ("A", "B", "C")]
+        )
+        conn.commit()
+
+    listed = [(v["version_number"], v["revision_letter"]) for v in db.list_file_versions(file_id)]
+    expected = sorted(listed, reverse=True)
+    assert expected[:5] == [(3, ""), (2, "C"), (2, "B"), (2, "A"), (2, "")]
+    for page_size in (1, 2, 3, 5, 6, 50):
+        streamed = [(v["version_number"], v["revision_letter"])
+                    for v in db.iter_file_versions(file_id, page_size=page_size)]
+        assert streamed == expected, page_size
+
+
+def insert_audit(db, rows):
+    """(user, action_timestamp) pairs as access_log rows"""
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO access_log (user, action, action_timestamp) VALUES (?, 'OPEN', ?)", rows
+        )
+        conn.commit()
+
+
+def audit_keys(entries):
+    return [(e["log_id"], e["user"], e["action_timestamp"]) for e in entries]
+
+
+def test_iter_audit_trail_spans_hot_table_and_partitions(db):
+    # Several rows share each timestamp, in the hot table and in two archived months
+    insert_audit(db, [(user, ts) for ts in ("2020-01-10 09:00:00", "2020-02-03 09:00:00")
+                      for user in ("alice", "bob", "alice", "bob", "alice")])
+    insert_audit(db, [(user, "2099-01-01 00:00:00") for user in ("alice", "bob", "alice", "bob")])
+    with db.get_connection() as conn:
+        expected = audit_keys(conn.execute(
+            "SELECT * FROM access_log ORDER BY action_timestamp DESC, log_id DESC").fetchall())
+    assert len(expected) == 14
+
+    assert db.archive_audit_log(hot_months=3)["partitions_archived"] == 2
+    for page_size in (1, 2, 3, 4, 5, 500):
+        assert audit_keys(db.iter_audit_trail(page_size=page_size)) == expected, page_size
+
+    alice = [key for key in expected if key[1] == "alice"]
+    assert audit_keys(db.iter_audit_trail(user="alice", page_size=2)) == alice
+    january = [key for key in expected if key[2].startswith("2020-01")]
+    assert audit_keys(db.iter_audit_trail(since="2020-01-01", until="2020-02-01", page_size=2)) == january
+    assert audit_keys(db.get_audit_trail(limit=7)) == expected[:7]
+    assert audit_keys(itertools.islice(db.iter_audit_trail(page_size=3), 4)) == expected[:4]
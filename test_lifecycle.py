@@ -0,0 +1,83 @@
+"""Lifecycle history tests: as_of() reconstruction, checkpoints (run against a temporary vault)"""
+
+from datetime import datetime, timedelta, timezone
+
+
+def backdate(db, table, key, row_id, column, timestamp):
+    with db.get_connection() as conn:
+        conn.execute(f"UPDATE {table} SET {column} = ? WHERE {key} = ?", (timestamp, row_id))
+        conn.commit()
+
+
+def history(db):
+    """bracket v1 created 2026-01-01 08:00 UTC, Released 01-02 10:00,
+    checkpoint 01-03 00:00, Obsolete 01-04 10:00; bracket v2 created 01-06"""
+    project = db.create_project("History", "tester", "")
+    file_id = db.create_file(project["project_id"], "bracket.SLDPRT", "PART",
+                             project["vault_path"])["file_id"]
+    db.create_versions_bulk([
+        {"file_id": file_id, "author": "tester", "created_timestamp": "2026-01-01T09:00:00+01:00"},
+        {"file_id": file_id, "author": "tester", "created_timestamp": datetime(2026, 1, 6, 12, 0)},
+    ])
+    v1 = db.get_version_by_number(file_id, 1)["version_id"]
+
+    db.promote_version(v1, "Released", "tester")
+    backdate(db, "version_transitions", "version_id", v1, "promotion_timestamp", "2026-01-02 10:00:00")
+    checkpoint, = db.create_lifecycle_checkpoint(project["project_id"])
+    backdate(db, "lifecycle_checkpoints", "checkpoint_id", checkpoint["checkpoint_id"], "taken_at",
+             "2026-01-03 00:00:00")
+    db.promote_version(v1, "Obsolete", "tester")
+    with db.get_connection() as conn:
+        conn.execute("UPDATE version_transitions SET promotion_timestamp = '2026-01-04 10:00:00' "
+                     "WHERE version_id = ? AND to_state = 'Obsolete'", (v1,))
+        conn.commit()
+    return project["project_id"], file_id
+
+
+def states(rows):
+    return [(r["version_number"], r["lifecycle_state"]) for r in rows]
+
+
+def test_bulk_ingest_stores_utc(db):
+    _, file_id = history(db)
+    assert db.get_version_by_number(file_id, 1)["created_timestamp"] == "2026-01-01 08:00:00"
+    assert db.get_version_by_number(file_id, 2)["created_timestamp"] == "2026-01-06 12:00:00"
+
+
+def test_as_of_replays_transitions_and_checkpoints(db):
+    project_id, _ = history(db)
+    assert states(db.as_of(project_id, "2026-01-01 07:59:59")) == []
+    assert states(db.as_of(project_id, "2026-01-01 08:30")) == [(1, "In-Work")]
+    assert states(db.as_of(project_id, "2026-01-02")) == [(1, "Released")]
+    assert states(db.as_of(project_id, "2026-01-03 12:00:00")) == [(1, "Released")]
+    assert states(db.as_of(project_id, "2026-01-05")) == [(1, "Obsolete")]
+    assert states(db.as_of(project_id, "2026-01-07")) == [(1, "Obsolete"), (2, "In-Work")]
+
+    assert states(db.as_of(project_id, "2026-01-03", state="Released")) == [(1, "Released")]
+    assert db.as_of(project_id, "2026-01-07", state="Released") == []
+    try:
+        db.as_of(project_id, "2026-01-07", state="Frozen")
+        raise AssertionError("unknown state accepted")
+    except ValueError:
+        pass
+
+
+def test_as_of_converts_aware_times_to_utc(db):
+    project_id, _ = history(db)
+    plus_two = timezone(timedelta(hours=2))
+    # 11:00 at +02:00 is 09:00 UTC, an hour before the release
+    assert states(db.as_of(project_id, datetime(2026, 1, 2, 11, 0, tzinfo=plus_two))) == [(1, "In-Work")]
+    assert states(db.as_of(project_id, "2026-01-02T13:00:00+02:00")) == [(1, "Released")]
+    assert states(db.as_of(project_id, "2026-01-02T09:30:00Z")) == [(1, "In-Work")]
+    assert states(db.as_of(project_id, datetime(2026, 1, 2, 10, 0))) == [(1, "Released")]
+
+
+def test_checkpoint_min_transitions(db):
+    project_id, _ = history(db)
+    assert db.create_lifecycle_checkpoint(project_id, min_transitions=2) == []
+    created = db.create_lifecycle_checkpoint(project_id, min_transitions=1)
+    assert [c["new_transitions"] for c in created] == [1] and created[0]["version_count"] == 2
+    assert len(db.list_lifecycle_checkpoints(project_id)) == 2
+    # The newest checkpoint was taken now, so it does not apply to January
+    assert states(db.as_of(project_id, "2026-01-03 12:00:00")) == [(1, "Released")]
+
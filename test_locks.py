@@ -0,0 +1,365 @@
+"""File lock tests: compare-and-set claims, leases, batch locks, lock daemon (run against a temporary vault)"""
+
+import os
+import json
+import stat
+import time
+import threading
+import socketserver
+from contextlib import contextmanager
+
+from database.db import PLMDatabase, LockConflictError
+from database.lockd import LockDaemon, LockdClient, LockdUnavailable, lockd_address, runtime_dir
+
+
+def make_files(db, count):
+    """Part records to lock; returns their file_ids"""
+    project = db.create_project("Locks", "tester", "")
+    return [db.create_file(project["project_id"], f"part{i}.SLDPRT", "PART",
+                           project["vault_path"])["file_id"] for i in range(count)]
+
+
+def open_locks(db, file_id):
+    """(locked_by, released) of every file_locks row for a file"""
+    with db.get_connection() as conn:
+        return [(row[0], row[1] is not None) for row in conn.execute(
+            "SELECT locked_by, lock_release_timestamp FROM file_locks WHERE file_id = ? ORDER BY lock_id",
+            (file_id,)
+        )]
+
+
+def test_lock_conflict_and_release(db):
+    file_id, = make_files(db, 1)
+    db.acquire_lock(file_id, "alice")
+    try:
+        db.acquire_lock(file_id, "bob")
+        raise AssertionError("bob took alice's lock")
+    except LockConflictError as e:
+        assert e.file_id == file_id and e.locked_by == "alice"
+
+    db.release_lock(file_id, "bob")  # not bob's lock: no effect
+    assert db.get_file(file_id)["locked_by"] == "alice"
+    db.release_lock(file_id, "alice")
+    assert db.get_file(file_id)["locked_by"] is None
+    db.acquire_lock(file_id, "bob")
+    assert open_locks(db, file_id) == [("alice", True), ("bob", False)]
+
+
+def test_same_user_may_lock_again(db):
+    file_id, = make_files(db, 1)
+    first = db.acquire_lock(file_id, "alice")
+    second = db.acquire_lock(file_id, "alice")
+    assert first != second
+    db.release_lock(file_id, "alice")
+    assert open_locks(db, file_id) == [("alice", True), ("alice", True)]
+
+
+def test_lock_missing_file(db):
+    try:
+        db.acquire_lock(999, "alice")
+        raise AssertionError("locked a file that does not exist")
+    except LockConflictError:
+        raise AssertionError("missing file reported as a conflict")
+    except Exception as e:
+        assert "not found" in str(e), e
+
+
+def test_racing_users_get_exactly_one_lock(open_vault):
+    db = open_vault(concurrent=True)
+    file_ids = make_files(db, 5)
+    users = [f"user{i}" for i in range(8)]
+    winners = {file_id: [] for file_id in file_ids}
+    start = threading.Barrier(len(users))
+
+    def worker(user):
+        start.wait()
+        for file_id in file_ids:
+            try:
+                db.acquire_lock(file_id, user)
+                winners[file_id].append(user)
+            except LockConflictError:
+                pass
+
+    threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for file_id, won in winners.items():
+        assert len(won) == 1, (file_id, won)
+        assert db.get_file(file_id)["locked_by"] == won[0]
+        assert open_locks(db, file_id) == [(won[0], False)]
+
+
+def test_lapsed_lease_can_be_taken_over(db):
+    file_id, = make_files(db, 1)
+    db.acquire_lock(file_id, "alice", lease_seconds=0)
+    assert db.get_active_locks() == []
+
+    bob = db.acquire_lock(file_id, "bob")
+    assert open_locks(db, file_id) == [("alice", True), ("bob", False)]
+    assert [lock["session_id"] for lock in db.get_active_locks()] == [bob]
+    # alice's late release must not drop bob's lock
+    db.release_lock(file_id, "alice")
+    assert db.get_file(file_id)["locked_by"] == "bob"
+
+
+def test_renew_extends_only_live_leases(db):
+    file_a, file_b = make_files(db, 2)
+    session = db.acquire_lock(file_a, "alice", lease_seconds=60)
+    before = db.get_active_locks()[0]["expires_in_s"]
+    expires_at = db.renew_lock(session, lease_seconds=3600)
+    lock = db.get_active_locks()[0]
+    assert lock["expires_at"] == expires_at and lock["expires_in_s"] > before + 3000, lock
+
+    lapsed = db.acquire_lock(file_b, "alice", lease_seconds=0)
+    db.release_lock(file_a, "alice")
+    for dead in (session, lapsed, "no-such-session"):
+        try:
+            db.renew_lock(dead)
+            raise AssertionError(f"renewed {dead}")
+        except Exception as e:
+            assert "no longer active" in str(e), e
+
+
+def test_expire_locks_releases_only_lapsed_leases(db):
+    lapsed = make_files(db, 7)
+    live = lapsed.pop()
+    for file_id in lapsed:
+        db.acquire_lock(file_id, "alice", lease_seconds=0)
+    db.acquire_lock(live, "bob")
+
+    assert db.expire_locks(batch_size=4) == 6
+    assert db.expire_locks() == 0
+    assert all(db.get_file(f)["locked_by"] is None for f in lapsed)
+    assert db.get_file(live)["locked_by"] == "bob"
+    with db.get_connection() as conn:
+        stale = conn.execute("SELECT COUNT(*) FROM file_locks WHERE is_stale = 1").fetchone()[0]
+    assert stale == 6
+
+    # Forced expiry of old locks, even with a live lease
+    assert db.clean_stale_locks(max_age_hours=0) == 1
+    assert db.get_file(live)["locked_by"] is None
+
+
+def test_background_sweeper_expires_leases(open_vault):
+    db = open_vault(lock_sweep_interval=0.05)
+    file_id, = make_files(db, 1)
+    db.acquire_lock(file_id, "alice", lease_seconds=0)
+    deadline = time.monotonic() + 5
+    while db.get_file(file_id)["locked_by"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert db.get_file(file_id)["locked_by"] is None
+    stats = db.get_lock_sweeper_stats()
+    assert stats["expired"] == 1 and stats["errors"] == 0, stats
+
+
+@contextmanager
+def lock_daemon(db, transport="unix"):
+    """Daemon for db's vault plus a client database that goes through it"""
+    daemon = LockDaemon(db, transport=transport, refresh_interval=3600)
+    daemon.start()
+    client = PLMDatabase(db.vault_path)
+    try:
+        yield daemon, client
+    finally:
+        client.close()
+        daemon.shutdown()
+
+
+def daemon_round_trip(db, transport):
+    with lock_daemon(db, transport) as (daemon, client):
+        file_a, file_b = make_files(db, 2)
+        session = client.acquire_lock(file_a, "alice")
+        assert db.get_lock_holders([file_a, file_b]) == {file_a: "alice"}
+        try:
+            client.acquire_lock(file_a, "bob")
+            raise AssertionError("bob took alice's lock through the daemon")
+        except LockConflictError as e:
+            assert e.locked_by == "alice"
+
+        client.renew_lock(session)
+        client.release_lock(file_a, "alice")
+        assert client.acquire_locks([file_a, file_b], "bob").keys() == {file_a, file_b}
+        assert daemon.get_stats()["requests"] == 5
+
+
+def test_daemon_unix_socket(open_vault):
+    daemon_round_trip(open_vault(concurrent=True), "unix")
+
+
+def test_daemon_tcp(open_vault):
+    daemon_round_trip(open_vault(concurrent=True), "tcp")
+
+
+def test_daemon_confirms_memory_holder_with_database(open_vault):
+    db = open_vault(concurrent=True)
+    with lock_daemon(db) as (daemon, client):
+        file_a, file_b = make_files(db, 2)
+        client.acquire_locks([file_a, file_b], "alice")
+        # Released behind the daemon's back, long before its next refresh
+        db.release_lock(file_a, "alice")
+
+        client.acquire_lock(file_a, "bob")
+        try:
+            client.acquire_locks([file_a, file_b], "carol")
+            raise AssertionError("carol took locks held by alice and bob")
+        except LockConflictError as e:
+            assert e.conflicts == {file_a: "bob", file_b: "alice"}, e.conflicts
+        stats = daemon.get_stats()
+        assert stats["stale_memory_holders"] == 1 and stats["conflicts_from_memory"] == 1, stats
+
+
+def test_daemon_honours_zero_lease(open_vault):
+    db = open_vault(concurrent=True)
+    with lock_daemon(db) as (daemon, client):
+        file_id, = make_files(db, 1)
+        client.acquire_lock(file_id, "alice", lease_seconds=0)
+        assert db.get_active_locks() == [] and daemon.list_locks() == []
+        client.acquire_lock(file_id, "bob")
+        assert db.get_lock_holders([file_id]) == {file_id: "bob"}
+
+
+@contextmanager
+def fake_daemon(vault_path, reply, per_connection=None):
+    """Unix socket server at the vault's daemon address
+
+    reply(request) returns the response dict, or None to close the
+    connection without answering; after per_connection answers the
+    connection is closed too. Yields the list of received requests.
+    """
+    received = []
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            answered = 0
+            for line in self.rfile:
+                received.append(json.loads(line))
+                response = reply(received[-1])
+                if response is None:
+                    return
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                answered += 1
+                if answered == per_connection:
+                    return
+
+    path = lockd_address(vault_path) + ".sock"
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield received
+    finally:
+        server.shutdown()
+        server.server_close()
+        os.remove(path)
+
+
+def test_daemon_address_is_private(open_vault):
+    db = open_vault(concurrent=True)
+    with lock_daemon(db) as (daemon, client):
+        directory = os.lstat(runtime_dir())
+        assert directory.st_uid == os.getuid() and stat.S_IMODE(directory.st_mode) == 0o700
+        assert os.path.dirname(daemon.describe_address()) == runtime_dir()
+        assert stat.S_IMODE(os.stat(daemon.describe_address()).st_mode) == 0o600
+
+        # Someone else's socket at the same name is not trusted
+        if os.getuid() == 0:
+            os.chown(daemon.describe_address(), 12345, -1)
+            probe = LockdClient(db.vault_path)
+            assert not probe.available()
+            os.chown(daemon.describe_address(), 0, -1)
+            assert probe.available()
+
+
+def test_acquire_is_not_resent_after_lost_connection(db):
+    file_id, = make_files(db, 1)
+    # Answers pings, drops the connection on anything else
+    reply = lambda request: {"ok": True} if request["op"] == "ping" else None
+    with fake_daemon(db.vault_path, reply) as received:
+        client = LockdClient(db.vault_path)
+        assert client.call("ping") == {"ok": True}
+        try:
+            client.call("acquire", file_id=file_id, user="alice")
+            raise AssertionError("lost acquire reported as answered")
+        except LockdUnavailable as e:
+            assert e.delivered
+        assert [r["op"] for r in received] == ["ping", "acquire"], received
+        client.close()
+
+        via_daemon = PLMDatabase(db.vault_path)
+        try:
+            via_daemon.acquire_lock(file_id, "alice")
+            raise AssertionError("acquire fell back to SQLite after the daemon got it")
+        except LockConflictError:
+            raise
+        except Exception as e:
+            assert "may have been applied" in str(e), e
+        finally:
+            via_daemon.close()
+        assert db.get_lock_holders([file_id]) == {}
+
+
+def test_closed_keepalive_connection_is_replaced_before_sending(db):
+    reply = lambda request: {"ok": True, "op": request["op"]}
+    with fake_daemon(db.vault_path, reply, per_connection=1) as received:
+        client = LockdClient(db.vault_path)
+        assert client.call("ping")["op"] == "ping"
+        time.sleep(0.1)  # the daemon has closed that connection by now
+        assert client.call("acquire", file_id=1, user="alice")["op"] == "acquire"
+        assert [r["op"] for r in received] == ["ping", "acquire"], received
+        client.close()
+
+
+def test_acquire_locks_is_all_or_nothing(db):
+    files = make_files(db, 4)
+    db.acquire_lock(files[1], "alice")
+    db.acquire_lock(files[3], "carol")
+    try:
+        db.acquire_locks(files, "bob")
+        raise AssertionError("bob locked files held by others")
+    except LockConflictError as e:
+        assert e.conflicts == {files[1]: "alice", files[3]: "carol"}, e.conflicts
+        assert e.file_id == files[1] and "2 files locked" in str(e)
+    assert db.get_lock_holders(files) == {files[1]: "alice", files[3]: "carol"}
+
+    db.release_lock(files[1], "alice")
+    sessions = db.acquire_locks(files[:3] + [files[0]], "bob")
+    assert sorted(sessions) == files[:3] and len(set(sessions.values())) == 3
+    assert db.acquire_locks([], "bob") == {}
+
+    db.release_locks(files, "bob")
+    assert db.get_lock_holders(files) == {files[3]: "carol"}
+
+
+def test_acquire_locks_takes_over_lapsed_leases(db):
+    files = make_files(db, 2)
+    db.acquire_lock(files[0], "alice", lease_seconds=0)
+    db.acquire_locks(files, "bob")
+    assert db.get_lock_holders(files) == {files[0]: "bob", files[1]: "bob"}
+    assert open_locks(db, files[0]) == [("alice", True), ("bob", False)]
+    try:
+        db.acquire_locks(files + [999], "bob")
+        raise AssertionError("locked a file that does not exist")
+    except LockConflictError:
+        raise
+    except Exception as e:
+        assert "[999]" in str(e), e
+
+
+def test_assembly_subtree_lock(db):
+    top, sub, bolt, bracket, spare = make_files(db, 5)
+    db.add_assembly_component(top, sub, 1)
+    db.add_assembly_component(top, bolt, 1)
+    db.add_assembly_component(sub, bracket, 1)
+    db.add_assembly_component(sub, top, 1)  # cycle back to the root
+    for file_id in (top, sub, bolt, bracket):
+        db.create_version(file_id, "tester")
+
+    assert db.get_assembly_file_ids(top) == [top, sub, bolt, bracket]
+    assert db.get_assembly_file_ids(top, recursive=False) == [top, sub, bolt]
+    db.acquire_locks(db.get_assembly_file_ids(top), "alice")
+    assert sorted(db.get_lock_holders([top, sub, bolt, bracket, spare])) == [top, sub, bolt, bracket]
+
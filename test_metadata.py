@@ -0,0 +1,94 @@
+"""Metadata cache tests: revalidation, LRU eviction, project loading (run against a temporary vault)"""
+
+import os
+import json
+
+from database.metadata import MetadataCache
+
+
+def write_json(path, data, mtime_ns=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_changed_mtime_or_size_is_read_again(vault):
+    cache = MetadataCache()
+    path = os.path.join(vault, "part_meta.json")
+    write_json(path, {"rev": "A"}, mtime_ns=1_000_000_000)
+    assert cache.load(path) == {"rev": "A"}
+    assert cache.load(path) == {"rev": "A"}
+
+    # Same size, newer mtime
+    write_json(path, {"rev": "B"}, mtime_ns=2_000_000_000)
+    assert cache.load(path) == {"rev": "B"}
+    # Different size, mtime put back to what was cached
+    write_json(path, {"rev": "C2"}, mtime_ns=2_000_000_000)
+    assert cache.load(path) == {"rev": "C2"}
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["stale"]) == (1, 3, 2), stats
+    assert stats["hit_ratio"] == 0.25 and stats["entries"] == 1, stats
+
+
+def test_missing_and_invalid_files(vault):
+    cache = MetadataCache()
+    path = os.path.join(vault, "version_meta.json")
+    assert cache.load(path) is None
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert cache.load(path) is None
+    assert cache.load(path) is None
+    assert cache.get_stats()["hits"] == 1  # the invalid file is not parsed twice
+    os.remove(path)
+    assert cache.load(path) is None and cache.get_stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(vault):
+    cache = MetadataCache(max_entries=2)
+    paths = {}
+    for name in ("a", "b", "c"):
+        paths[name] = os.path.join(vault, name, "part_meta.json")
+        write_json(paths[name], {"name": name})
+
+    cache.load(paths["a"])
+    cache.load(paths["b"])
+    cache.load(paths["a"])          # a is now the most recently used
+    cache.load(paths["c"])          # evicts b
+    assert cache.get_stats()["evictions"] == 1
+    misses = cache.get_stats()["misses"]
+    assert cache.load(paths["a"]) == {"name": "a"} and cache.get_stats()["misses"] == misses
+    assert cache.load(paths["b"]) == {"name": "b"} and cache.get_stats()["misses"] == misses + 1
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_project_metadata_keyed_by_file(db):
+    project = db.create_project("Meta", "tester", "")
+    bracket_dir = os.path.join(project["vault_path"], "Parts", "bracket")
+    plate_dir = os.path.join(project["vault_path"], "Parts", "plate")
+    bracket = db.create_file(project["project_id"], "bracket.SLDPRT", "PART", bracket_dir)["file_id"]
+    # Stored vault-relative with a trailing separator; still the same folder
+    plate = db.create_file(project["project_id"], "plate.SLDPRT", "PART",
+                           os.path.relpath(plate_dir, db.vault_path) + os.sep)["file_id"]
+    db.create_file(project["project_id"], "bolt.SLDPRT", "PART",
+                   os.path.join(project["vault_path"], "Parts", "bolt"))
+
+    write_json(os.path.join(bracket_dir, "part_meta.json"), {"material": "6061"})
+    write_json(os.path.join(bracket_dir, "v001", "version_meta.json"), {"created_by": "alice"})
+    write_json(os.path.join(plate_dir, "v001", "version_meta.json"), {"created_by": "bob"})
+    with open(os.path.join(plate_dir, "part_meta.json"), "w", encoding="utf-8") as f:
+        f.write("")
+
+    meta = db.get_project_metadata(project["project_id"])
+    assert meta == {
+        bracket: {"part": {"material": "6061"}, "versions": {"v001": {"created_by": "alice"}}},
+        plate: {"part": {}, "versions": {"v001": {"created_by": "bob"}}},
+    }, meta
+    assert db.get_part_metadata(bracket) == {"material": "6061"}
+
+    # A second pass is served from the cache
+    misses = db.get_metadata_stats()["misses"]
+    assert db.get_project_metadata(project["project_id"]) == meta
+    assert db.get_metadata_stats()["misses"] == misses
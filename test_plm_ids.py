@@ -0,0 +1,67 @@
+"""PLM ID allocation tests: sequence seeding, concurrent creators, reserved blocks (run against a temporary vault)"""
+
+import threading
+
+import pytest
+
+
+def test_seeding_uses_full_number_past_999(open_vault):
+    db = open_vault()
+    project = db.create_project("Legacy", "tester", "")
+    with db.get_connection() as conn:
+        # IDs issued before id_sequences existed
+        conn.executemany(
+            "INSERT INTO files (project_id, plm_id, file_name, file_type, vault_path) VALUES (?, ?, ?, 'PART', '')",
+            [(project["project_id"], plm_id, f"{plm_id}.SLDPRT") for plm_id in ("PLM-PAR-998", "PLM-PAR-1234")]
+        )
+        conn.execute("UPDATE projects SET plm_id = 'PLM-PRJ-1000'")
+        conn.execute("DELETE FROM id_sequences")
+        conn.commit()
+    db.close()
+
+    db = open_vault()
+    part = db.create_file(project["project_id"], "bracket.SLDPRT", "PART", project["vault_path"])
+    assert part["plm_id"] == "PLM-PAR-1235", part
+    assert db.create_project("Next", "tester", "")["plm_id"] == "PLM-PRJ-1001"
+    assert db.reserve_plm_ids("ASM", 1) == ["PLM-ASM-001"]
+
+
+def test_concurrent_creators_get_unique_ids(open_vault):
+    project = open_vault(concurrent=True).create_project("Busy", "tester", "")
+    creators = [open_vault(concurrent=True) for _ in range(4)]
+    issued, errors = [], []
+
+    def create(db, worker):
+        try:
+            for i in range(15):
+                file = db.create_file(project["project_id"], f"w{worker}-{i}.SLDPRT", "PART",
+                                      project["vault_path"])
+                issued.append(file["plm_id"])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=create, args=(db, n)) for n, db in enumerate(creators)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(issued) == [f"PLM-PAR-{n:03d}" for n in range(1, 61)]
+
+
+def test_reserved_blocks_never_overlap_later_ids(db):
+    project = db.create_project("Reserved", "tester", "")
+    first = db.create_file(project["project_id"], "a.SLDPRT", "PART", project["vault_path"])["plm_id"]
+    block = db.reserve_plm_ids("PART", 5)
+    assert first == "PLM-PAR-001"
+    assert block == [f"PLM-PAR-{n:03d}" for n in range(2, 7)]
+
+    after = db.create_file(project["project_id"], "b.SLDPRT", "PART", project["vault_path"])["plm_id"]
+    assert after == "PLM-PAR-007"
+    assert db.reserve_plm_ids("PAR", 2) == ["PLM-PAR-008", "PLM-PAR-009"]
+    # Other prefixes have their own sequence
+    assert db.reserve_plm_ids("DRAWING", 1) == ["PLM-DRW-001"]
+
+    with pytest.raises(ValueError):
+        db.reserve_plm_ids("PART", 0)
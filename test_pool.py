@@ -0,0 +1,92 @@
+"""Connection pool tests: thread affinity, exhaustion, release rollback (run against a temporary vault)"""
+
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from database.pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(vault):
+    path = os.path.join(vault, "pool.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (name TEXT)")
+    conn.close()
+    pool = ConnectionPool(path, pool_size=2, timeout=0.1)
+    yield pool
+    pool.close_all()
+
+
+def in_thread(func):
+    """Run func on a new thread and return its result"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_thread_gets_its_own_connection_back(pool):
+    mine = pool.acquire()
+    theirs = in_thread(pool.acquire)
+    assert mine is not theirs
+    pool.release(mine)
+    pool.release(theirs)
+
+    # theirs was released last, but this thread is handed the one it used
+    with pool.connection() as conn:
+        assert conn is mine
+    stats = pool.get_stats()
+    assert stats["created"] == 2 and stats["reused"] == 1 and stats["idle"] == 2, stats
+
+
+def test_exhausted_pool_times_out(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    assert pool.get_stats()["waits"] >= 1
+
+    # A released connection wakes a waiting thread
+    timer = threading.Timer(0.02, pool.release, args=(held.pop(),))
+    pool.timeout = 5
+    timer.start()
+    conn = pool.acquire()
+    timer.join()
+    pool.release(conn)
+    pool.release(held.pop())
+
+
+def test_release_rolls_back_open_transaction(pool):
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO items VALUES ('uncommitted')")
+        assert conn.in_transaction
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        conn.execute("INSERT INTO items VALUES ('committed')")
+        conn.commit()
+    with pool.connection() as conn:
+        assert [row[0] for row in conn.execute("SELECT name FROM items")] == ["committed"]
+
+
+def test_closed_pool_refuses_checkouts(pool):
+    conn = pool.acquire()
+    pool.close_all()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.get_stats()["open"] == 0
+
+
+def test_database_pool_stats(open_vault):
+    db = open_vault(pool_size=3)
+    db.list_projects()
+    before = db.get_pool_stats()
+    for _ in range(5):
+        db.list_projects()
+    stats = db.get_pool_stats()
+    assert stats["pool_size"] == 3 and stats["open"] == before["open"] == 1, stats
+    assert stats["created"] == before["created"] and stats["reused"] == before["reused"] + 5, stats
+    assert stats["idle"] == stats["open"] and stats["waits"] == 0, stats
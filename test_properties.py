@@ -0,0 +1,103 @@
+"""Property index tests: value parsing, property filters, index rebuild (run against a temporary vault)"""
+
+import json
+
+import pytest
+
+from database.properties import numeric_value, property_filter_sql, property_rows
+
+
+def make_catalog(db):
+    """bracket (6061, 1.2 kg), plate (S235, 3.4 kg), bolt (6061, 0.02); returns {name: file_id}"""
+    project = db.create_project("Properties", "tester", "")
+    ids = {}
+    for name, custom, solidworks in (
+        ("bracket.SLDPRT", {"Material": "6061", "Mass": "1.2 kg", "Thickness": "2.5 mm"},
+         {"Config": {"Default": {"Finish": "Anodized"}}}),
+        ("plate.SLDPRT", {"material": "S235", "Mass": "3.4 kg", "Thickness": "10mm"}, None),
+        ("bolt.SLDPRT", {"MATERIAL": "6061", "mass": 0.02}, None),
+    ):
+        ids[name] = db.create_file(project["project_id"], name, "PART", project["vault_path"])["file_id"]
+        db.create_version(ids[name], "tester", custom_properties=custom, solidworks_properties=solidworks)
+    return ids
+
+
+def names(rows):
+    return sorted(row["file_name"].split(".")[0] for row in rows)
+
+
+def test_numeric_values_with_units():
+    assert numeric_value("2.5 mm") == 2.5
+    assert numeric_value("6061") == 6061.0
+    assert numeric_value("-3") == -3.0 and numeric_value(".5") == 0.5
+    assert numeric_value("1e-3") == 0.001
+    assert numeric_value("45°") == 45.0 and numeric_value("10mm") == 10.0
+    assert numeric_value(7) == 7.0
+    for text in ("M4", "2.5 mm thick", "", "n/a", True, None):
+        assert numeric_value(text) is None, text
+
+
+def test_property_rows_flatten_and_ignore_repeated_keys():
+    rows = property_rows(1, json.dumps({"Mass": "1 kg", "mass": "2 kg"}),
+                         {"Config": {"Default": {"Finish": "Anodized"}}, "Flags": [True]})
+    assert rows == [
+        (1, "custom", "Mass", "1 kg", 1.0),
+        (1, "solidworks", "Config.Default.Finish", "Anodized", None),
+        (1, "solidworks", "Flags.0", "true", None),
+    ], rows
+
+
+def test_filter_sql_rejects_bad_conditions():
+    with pytest.raises(ValueError):
+        property_filter_sql({"Mass": (1, 2, 3)})
+    with pytest.raises(ValueError):
+        property_filter_sql({"Mass": {"~": 1}})
+
+
+def test_keys_and_text_values_match_case_insensitively(db):
+    make_catalog(db)
+    assert names(db.find_versions_by_properties({"material": "6061"})) == ["bolt", "bracket"]
+    assert names(db.find_versions_by_properties({"MATERIAL": "s235"})) == ["plate"]
+    assert names(db.find_versions_by_properties({"config.default.finish": "ANODIZED"})) == ["bracket"]
+    assert names(db.find_versions_by_properties({"Thickness": None})) == ["bracket", "plate"]
+
+
+def test_numeric_filters_and_ranges(db):
+    make_catalog(db)
+    assert names(db.find_versions_by_properties({"Thickness": 2.5})) == ["bracket"]
+    assert names(db.find_versions_by_properties({"Mass": (None, 2)})) == ["bolt", "bracket"]
+    assert names(db.find_versions_by_properties({"Mass": (1.2, None)})) == ["bracket", "plate"]
+    assert names(db.find_versions_by_properties({"Mass": (None, None)})) == ["bolt", "bracket", "plate"]
+    assert names(db.find_versions_by_properties({"Mass": {">": 1.2, "<=": 3.4}})) == ["plate"]
+    assert names(db.find_versions_by_properties({"Mass": {"!=": 0.02}})) == ["bracket", "plate"]
+    assert names(db.find_versions_by_properties({"Material": (6000, 7000)})) == ["bolt", "bracket"]
+
+
+def test_filters_combine(db):
+    ids = make_catalog(db)
+    assert names(db.find_versions_by_properties({"Material": "6061", "Mass": (1, None)})) == ["bracket"]
+    assert db.find_versions_by_properties({"Material": "6061", "Thickness": (5, None)}) == []
+
+    # A newer bracket version in another material; only it is the latest
+    db.create_version(ids["bracket.SLDPRT"], "tester", custom_properties={"Material": "7075", "Mass": "1.1 kg"})
+    rows = db.find_versions_by_properties({"Mass": (1, 2)})
+    assert [(r["file_name"], r["version_number"]) for r in rows] == [("bracket.SLDPRT", 2), ("bracket.SLDPRT", 1)]
+    latest = db.find_versions_by_properties({"Mass": (1, 2)}, latest_only=True)
+    assert [r["version_number"] for r in latest] == [2]
+    assert db.find_versions_by_properties({"Material": "6061"}, lifecycle_state="Released") == []
+    with pytest.raises(ValueError):
+        db.find_versions_by_properties({})
+
+
+def test_rebuild_property_index_after_sql_edit(db):
+    ids = make_catalog(db)
+    with db.get_connection() as conn:
+        conn.execute("UPDATE versions SET custom_properties = ? WHERE file_id = ?",
+                     (json.dumps({"Material": "Ti-6Al-4V", "Mass": "0.8 kg"}), ids["plate.SLDPRT"]))
+        conn.commit()
+    assert names(db.find_versions_by_properties({"Material": "S235"})) == ["plate"]
+
+    # 3 + 2 + 2 custom rows, 1 SolidWorks row
+    assert db.rebuild_property_index() == 8
+    assert db.find_versions_by_properties({"Material": "S235"}) == []
+    assert names(db.find_versions_by_properties({"Mass": (None, 1)})) == ["bolt", "plate"]
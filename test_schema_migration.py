@@ -0,0 +1,32 @@
+"""Schema migration tests (run against a temporary vault)"""
+
+import os
+import sqlite3
+
+
+def schema_version(db):
+    with db.get_connection() as conn:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+
+def test_reopen_leaves_schema_untouched(open_vault):
+    db = open_vault()
+    before = schema_version(db)
+    db.close()
+    db = open_vault()
+    assert schema_version(db) == before, "reopening the vault rewrote the schema"
+
+
+def test_outdated_view_is_replaced(vault, open_vault):
+    open_vault().close()
+    conn = sqlite3.connect(os.path.join(vault, "db.sqlite"))
+    conn.execute("DROP VIEW latest_versions")
+    conn.execute("CREATE VIEW latest_versions AS SELECT file_id FROM files")
+    conn.commit()
+    conn.close()
+
+    db = open_vault()
+    with db.get_connection() as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(latest_versions)")]
+    assert "version_id" in columns, columns
+
@@ -0,0 +1,62 @@
+"""Full-text search tests (run against a temporary vault)"""
+
+
+def make_catalog(db):
+    """Two brackets (aluminium, steel) and an aluminium plate; returns {name: file_id}"""
+    project = db.create_project("Search", "tester", "")
+    ids = {}
+    for name, description, material, note in (
+        ("bracket.SLDPRT", "Motor mount bracket", "6061", "Initial"),
+        ("bracket-steel.SLDPRT", "Motor mount bracket", "S235", "Initial"),
+        ("plate.SLDPRT", "Base plate", "6061", "Drill M4 holes"),
+    ):
+        file_id = db.create_file(project["project_id"], name, "PART", project["vault_path"],
+                                 description=description)["file_id"]
+        db.create_version(file_id, "tester", change_note=note,
+                          custom_properties={"Material": material})
+        ids[name] = file_id
+    return ids
+
+
+def names(results):
+    return sorted(r["file_name"] for r in results)
+
+
+def test_words_may_match_name_and_version_properties(db):
+    ids = make_catalog(db)
+    results = db.search("bracket 6061")
+    assert names(results) == ["bracket.SLDPRT"], results
+    assert results[0]["best_version"] == 1 and results[0]["file_id"] == ids["bracket.SLDPRT"]
+
+    assert names(db.search("plate m4")) == ["plate.SLDPRT"]
+    assert names(db.search("6061")) == ["bracket.SLDPRT", "plate.SLDPRT"]
+    assert names(db.search("bracket")) == ["bracket-steel.SLDPRT", "bracket.SLDPRT"]
+
+
+def test_every_word_must_match_somewhere(db):
+    make_catalog(db)
+    assert db.search("bracket titanium") == []
+    assert db.search("s235 6061") == []
+    assert db.search("   ") == []
+
+
+def test_prefixes_and_later_versions(db):
+    ids = make_catalog(db)
+    db.create_version(ids["bracket-steel.SLDPRT"], "tester", change_note="Switch to anodized",
+                      custom_properties={"Material": "6082"})
+    results = db.search("brack anodiz")
+    assert names(results) == ["bracket-steel.SLDPRT"] and results[0]["best_version"] == 2
+    assert names(db.search("bracket 60")) == ["bracket-steel.SLDPRT", "bracket.SLDPRT"]
+
+
+def test_index_follows_file_and_version_edits(db):
+    ids = make_catalog(db)
+    with db.get_connection() as conn:
+        conn.execute("UPDATE files SET file_name = 'gusset.SLDPRT' WHERE file_id = ?",
+                     (ids["plate.SLDPRT"],))
+        conn.commit()
+    assert names(db.search("gusset 6061")) == ["gusset.SLDPRT"]
+    assert names(db.search("plate")) == ["gusset.SLDPRT"]  # still in the description
+    assert db.rebuild_search_index() == 6
+    assert names(db.search("gusset m4")) == ["gusset.SLDPRT"]
+
@@ -0,0 +1,43 @@
+"""Version ingest tests: chunked bulk ingest (run against a temporary vault)"""
+
+import pytest
+
+
+def make_files(db, count):
+    project = db.create_project("Ingest", "tester", "")
+    return project["project_id"], [
+        db.create_file(project["project_id"], f"part{i}.SLDPRT", "PART", project["vault_path"])["file_id"]
+        for i in range(count)
+    ]
+
+
+def test_bulk_ingest_numbers_versions_per_file(db):
+    project_id, (part_a, part_b) = make_files(db, 2)
+    db.create_version(part_a, "tester")
+    records = [{"file_id": file_id, "author": "migration"} for file_id in (part_a, part_b, part_a)]
+    report = db.create_versions_bulk(records, chunk_size=2)
+    assert report["versions"] == 3 and report["files"] == 2 and report["chunks"] == 2, report
+
+    assert [v["version_number"] for v in db.list_file_versions(part_a)] == [3, 2, 1]
+    latest = {row["file_id"]: row for row in db.list_latest_versions(project_id)}
+    assert latest[part_a]["current_version"] == 3 and latest[part_a]["version_number"] == 3
+    assert latest[part_b]["current_version"] == 1 and latest[part_b]["version_number"] == 1
+
+
+def test_failed_chunk_leaves_earlier_chunks_current(db):
+    project_id, (part,) = make_files(db, 1)
+    records = [{"file_id": part, "author": "migration"} for _ in range(7)]
+    records[6] = {"file_id": part}  # no author: the second chunk fails
+    with pytest.raises(KeyError):
+        db.create_versions_bulk(records, chunk_size=5)
+
+    assert db.get_file(part)["current_version"] == 5
+    latest, = db.list_latest_versions(project_id)
+    assert latest["version_number"] == 5 and latest["version_id"] == db.get_version_by_number(part, 5)["version_id"]
+
+    # Resuming from current_version continues the numbering without duplicates
+    done = db.get_file(part)["current_version"]
+    records[6]["author"] = "migration"
+    db.create_versions_bulk(records[done:], chunk_size=5)
+    assert [v["version_number"] for v in db.list_file_versions(part)] == list(range(7, 0, -1))
+    assert db.get_file(part)["current_version"] == 7